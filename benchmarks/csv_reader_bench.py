@@ -0,0 +1,77 @@
+"""Benchmark the RR CSV reader: legacy (full-file chardet + csv module) vs read_csv_file.
+
+    python -m benchmarks.csv_reader_bench                # 10k, 100k, 1M rows
+    python -m benchmarks.csv_reader_bench --rows 10000 100000
+"""
+import argparse
+import csv
+import io
+import random
+import time
+
+import chardet
+
+from utils.file_upload_utils import _read_csv_tolerant, read_csv_file
+
+COLUMNS = ["Resource Request ID", "Project ID", "Project Name", "Account Name", "Job Grade", "Role",
+           "Mandatory Skills", "Optional Skills", "City", "State", "Country", "RR Start Date",
+           "RR End Date", "Created Date", "Updated Date", "Billability", "Priority", "Type",
+           "WFM ID", "HM ID"]
+
+
+def make_csv(rows: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    for i in range(rows):
+        name = "Café Façade Revamp" if i % 100 == 0 else f"Project {rng.randint(1, 500)}"
+        row = [f"SO{100000 + i}_1", f"P{rng.randint(1, 999)}", name,
+               "Acme, Inc.", f"B{rng.randint(1, 6)}", "Developer", "Python;FastAPI", "MongoDB",
+               rng.choice(["Pune", "Kochi", "Bengaluru", "Chennai"]), "KA", "India",
+               "01/02/2025", "31/12/2025", "2025-01-01", "2025-01-15", "Billable", "High", "TP",
+               str(rng.randint(10000, 99999)), str(rng.randint(10000, 99999))]
+        if i % 50 == 0:
+            row = row[:12]  # ragged (short) row
+        writer.writerow(row)
+        if i % 200 == 0:
+            out.write(",,,\n")  # blank row
+    return out.getvalue().encode("utf-8")
+
+
+def legacy_read(content: bytes):
+    enc = chardet.detect(content).get("encoding") or "utf-8"
+    return _read_csv_tolerant(content, enc)
+
+
+def same_frame(a, b) -> bool:
+    return list(a.columns) == list(b.columns) and a.values.tolist() == b.values.tolist()
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-over", type=int, default=None,
+                        help="only time the new reader above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'MB':>7} {'legacy s':>10} {'fast s':>9} {'speedup':>8}  equal")
+    for rows in args.rows:
+        content = make_csv(rows)
+        fast_s, fast = timed(read_csv_file, content)
+        if args.skip_legacy_over is not None and rows > args.skip_legacy_over:
+            print(f"{rows:>10} {len(content) / 1e6:>7.1f} {'-':>10} {fast_s:>9.3f} {'-':>8}  -")
+            continue
+        legacy_s, legacy = timed(legacy_read, content)
+        print(f"{rows:>10} {len(content) / 1e6:>7.1f} {legacy_s:>10.3f} {fast_s:>9.3f} "
+              f"{legacy_s / fast_s:>7.1f}x  {same_frame(legacy, fast)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark RR row validation: per-row ResourceRequest vs batched TypeAdapter (and trusted).
+
+    python -m benchmarks.rr_validation_bench                  # 1k, 10k, 50k rows
+    python -m benchmarks.rr_validation_bench --rows 10000 --invalid 0.05
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from models import ResourceRequest
+from utils.file_upload_utils import read_csv_file
+from utils.rr_validation import (RR_DATE_COLUMNS, RR_DATETIME_COLUMNS, RR_KEY_COLUMN,
+                                 normalize_date_columns, validate_rr_rows)
+
+SAMPLE = "upload_files/unprocessed/updated_jobs.csv"
+
+
+def per_row_validate(df: pd.DataFrame):
+    """The previous implementation: one ResourceRequest per row inside try/except."""
+    valid_rrs, errors = [], []
+    df = normalize_date_columns(df, RR_DATE_COLUMNS, RR_DATETIME_COLUMNS)
+    for idx, row in df.iterrows():
+        rr_id = row.get(RR_KEY_COLUMN)
+        if not rr_id or pd.isna(rr_id):
+            continue
+        row_dict = {k: None if pd.isna(v) else v for k, v in row.to_dict().items()}
+        row_dict["rr_status"] = True
+        try:
+            valid_rrs.append(ResourceRequest(**row_dict))
+        except Exception as e:
+            errors.append({"row": idx, "rr_id": str(rr_id), "error": str(e)})
+    return valid_rrs, errors
+
+
+def make_rows(template: pd.DataFrame, rows: int, invalid: float, seed: int = 7) -> pd.DataFrame:
+    rng = random.Random(seed)
+    df = pd.concat([template.iloc[[0]]] * rows, ignore_index=True)
+    df[RR_KEY_COLUMN] = [f"{10_000_000 + i}_1" for i in range(rows)]
+    for i in range(rows):
+        if rng.random() < invalid:
+            df.loc[i, rng.choice(["RR Start Date", "RR FTE", "Billable"])] = "bad"
+    df.index = df.index + 2
+    return df
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def same(a, b) -> bool:
+    return [m.model_dump() for m in a[0]] == [m.model_dump() for m in b[0]] and \
+        [(e["row"], e["error"]) for e in a[1]] == [(e["row"], e["error"]) for e in b[1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--invalid", type=float, default=0.01, help="share of rows with a bad value")
+    args = parser.parse_args()
+
+    template = read_csv_file(SAMPLE)
+    print(f"{'rows':>8} {'per-row s':>10} {'batched s':>10} {'trusted s':>10} {'speedup':>8}  equal")
+    for rows in args.rows:
+        df = make_rows(template, rows, args.invalid)
+        clean = make_rows(template, rows, 0)
+        per_row_s, per_row = timed(per_row_validate, df)
+        batched_s, batched = timed(validate_rr_rows, df)
+        trusted_s, _ = timed(validate_rr_rows, clean, True)
+        print(f"{rows:>8} {per_row_s:>10.3f} {batched_s:>10.3f} {trusted_s:>10.3f} "
+              f"{per_row_s / batched_s:>7.1f}x  {same(per_row, batched)}")
+
+
+if __name__ == "__main__":
+    main()
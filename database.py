@@ -1,20 +1,99 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import monitoring
 from dotenv import load_dotenv
 import os
-import pymongo
-import gridfs
+import threading
 
 load_dotenv()
 
 
-client = AsyncIOMotorClient(os.getenv("MONGODB_CLIENT"))
-db = client.talent_management
-sync_client = pymongo.MongoClient(os.getenv("MONGODB_CLIENT"))
-sync_db = sync_client.talent_management
+# --------------------------- CONNECTION POOL SETTINGS ---------------------------
+# One pool per process. Every router/util reaches Mongo through `client` below.
+MONGODB_URI = os.getenv("MONGODB_CLIENT")
+MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+# zlib ships with Python; zstd/snappy need the optional pymongo extras
+COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "zlib")
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects checkout counters for the shared pool (events fire from driver threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkouts_total = 0
+        self.checkout_failures = 0
+        self.wait_time_total_ms = 0.0
+        self.wait_time_max_ms = 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": MAX_POOL_SIZE,
+                "min_pool_size": MIN_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "checkouts_total": self.checkouts_total,
+                "checkout_failures": self.checkout_failures,
+                "wait_time_avg_ms": round(self.wait_time_total_ms / self.checkouts_total, 3)
+                if self.checkouts_total else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max_ms, 3),
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    def connection_checked_out(self, event):
+        wait_ms = (event.duration or 0.0) * 1000
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts_total += 1
+            self.wait_time_total_ms += wait_ms
+            self.wait_time_max_ms = max(self.wait_time_max_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    # Remaining pool events are not tracked
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
 
+pool_stats = PoolStatsListener()
 
-# Use synchronous GridFS with pymongo
-fs = gridfs.GridFS(sync_db,collection="files")
+POOL_OPTIONS = {
+    "maxPoolSize": MAX_POOL_SIZE,
+    "minPoolSize": MIN_POOL_SIZE,
+    "maxIdleTimeMS": MAX_IDLE_TIME_MS,
+    "waitQueueTimeoutMS": WAIT_QUEUE_TIMEOUT_MS,
+    "compressors": COMPRESSORS,
+}
+
+# Motor does not open sockets until the first operation, so building the client
+# here is free; the FastAPI lifespan (see main.py) warms it up and closes it.
+client = AsyncIOMotorClient(MONGODB_URI, event_listeners=[pool_stats], **POOL_OPTIONS)
+db = client.talent_management
+
+# Async GridFS bucket for resumes / cover letters (files.files + files.chunks)
+fs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="files")
 
 
 collections = {
@@ -28,14 +107,34 @@ collections = {
     "login_attempts":db["login_attempts"],
     "admin_logs":db["admin_logs"],
     "files":db.files.files,
-    "reset_collection":db.reset_tokens
-    
+    "file_chunks":db.files.chunks,
+    "reset_collection":db.reset_tokens,
+    "documents":db.documents,
+    "upload_jobs":db.upload_jobs,
+    "upload_ingestions":db.upload_ingestions,
+    "upload_errors":db.upload_errors,
+    "gc_runs":db.gc_runs
+
 }
 
 
 def get_gridfs():
-    return fs
- 
+    return fs_bucket
+
+
+async def connect_db():
+    """Open the shared pool at startup so the first request does not pay for it."""
+    await client.admin.command("ping")
+
+
+def close_db():
+    """Close the shared pool."""
+    client.close()
+
+
+def get_pool_stats() -> dict:
+    return pool_stats.snapshot()
+
 applications = db.applications
 resource_request= db.resource_request
 employees = db.employees
@@ -1,21 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI,Depends
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from routers.jobs import jobs_router
 from routers.file_upload import file_upload_router
 from routers.application import application_router
 from routers.employee import router as employee_router,resume_router,hm_router,wfm_router,tp_router
 from routers.manager import manager_router
+from database import connect_db, close_db
+from utils.db_indexes import ensure_indexes
+from utils.upload_jobs import start_upload_workers, stop_upload_workers
+from utils.folder_watcher import start_folder_watcher, stop_folder_watcher
 import os
 load_dotenv()
 
-from routers import auth,admin_logs
+from routers import auth,admin_logs,admin_db
 from utils.security import get_current_user
 # from routers import manager_workflow
 # , file_upload, job, employee, application, manager_workflow, admin
 
-app = FastAPI(title="Talent Management System")
+# Lifespan: the shared MongoDB pool (database.py) is opened on startup and closed on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_db()
+    # Declared indexes are applied idempotently unless disabled (see utils/db_indexes.py)
+    if os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true":
+        await ensure_indexes()
+    # Background workers for staged uploads (utils/upload_jobs.py)
+    await start_upload_workers()
+    # RR files dropped into upload_files/unprocessed (utils/folder_watcher.py)
+    start_folder_watcher()
+    yield
+    await stop_folder_watcher()
+    await stop_upload_workers()
+    close_db()
+
+
+app = FastAPI(title="Talent Management System", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,10 +46,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB Connection
-client = AsyncIOMotorClient(os.getenv("MONGODB_CLIENT"))
-db = client.talent_management
-
 # app.include_router(auth.router, tags=["Auth"])
 # # ager_workflow.router, prefix="/api/manager", tags=["Manager Workflow"])
 
@@ -37,6 +54,7 @@ db = client.talent_management
 #     return {"message": "Talent Management System API"}
 app.include_router(auth.router, tags=["Auth"])
 app.include_router(admin_logs.router,prefix="/api/admin/activity",tags=["Admin Logs"])
+app.include_router(admin_db.router, tags=["Admin Database"])
 app.include_router(jobs_router, tags=["Jobs"])
 app.include_router(application_router, tags=["Applications"])
 app.include_router(manager_router, tags=["Manager Workflow"])
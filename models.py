@@ -28,7 +28,7 @@ class User(BaseModel):
 # ----------------------------- EMPLOYEE MODEL -----------------------------
 class Employee(BaseModel):
     # Mapped fields from Excel columns using alias
-    employee_id: int = Field(..., alias="Employee ID")
+    employee_id: str = Field(..., alias="Employee ID")
     employee_name: str = Field(..., alias="Employee Name")
     employment_type: str = Field(..., alias="Employment Type")
     designation: str = Field(..., alias="Designation")
@@ -43,6 +43,17 @@ class Employee(BaseModel):
     resume : Optional[str] = None
     resume_text: Optional[str] = Field(None)
  
+    # employee_id is stored as a digit string everywhere (employees, users, applications)
+    @field_validator("employee_id", mode="before")
+    @classmethod
+    def normalize_employee_id(cls, v):
+        value = str(v).strip()
+        if value.endswith(".0"):
+            value = value[:-2]
+        if not value.isdigit():
+            raise ValueError(f"Invalid employee id: '{v}'")
+        return value
+
     # Normalize TP / Non TP values
     @field_validator("type", mode="before")
     @classmethod
@@ -310,7 +321,7 @@ class Application(BaseModel):
     # MongoDB-like UUID identifier
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
     # Employee applying
-    employee_id: int
+    employee_id: str
     # RR they applied for
     job_rr_id: str
     # Current application state
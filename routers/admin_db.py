@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from database import get_pool_stats
+from routers.admin_logs import require_admin
+from utils.db_indexes import ensure_indexes, verify_indexes
+from utils.gridfs_gc import collect_orphaned_files, get_gc_runs
+
+router = APIRouter(prefix="/api/admin/db", tags=["Admin Database"])
+
+# === Admin endpoint to inspect the shared MongoDB connection pool ===
+@router.get("/pool")
+async def get_connection_pool_stats(admin=Depends(require_admin)):
+    return get_pool_stats()
+
+# === Admin endpoints to verify / apply the declared indexes ===
+@router.get("/indexes")
+async def get_index_report(admin=Depends(require_admin)):
+    return await verify_indexes()
+
+@router.post("/indexes")
+async def apply_indexes(admin=Depends(require_admin)):
+    return {"created": await ensure_indexes(), "report": await verify_indexes()}
+
+# === Admin endpoints for the GridFS garbage collector (dry_run=true only reports) ===
+@router.post("/gc")
+async def run_gridfs_gc(dry_run: bool = True, admin=Depends(require_admin)):
+    return await collect_orphaned_files(dry_run=dry_run)
+
+@router.get("/gc/runs")
+async def list_gridfs_gc_runs(limit: int = Query(20, ge=1, le=200), admin=Depends(require_admin)):
+    return await get_gc_runs(limit)
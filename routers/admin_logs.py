@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
 from database import collections
 from utils.security import get_current_user
 from datetime import datetime,timezone
 from utils.activity_logger import log_employee_activity
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_response
 
 router = APIRouter(prefix="/api/admin/activity", tags=["Admin Logs"])
 
+ADMIN_LOGS_SORT = [("timestamp", -1), ("_id", -1)]
+
 # Helper: Only Admin allowed
 async def require_admin(user: dict = Depends(get_current_user)):
     if user["role"] != "Admin":
@@ -24,10 +28,13 @@ async def log_employee_activity(user: dict, action: str, details: dict = None):
     await collections["admin_logs"].insert_one(entry)
 
 # === Admin endpoint to view employee activity logs ===
+# Newest first, paged with ?cursor=<next_cursor from the previous page>
 @router.get("/")
-async def get_employee_activity(admin=Depends(require_admin)):
-    logs = await collections["admin_logs"].find().sort("timestamp", -1).to_list(500)
+async def get_employee_activity(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                cursor: Optional[str] = None,
+                                admin=Depends(require_admin)):
+    logs, next_cursor = await paginate(collections["admin_logs"], {}, ADMIN_LOGS_SORT, limit, cursor)
     # Convert ObjectId to string for safe JSON response
     for log in logs:
         log["_id"] = str(log["_id"])
-    return logs
+    return page_response(logs, next_cursor)
@@ -2,19 +2,35 @@ from fastapi import APIRouter, Depends, HTTPException,status,Query,UploadFile,Fo
 from typing import List, Optional
 from datetime import datetime,timezone
 import uuid
-from gridfs import GridFS,GridFSBucket
-from pymongo.database import Database
 from database import collections
 from models import Application, ApplicationStatus
 from utils.security import get_current_user
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClient,AsyncIOMotorGridFSBucket
-from database import client,db,collections
+from utils.gridfs_utils import gridfs_download_response
+from utils.gridfs_gc import CLOSED_STATUSES
+from utils.document_store import store_uploads, release, release_attachments
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_response
+from utils.export_utils import parse_fields, stream_export
 
 
-fs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="files")
 application_router = APIRouter(prefix="/application", tags=["Applications"])
 
+ALLOWED_ATTACHMENT_EXTENSIONS = {"pdf", "doc", "docx"}
+# Stable order for application listings
+APPLICATIONS_SORT = [("_id", 1)]
+
+
+# Reject anything that is not .pdf / .doc / .docx before it reaches GridFS
+def validate_attachment_type(upload: Optional[UploadFile], label: str):
+    if not upload:
+        return
+    ext = upload.filename.split(".")[-1].lower()
+    if ext not in ALLOWED_ATTACHMENT_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {label} file type. Only .pdf, .doc, .docx are allowed.",
+        )
+
 
 # ---------------------------------------------------------------------
 # CREATE APPLICATION
@@ -75,37 +91,14 @@ async def create_application(
             detail="You have already applied for this job",
         )
     
-    # 4. Store resume in GridFS (validate extension)
-    resume_file_id = None
-    if resume_file:
-        ext = resume_file.filename.split(".")[-1].lower()
-        if ext not in {"pdf", "doc", "docx"}:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid resume file type. Only .pdf, .doc, .docx are allowed.",
-            )
-        resume_bytes = await resume_file.read()
-        resume_file_id = await fs_bucket.upload_from_stream(
-            resume_file.filename,
-            resume_bytes,
-            metadata={"content_type": resume_file.content_type},
-        )
+    # 4. Validate attachment types before storing anything
+    validate_attachment_type(resume_file, "resume")
+    validate_attachment_type(cover_letter_file, "cover letter")
 
-    # 5. Store cover letter in GridFS (validate extension if uploaded)
-    cover_letter_file_id = None
-    if cover_letter_file:
-        ext = cover_letter_file.filename.split(".")[-1].lower()
-        if ext not in {"pdf", "doc", "docx"}:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid cover letter file type. Only .pdf, .doc, .docx are allowed.",
-            )
-        cl_bytes = await cover_letter_file.read()
-        cover_letter_file_id = await fs_bucket.upload_from_stream(
-            cover_letter_file.filename,
-            cl_bytes,
-            metadata={"content_type": cover_letter_file.content_type},
-        )
+    # 5. Store resume and cover letter concurrently (content-addressed: identical files are kept once)
+    resume_meta, cover_letter_meta = await store_uploads(resume_file, cover_letter_file)
+    resume_file_id = resume_meta["file_id"] if resume_meta else None
+    cover_letter_file_id = cover_letter_meta["file_id"] if cover_letter_meta else None
 
     # 6. Build application doc (just the IDs here)
     application_data = {
@@ -119,7 +112,14 @@ async def create_application(
         "updated_at": datetime.utcnow(),
     }
 
-    result = await collections["applications"].insert_one(application_data)
+    try:
+        result = await collections["applications"].insert_one(application_data)
+    except Exception:
+        # Do not leave references behind for an application that was never created
+        for file_id in (resume_file_id, cover_letter_file_id):
+            if file_id:
+                await release(file_id)
+        raise
     created_app = await collections["applications"].find_one({"_id": result.inserted_id})
 
     return Application(**created_app)
@@ -160,54 +160,36 @@ async def update_draft(
     # Only allow job_rr_id and file updates, not status
     update_fields = {"job_rr_id": job_rr_id}
  
-    # Replace resume with new file uploaded
-    if resume_file:
-        ext = resume_file.filename.split(".")[-1].lower()
-        if ext not in {"pdf", "doc", "docx"}:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid resume file type. Only .pdf, .doc, .docx are allowed.",
-            )
-        resume_bytes = await resume_file.read()
-        resume_file_id = await fs_bucket.upload_from_stream(
-            resume_file.filename,
-            resume_bytes,
-            metadata={"content_type": resume_file.content_type},
-        )
-        update_fields["resume"] = str(resume_file_id)
-        if app.get("resume"):
-            try:
-                await fs_bucket.delete(ObjectId(app["resume"]))
-            except Exception:
-                pass
- 
-    # Replace cover letter with new file uploaded
-    if cover_letter_file:
-        ext = cover_letter_file.filename.split(".")[-1].lower()
-        if ext not in {"pdf", "doc", "docx"}:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid cover letter file type. Only .pdf, .doc, .docx are allowed.",
-            )
-        cl_bytes = await cover_letter_file.read()
-        cover_letter_file_id = await fs_bucket.upload_from_stream(
-            cover_letter_file.filename,
-            cl_bytes,
-            metadata={"content_type": cover_letter_file.content_type},
-        )
-        update_fields["cover_letter"] = str(cover_letter_file_id)
-        if app.get("cover_letter"):
-            try:
-                await fs_bucket.delete(ObjectId(app["cover_letter"]))
-            except Exception:
-                pass
+    # Replace resume / cover letter with the new files (stored concurrently, deduplicated by content)
+    validate_attachment_type(resume_file, "resume")
+    validate_attachment_type(cover_letter_file, "cover letter")
+    resume_meta, cover_letter_meta = await store_uploads(resume_file, cover_letter_file)
+
+    replaced = []
+    for field, meta in (("resume", resume_meta), ("cover_letter", cover_letter_meta)):
+        if not meta:
+            continue
+        update_fields[field] = str(meta["file_id"])
+        if app.get(field):
+            replaced.append(app[field])
  
     update_fields["updated_at"] = datetime.now(timezone.utc)
  
-    await collections["applications"].update_one(
-        {"_id": app_id, "employee_id": employee_id},
+    # Only while it is still a draft: a concurrent submit / withdraw wins
+    result = await collections["applications"].update_one(
+        {"_id": app_id, "employee_id": employee_id, "status": ApplicationStatus.DRAFT.value},
         {"$set": update_fields},
     )
+    if not result.matched_count:
+        # The new files are not referenced by anything: drop the references just taken
+        for meta in (resume_meta, cover_letter_meta):
+            if meta:
+                await release(meta["file_id"])
+        raise HTTPException(400, "Only draft applications can be edited")
+
+    # Drop this draft's references to the files it no longer points at
+    for old_file_id in replaced:
+        await release(old_file_id)
  
     return {"message": "Your application is Updated"}
  
@@ -221,10 +203,10 @@ async def update_draft_status(
     app_id: str,
     current_user: dict = Depends(get_current_user),):
    
-    employee_id = int(current_user["employee_id"])
+    employee_id = str(current_user["employee_id"])
     print(employee_id)
  
-    # _id is a UUID string, employee_id is int in DB
+    # _id is a UUID string, employee_id is a string in DB
     app = await collections["applications"].find_one(
         {"_id": app_id}
     )
@@ -242,6 +224,7 @@ async def update_draft_status(
             "$set": {
                 "status": ApplicationStatus.SUBMITTED.value,
                 "submitted_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc),
             }
         }
     )
@@ -265,11 +248,15 @@ async def withdraw(app_id: str, current_user: dict = Depends(get_current_user)):
         ApplicationStatus.SHORTLISTED, ApplicationStatus.INTERVIEW, ApplicationStatus.SELECTED, ApplicationStatus.ALLOCATED]:
         raise HTTPException(400, "Cannot withdraw")
    
-     # Mark as withdrawn
-    await collections["applications"].update_one(
-        {"_id": app_id},
-        {"$set": {"status": ApplicationStatus.WITHDRAWN}}
+     # Mark as withdrawn; closed_at starts the attachment retention period (utils/gridfs_gc.py)
+    now = datetime.now(timezone.utc)
+    result = await collections["applications"].update_one(
+        {"_id": app_id, "status": app["status"]},
+        {"$set": {"status": ApplicationStatus.WITHDRAWN, "closed_at": now, "updated_at": now}}
     )
+    # References are dropped once, when the application closes
+    if result.modified_count and app["status"] not in CLOSED_STATUSES:
+        await release_attachments(app)
     return {"message": "Your application is successfully Withdrawn"}
 
 # ---------------------------------------------------------------------
@@ -292,13 +279,8 @@ def normalize_status(value: str | None) -> str | None:
         return None
 
 
-# GET endpoint to fetch applications with optional filters
-@application_router.get("/", response_model=List[Application])
-async def get_applications(
-    job_rr_id: Optional[str] = Query(None, description="Filter by job requisition ID"),
-    status: Optional[str] = Query(None, description="Filter by status"),
-    current_user: dict = Depends(get_current_user),
-):
+# Shared by the listing and the export: validate the filters and build the MongoDB query
+def build_applications_query(job_rr_id: Optional[str], status: Optional[str]) -> dict:
     # Step 1: Normalize the status input to match Enum values
     norm_status = normalize_status(status)
 
@@ -322,10 +304,24 @@ async def get_applications(
     else:
         # If no filters are provided, return all applications
         query = {}
+    return query
 
-    # Step 4: Execute query against MongoDB collection
-    cursor = collections["applications"].find(query)
-    applications = await cursor.to_list(length=100)  # Limit results to 100
+
+# GET endpoint to fetch applications with optional filters
+# Paged with ?cursor=<next_cursor from the previous page>
+@application_router.get("/")
+async def get_applications(
+    job_rr_id: Optional[str] = Query(None, description="Filter by job requisition ID"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user),
+):
+    # Steps 1-3: Validate the filters and build the MongoDB query
+    query = build_applications_query(job_rr_id, status)
+
+    # Step 4: Execute query against MongoDB collection, one page at a time
+    applications, next_cursor = await paginate(collections["applications"], query, APPLICATIONS_SORT, limit, cursor)
 
     # Step 5: Normalize statuses from DB before returning
     normalized_apps = []
@@ -338,9 +334,60 @@ async def get_applications(
         # Convert raw MongoDB document into Application Pydantic model
         normalized_apps.append(Application(**app))
 
-    # Step 6: If no applications found, raise 404 Not Found
-    if not normalized_apps:
+    # Step 6: If no applications found, raise 404 Not Found (an empty later page is just the end)
+    if not normalized_apps and not cursor:
         raise HTTPException(status_code=404, detail="No applications found for given criteria")
 
-    # Step 7: Return the list of normalized Application models
-    return normalized_apps
+    # Step 7: Return the page of normalized Application models
+    return page_response(normalized_apps, next_cursor)
+
+
+# Streaming NDJSON / CSV export with the same filters as GET /application/
+# e.g. /application/export?format=csv&status=Submitted&fields=_id,employee_id,job_rr_id,status
+@application_router.get("/export")
+async def export_applications(
+    format: str = Query("ndjson", description="ndjson or csv"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include"),
+    job_rr_id: Optional[str] = Query(None, description="Filter by job requisition ID"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    current_user: dict = Depends(get_current_user),
+):
+    if current_user["role"] not in ["Admin", "TP Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized to export applications")
+    query = build_applications_query(job_rr_id, status)
+    return stream_export(collections["applications"], query, APPLICATIONS_SORT, format, "applications",
+                         parse_fields(fields))
+
+
+# ---------------------------------------------------------------------
+# DOWNLOAD APPLICATION ATTACHMENTS
+# Applicant, Admin / TP Manager, or the WFM / HM who owns the job
+# Streamed from GridFS (Range / ETag / Last-Modified supported)
+# ---------------------------------------------------------------------
+async def download_attachment(app_id: str, field: str, request: Request, current_user: dict):
+    app = await collections["applications"].find_one({"_id": app_id}, {field: 1, "employee_id": 1, "job_rr_id": 1})
+    if not app:
+        raise HTTPException(404, "Application not found")
+
+    role = current_user["role"]
+    if str(app.get("employee_id")) != str(current_user["employee_id"]) and role not in ("Admin", "TP Manager"):
+        owner_field = {"WFM": "wfm_id", "HM": "hm_id"}.get(role)
+        owns_job = owner_field and await collections["resource_request"].find_one(
+            {"resource_request_id": app.get("job_rr_id"), owner_field: current_user["employee_id"]}, {"_id": 1}
+        )
+        if not owns_job:
+            raise HTTPException(403, "Not authorized to download this file")
+
+    if not app.get(field):
+        raise HTTPException(404, f"No {field.replace('_', ' ')} attached to this application")
+    return await gridfs_download_response(app[field], request)
+
+
+@application_router.get("/{app_id}/resume")
+async def download_application_resume(app_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    return await download_attachment(app_id, "resume", request, current_user)
+
+
+@application_router.get("/{app_id}/cover-letter")
+async def download_application_cover_letter(app_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    return await download_attachment(app_id, "cover_letter", request, current_user)
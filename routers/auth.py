@@ -13,6 +13,7 @@ from utils.security import (
     create_access_token,    # Function to create access token
     create_refresh_token,   # Function to create refresh token
     get_current_user,       # Dependency to get the current logged-in user
+    ensure_active,          # Rejects deactivated users
     SECRET_KEY,             # Secret key used for signing JWTs
     ALGORITHM               # Algorithm used for encoding JWTs
 )
@@ -29,6 +30,7 @@ async def login(username: str, password: str, request:Request):
     user = await collections["users"].find_one({"employee_id": username})
     if not user or not verify_password(password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    ensure_active(user)
    
     # Issue tokens
     access_token = create_access_token({"sub": user["employee_id"], "role": user["role"]})
@@ -202,6 +204,7 @@ async def refresh_token(refresh_token: str):
     user = await collections["users"].find_one({"employee_id": emp_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    ensure_active(user)
 
     # Generate new access and refresh tokens
     new_access_token = create_access_token({"sub": emp_id, "role": user["role"]})
@@ -7,7 +7,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from utils.llm_service import parse_resume_with_llm
-from database import employees,fs
+from database import employees
 from bson import ObjectId
 import base64
 from bson import ObjectId
@@ -16,16 +16,24 @@ import mimetypes
 from utils.file_upload_utils import logger
 
 from utils.employee_service import extract_text_from_bytes, save_to_gridfs
+from utils.document_store import release
 from utils.employee_service import (
     fetch_all_employees,
     fetch_employee_by_id,
-    _serialize,              
+    _serialize,
+    ACTIVE_EMPLOYEE,              
 )
-from database import employees
-from database import get_gridfs
+from database import employees, files
+from fastapi import Request
+from utils.gridfs_utils import gridfs_download_response
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_response
+from utils.export_utils import parse_fields, stream_export
  
 resume_router = APIRouter(prefix="/resume")
 router = APIRouter(prefix="/employees")
+
+# Default listing order (employee_id is unique)
+EMPLOYEES_SORT = [("employee_id", 1)]
 # Defining routers
 hm_router = APIRouter(prefix="/hm")
 wfm_router = APIRouter(prefix="/wfm")
@@ -75,7 +83,7 @@ async def get_hm_employees(
             logger.warning(f"No applications found for job RR ID: {job_rr_id} with 'Allocated' status.")
             return {"message": "No applications found for this job in 'Allocated' status."}
 
-        unique_employee_ids = set(int(app["employee_id"]) for app in allocated_apps)
+        unique_employee_ids = set(str(app["employee_id"]) for app in allocated_apps)
 
         employees_data = await emp_col.find({"employee_id": {"$in": list(unique_employee_ids)}}).to_list(length=100)
 
@@ -118,7 +126,7 @@ async def wfm_view(
             logger.warning(f"No applications found for the given WFM jobs.")
             return {"message": "No applications found for these jobs."}
 
-        emp_ids = {int(app["employee_id"]) for app in apps if app.get("employee_id")}
+        emp_ids = {str(app["employee_id"]) for app in apps if app.get("employee_id")}
 
         if not emp_ids:
             logger.warning(f"No valid employee IDs found in the applications.")
@@ -151,7 +159,7 @@ async def get_employees_from_applications(current_user: Dict[str, Any] = Depends
             logger.warning("No applications found.")
             return {"message": "No applications found."}
 
-        employee_ids = {int(app["employee_id"]) for app in apps if app.get("employee_id")}
+        employee_ids = {str(app["employee_id"]) for app in apps if app.get("employee_id")}
 
         if not employee_ids:
             logger.warning("No valid employee IDs found in the applications.")
@@ -159,7 +167,8 @@ async def get_employees_from_applications(current_user: Dict[str, Any] = Depends
 
         employees_data = await emp_col.find({
             "employee_id": {"$in": list(employee_ids)},
-            "type": "TP"
+            "type": "TP",
+            **ACTIVE_EMPLOYEE
         }).to_list(length=100)
 
         if not employees_data:
@@ -178,11 +187,8 @@ async def get_employees_from_applications(current_user: Dict[str, Any] = Depends
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
 
     
-# ====================== SEARCH (FINAL - WITH EMPLOYEE TYPE) ======================
-@router.get("/search")
-async def search_employees(search: str = Query(..., min_length=1),
-                            current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
-   
+# ====================== SHARED QUERY BUILDERS (list + export) ======================
+def build_employee_search_query(search: str) -> Dict[str, Any]:
     query = {
         "$or": [
             {"employee_name": {"$regex": search, "$options": "i"}},
@@ -200,22 +206,17 @@ async def search_employees(search: str = Query(..., min_length=1),
             # Location & Grade
             {"city": {"$regex": search, "$options": "i"}},
             {"band": {"$regex": search, "$options": "i"}},
-        ]
+        ],
+        **ACTIVE_EMPLOYEE,
     }
  
     # Bonus: If search is a full number → also try exact Employee ID match (faster & accurate)
     if search.strip().isdigit():
-        query["$or"].append({"employee_id": int(search)})
- 
-    cursor = employees.find(query)
-    docs = await cursor.to_list(length=None)
-    result = [_serialize(doc) for doc in docs]
- 
-    return {"count": len(result), "data": result}
- 
- # ====================== FILTER ======================
-@router.get("/filter")
-async def filter_employees(
+        query["$or"].append({"employee_id": search.strip()})
+    return query
+
+
+def employee_filters(
     employee_type: Optional[str] = Query(None, description="TP, Non TP"),
     employment_type: Optional[str] = Query(None, description="Employee, Contractor"),
     city: Optional[str] = Query(None, description="e.g. Bangalore, Chennai"),
@@ -223,44 +224,68 @@ async def filter_employees(
     designation: Optional[str] = Query(None, description="e.g. Tester III"),
     primary_tech: Optional[str] = Query(None, alias="primary", description="e.g. Java"),
     secondary_tech: Optional[str] = Query(None, alias="secondary", description="e.g. Angular"),
+    include_inactive: bool = Query(False, description="Include employees deactivated by a CVR delta upload"),
+) -> Dict[str, Optional[str]]:
+    return {
+        "employee_type": employee_type,
+        "employment_type": employment_type,
+        "city": city,
+        "band": band,
+        "designation": designation,
+        "primary_tech": primary_tech,
+        "secondary_tech": secondary_tech,
+        "include_inactive": include_inactive,
+    }
+
+
+def build_employee_filter_query(filters: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {} if filters.get("include_inactive") else dict(ACTIVE_EMPLOYEE)
+ 
+    if filters["employee_type"]:
+        query["type"] = {"$regex": f"^{filters['employee_type']}$", "$options": "i"}
+    if filters["employment_type"]:
+        query["employment_type"] = {"$regex": f"^{filters['employment_type']}$", "$options": "i"}
+    if filters["city"]:
+        query["city"] = {"$regex": filters["city"], "$options": "i"}
+    if filters["band"]:
+        query["band"] = {"$regex": filters["band"], "$options": "i"}
+    if filters["designation"]:
+        query["designation"] = {"$regex": filters["designation"], "$options": "i"}
+    if filters["primary_tech"]:
+        query["primary_technology"] = {"$regex": filters["primary_tech"], "$options": "i"}
+    if filters["secondary_tech"]:
+        query["secondary_technology"] = {"$regex": filters["secondary_tech"], "$options": "i"}
+    return query
+
+
+# ====================== SEARCH (FINAL - WITH EMPLOYEE TYPE) ======================
+@router.get("/search")
+async def search_employees(search: str = Query(..., min_length=1),
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                            cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+                            current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
+   
+    query = build_employee_search_query(search)
+    docs, next_cursor = await paginate(employees, query, EMPLOYEES_SORT, limit, cursor)
+    result = [_serialize(doc) for doc in docs]
+ 
+    return page_response(result, next_cursor)
+ 
+ # ====================== FILTER ======================
+@router.get("/filter")
+async def filter_employees(
+    filters: Dict[str, Optional[str]] = Depends(employee_filters),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: Dict[str, Any] = Depends(role_guard("Admin"))
     
     ):
  
-    query: Dict[str, Any] = {}
- 
-    if employee_type:
-        query["type"] = {"$regex": f"^{employee_type}$", "$options": "i"}
-    if employment_type:
-        query["employment_type"] = {"$regex": f"^{employment_type}$", "$options": "i"}
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
-    if band:
-        query["band"] = {"$regex": band, "$options": "i"}
-    if designation:
-        query["designation"] = {"$regex": designation, "$options": "i"}
-    if primary_tech:
-        query["primary_technology"] = {"$regex": primary_tech, "$options": "i"}
-    if secondary_tech:
-        query["secondary_technology"] = {"$regex": secondary_tech, "$options": "i"}
-   
-    cursor = employees.find(query)
-    docs = await cursor.to_list(length=None)
+    query = build_employee_filter_query(filters)
+    docs, next_cursor = await paginate(employees, query, EMPLOYEES_SORT, limit, cursor)
     result = [_serialize(doc) for doc in docs]
  
-    return {
-        "count": len(result),
-        "data": result,
-        "applied_filters": {
-            "employee_type": employee_type,
-            "employment_type": employment_type,
-            "city": city,
-            "band": band,
-            "designation": designation,
-            "primary_tech": primary_tech,
-            "secondary_tech": secondary_tech,
-        }
-    }
+    return page_response(result, next_cursor, applied_filters=filters)
  
 # ====================== SORT ======================
  
@@ -275,7 +300,10 @@ async def sort_employees(
         "asc",
         description="asc or desc",
         regex="^(?i)(asc|desc)$"  # also accepts ASC, Desc, etc.
-    ),current_user: Dict[str, Any] = Depends(role_guard("Admin"))
+    ),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: Dict[str, Any] = Depends(role_guard("Admin"))
 ):
     """
     Sort by:
@@ -301,54 +329,51 @@ async def sort_employees(
     normalized = sort_by.strip().lower()
     db_field = field_map.get(normalized, "employee_name")  # safe fallback
  
-    cursor = employees.find().sort(db_field, sort_order)
-    docs = await cursor.to_list(length=None)
+    # employee_id is unique; other fields need _id as a tie-breaker for a stable order
+    sort = [(db_field, sort_order)]
+    if db_field != "employee_id":
+        sort.append(("_id", sort_order))
+    docs, next_cursor = await paginate(employees, ACTIVE_EMPLOYEE, sort, limit, cursor)
     result = [_serialize(doc) for doc in docs]
  
-    return {
-        "count": len(result),
-        "data": result,
-        "sorted_by": db_field,
-        "order": order.lower()
-    }
+    return page_response(result, next_cursor, sorted_by=db_field, order=order.lower())
  
  
  
+# ====================== EXPORT (NDJSON / CSV) ======================
+# Streams the whole directory (or the filtered / searched subset) without loading it into memory.
+# e.g. /employees/export?format=csv&fields=employee_id,employee_name,band&city=Chennai
+@router.get("/export")
+async def export_employees(
+    format: str = Query("ndjson", description="ndjson or csv"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include"),
+    search: Optional[str] = Query(None, min_length=1, description="Same matching as /employees/search"),
+    filters: Dict[str, Optional[str]] = Depends(employee_filters),
+    current_user: Dict[str, Any] = Depends(role_guard("Admin"))
+):
+    query = build_employee_filter_query(filters)
+    if search:
+        query = {"$and": [query, build_employee_search_query(search)]} if query else build_employee_search_query(search)
+    logger.info(f"Employee export ({format}) requested by {current_user.get('employee_id')}")
+    return stream_export(employees, query, EMPLOYEES_SORT, format, "employees", parse_fields(fields))
+ 
+ 
 # ====================== LIST ALL EMPLOYEES ======================
 @router.get("/employees", response_model=List[Dict[str, Any]])
-async def get_employees(current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
+async def get_employees(include_inactive: bool = Query(False, description="Include deactivated employees"),
+                        current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
     try:
-        employees_list = await fetch_all_employees()
+        employees_list = await fetch_all_employees(include_inactive)
         return employees_list
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error fetching employees: {str(e)}"
         )
-# ====================== GET SINGLE EMPLOYEE ======================
-@router.get("/{employee_id}", response_model=Dict[str, Any])
-async def get_employee(employee_id: int,current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
-    try:
-        emp = await fetch_employee_by_id(employee_id)
-        if not emp:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Employee not found"
-            )
-        return emp
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error fetching employee: {str(e)}"
-        )
-       
-
-
 # ====================== RESUME DOWNLOAD - ONLY OWN RESUME ======================
 @router.get("/my-resume")  # ← New clean endpoint
 async def get_my_resume(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     employee_id = current_user.get("employee_id")
@@ -357,7 +382,7 @@ async def get_my_resume(
 
     try:
         employee = await employees.find_one(
-            {"employee_id": int(employee_id)},
+            {"employee_id": str(employee_id)},
             {"resume_file_id": 1, "resume": 1, "employee_name": 1}
         )
         if not employee:
@@ -366,46 +391,21 @@ async def get_my_resume(
         file_id = None
         filename = f"Resume_{employee_id}_{employee.get('employee_name', 'Employee')}.pdf".replace(" ", "_")
 
-        # Try new field first
-        if employee.get("resume_file_id"):
-            try:
-                oid = ObjectId(employee["resume_file_id"])
-                if get_gridfs().get(oid):
-                    file_id = oid
-                    filename = employee.get("resume") or filename
-            except:
-                pass
-
-        # Fallback to old field (legacy support)
-        if not file_id and employee.get("resume"):
-            val = employee["resume"]
+        # Try new field first, then the old field (legacy support)
+        for field in ("resume_file_id", "resume"):
+            val = employee.get(field)
             if isinstance(val, (str, ObjectId)) and ObjectId.is_valid(str(val)):
-                try:
-                    oid = ObjectId(str(val))
-                    if get_gridfs().get(oid):
-                        file_id = oid
-                except:
-                    pass
+                if await files.find_one({"_id": ObjectId(str(val))}, {"_id": 1}):
+                    file_id = ObjectId(str(val))
+                    if field == "resume_file_id":
+                        filename = employee.get("resume") or filename
+                    break
 
         if not file_id:
             raise HTTPException(status_code=404, detail="You have not uploaded a resume yet")
 
-        grid_out = get_gridfs().get(file_id)
-        file_data = grid_out.read()
-        final_filename = grid_out.filename or filename
-
-        mime_type, _ = mimetypes.guess_type(final_filename)
-        if not mime_type:
-            mime_type = "application/pdf"
-
-        return Response(
-            content=file_data,
-            media_type=mime_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="{final_filename}"',
-                "Content-Length": str(grid_out.length),
-            }
-        )
+        # Streamed chunk by chunk from GridFS (supports Range / ETag / Last-Modified)
+        return await gridfs_download_response(file_id, request, filename)
 
     except HTTPException:
         raise
@@ -417,6 +417,27 @@ async def get_my_resume(
  
 
 
+# ====================== GET SINGLE EMPLOYEE ======================
+@router.get("/{employee_id}", response_model=Dict[str, Any])
+async def get_employee(employee_id: str,current_user: Dict[str, Any] = Depends(role_guard("Admin"))):
+    try:
+        emp = await fetch_employee_by_id(employee_id)
+        if not emp:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Employee not found"
+            )
+        return emp
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching employee: {str(e)}"
+        )
+       
+
+
 # ====================== RESUME UPLOAD & PARSING ======================    
  
 def clean_text(text: str) -> str:
@@ -434,7 +455,7 @@ async def upload_resume(
         logger.error("Invalid user session.")
         raise HTTPException(status_code=401, detail="Invalid user session")
 
-    existing_employee = await employees.find_one({"employee_id": int(employee_id)})
+    existing_employee = await employees.find_one({"employee_id": str(employee_id)})
     if existing_employee and existing_employee.get("resume"):
         logger.info("Resume already uploaded for this user.")
         return {
@@ -457,7 +478,7 @@ async def upload_resume(
         raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
     try:
-        file_id = save_to_gridfs(file.filename, file_bytes)
+        file_id = await save_to_gridfs(file.filename, file_bytes, file.content_type)
         logger.info(f"File saved to GridFS with file_id: {file_id}")
     except Exception as e:
         logger.error(f"Error saving file: {str(e)}")
@@ -484,12 +505,13 @@ async def upload_resume(
     }
 
     result = await employees.update_one(
-        {"employee_id": int(employee_id)},
+        {"employee_id": str(employee_id)},
         {"$set": update_body}
     )
 
     if result.matched_count == 0:
         logger.error(f"Profile not found for employee ID: {employee_id}")
+        await release(file_id)  # nobody references the stored resume
         raise HTTPException(status_code=404, detail="Your profile not found")
 
     logger.info(f"Resume uploaded successfully for employee ID: {employee_id}")
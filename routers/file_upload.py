@@ -1,210 +1,186 @@
 # ----------------------------- STANDARD LIB IMPORTS -----------------------------
+import asyncio
+import json
 import os
-
-from datetime import datetime
+from typing import Literal, Optional
 
  
 # ----------------------------- THIRD-PARTY IMPORTS -----------------------------
-import pandas as pd
-from io import BytesIO
- 
-from fastapi import  File, UploadFile, HTTPException,APIRouter,Depends
+from fastapi import  File, UploadFile, HTTPException,APIRouter,Depends,Request,Response,Query
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
 
 from apscheduler.triggers.interval import IntervalTrigger
 
-from models import Employee, ResourceRequest, User
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 # ----------------------------- INTERNAL UTILITIES ------------------------------
+from database import collections
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_response
 from utils.security import get_current_user
 
-from utils.file_upload_utils import log_upload_action,sync_employees_with_db,sync_rr_with_db,read_csv_file,delete_old_files_in_processed,logger,UPLOAD_FOLDER,PROCESSED_FOLDER
+from utils.file_upload_utils import delete_old_files_in_processed,logger
 
-from exceptions.file_upload_exceptions import FileFormatException,ValidationException,ReportProcessingException
+from exceptions.file_upload_exceptions import FileFormatException
+from utils.gridfs_gc import collect_orphaned_files, GC_INTERVAL_HOURS
+from utils.report_reader import REPORT_EXTENSIONS
+from utils.upload_jobs import submit_upload_job, get_upload_job, TERMINAL_STATUSES
  
  
 # Router for file upload related endpoints
 file_upload_router = APIRouter(prefix="/api/upload")
+
+# Seconds between job polls on the SSE progress stream
+JOB_STREAM_POLL_SECONDS = float(os.getenv("UPLOAD_JOB_POLL_SECONDS", "1.0"))
  
-@file_upload_router.post("/employees")
-async def upload_career_velocity(file: UploadFile = File(...),current_user=Depends(get_current_user)):
+
+# Uploads are staged and processed by the upload job workers (utils/upload_jobs.py);
+# the response carries the job id to poll at GET /api/upload/jobs/{job_id}.
+# Re-uploading a file that was already ingested returns the stored result (200)
+# instead of processing it again; pass force=true to re-process.
+def _job_accepted(job: dict, response: Response) -> dict:
+    body = {
+        "message": "Upload accepted for processing",
+        "job_id": job["_id"],
+        "status": job["status"],
+        "status_url": f"/api/upload/jobs/{job['_id']}",
+    }
+    if job.get("duplicate"):
+        body["duplicate"] = True
+        if job["status"] == "done":
+            response.status_code = 200
+            body["message"] = "Identical file already ingested; returning the stored result (use force=true to re-process)"
+            body["result"] = job["result"]
+            body["ingested_at"] = job["ingested_at"]
+        else:
+            body["message"] = "Identical file is already being processed"
+    return body
+
+
+@file_upload_router.post("/employees", status_code=202)
+async def upload_career_velocity(response: Response, file: UploadFile = File(...), force: bool = False,
+                                 mode: Literal["full", "delta"] = "full",
+                                 current_user=Depends(get_current_user)):
+    # mode=delta: only changed / removed rows keyed by Employee ID (utils/cvr_delta.py)
     # Only Admin can upload employee data
     if current_user["role"] !="Admin":
         logger.error(f"Unauthorized attempt of logging for employee data upload")
         return HTTPException(status_code=409,detail="Not Authorized")
     
-    # Read uploaded file into memory
-    content = await file.read()
-    
     # Validate file extension
-    if not file.filename.lower().endswith((".xlsx", ".xls", ".csv")):
-        raise FileFormatException("Only .xlsx, .xls, or .csv files allowed")
- 
-    # Load file into DataFrame (CSV or Excel)
-    try:
-        df = (pd.read_csv(BytesIO(content), encoding="utf-8", dtype=str, engine="python", on_bad_lines="skip")
-              if file.filename.endswith(".csv") else pd.read_excel(BytesIO(content)))
-        # Drop rows that are completely empty
-        df = df.dropna(how="all")
-    except Exception as e:
-        # Wrap any read error in a domain-specific exception
-        raise ReportProcessingException(f"Failed to read file: {e}")
+    if not file.filename.lower().endswith(REPORT_EXTENSIONS):
+        raise FileFormatException(f"Only {', '.join(REPORT_EXTENSIONS)} files allowed")
  
-    # Required columns for employee upload
-    required = ["Employee ID", "Employee Name", "Designation", "Band","Primary Technology", "City", "Type"]
-    if missing := [c for c in required if c not in df.columns]:
-        # If any required column is missing, fail the validation
-        raise ValidationException(f"Missing columns: {missing}")
- 
-    # Lists to track valid employees/users and row-wise errors
-    valid_emps, valid_users, errors = [], [], []
-    
-    # Iterate row-by-row to validate and construct Employee/User objects
-    for idx, row in df.iterrows():
-        # Clean NaN values and strip whitespace
-        row_dict = {k: None if pd.isna(v) else str(v).strip() for k, v in row.to_dict().items()}
-        try:
-            # Validate using Pydantic model
-            emp = Employee(**row_dict)
-            # Create corresponding User with role from employee type
-            user = User(employee_id=str(emp.employee_id), role=emp.type)
-            valid_emps.append(emp)
-            valid_users.append(user)
-        except Exception as e:
-            # Capture validation error with row number (Excel-style index + 2 for header offset)
-            errors.append({"row": idx + 2, "error": str(e)})
- 
-    # Log upload attempt in audit log
-    await log_upload_action("employees", file.filename,
-                            "CSV" if file.filename.endswith(".csv") else "Excel",
-                            current_user["employee_id"], len(df), len(valid_emps), len(errors), errors)
- 
-    # If no valid employee rows, return early with error sample
-    if not valid_emps:
-        return {"message": "No valid employees found", "errors_sample": errors[:5]}
- 
-    # Sync valid employees and users into DB
-    result = await sync_employees_with_db(valid_emps, valid_users)
-    return {
-        "message": "Career Velocity processed successfully",
-        "processed": len(valid_emps),
-        "failed": len(errors),
-        "errors_sample": errors[:5],
-        "sync": result
-    }
+    kind = "employees_delta" if mode == "delta" else "employees"
+    job = await submit_upload_job(kind, file.filename, current_user["employee_id"],
+                                  source=file.file, force=force)
+    return _job_accepted(job, response)
  
 
-@file_upload_router.post("/rr-report")
-async def upload_rr_report(file: UploadFile = File(...),current_user=Depends(get_current_user)):
+@file_upload_router.post("/rr-report", status_code=202)
+async def upload_rr_report(response: Response, file: UploadFile = File(...), force: bool = False,
+                           current_user=Depends(get_current_user)):
     # Only HM or Admin can upload RR report
     if current_user["role"] not in  ["HM","Admin"]:
         logger.error(f"Unauthorized attempt of logging for rr_report upload")
         return HTTPException(status_code=409,detail="Not Authorized")
     
-    # Read entire file into memory
-    content = await file.read()
-    
     # Validate file extension
-    if not file.filename.lower().endswith((".xlsx", ".xls", ".csv")):
-        raise FileFormatException("Only Excel/CSV files allowed")
- 
-    try:
-        # ------------------------ CSV HANDLING (Robust Reader) ------------------------
-        if file.filename.lower().endswith(".csv"):
-            df = read_csv_file(content)
-            # Ensure CSV actually has data
-            if df is None or df.empty:
-                raise ReportProcessingException("CSV file contains no valid rows")
-
-        # ------------------------ EXCEL HANDLING (Pandas) ------------------------
-        else:
-            # Skip first 6 rows (likely metadata/header noise) and read as strings
-            df = pd.read_excel(BytesIO(content), skiprows=6, dtype=str)
-            # Drop fully empty rows
-            df = df.dropna(how="all")
-    except Exception as e:
-        # Wrap any processing/read error
-        raise ReportProcessingException(f"Failed to read RR report: {e}")
- 
-    # Ensure key column for RR exists
-    if "Resource Request ID" not in df.columns:
-        raise ValidationException("Column 'Resource Request ID' is required")
+    if not file.filename.lower().endswith(REPORT_EXTENSIONS):
+        raise FileFormatException(f"Only {', '.join(REPORT_EXTENSIONS)} files allowed")
  
-    # Lists to collect valid RRs and errors
-    valid_rrs, errors = [], []
-    
-    # Process each row from the RR report
-    for idx, row in df.iterrows():
-        rr_id = row.get("Resource Request ID")
-        # Skip rows without RR ID
-        if not rr_id or pd.isna(rr_id):
-            continue
-        # Clean NaN but preserve actual values
-        row_dict = {k: None if pd.isna(v) else v for k, v in row.to_dict().items()}
-        # Newly uploaded entries considered active
-        row_dict["rr_status"] = True
-        try:
-            # Validate and construct ResourceRequest model
-            valid_rrs.append(ResourceRequest(**row_dict))
-        except Exception as e:
-            # Row index offset +8 assuming original Excel header structure
-            errors.append({"row": idx + 8, "rr_id": str(rr_id), "error": str(e)})
- 
-    # Audit log entry for RR upload
-    await log_upload_action("rr_report", file.filename,
-                            "CSV" if file.filename.endswith(".csv") else "Excel",
-                            current_user["employee_id"], len(df), len(valid_rrs), len(errors), errors)
- 
-    # If no valid RRs, return early with errors
-    if not valid_rrs:
-        return {"message": "No valid RRs found", "errors_sample": errors[:5]}
- 
-    # Sync RR data with DB (insert/reactivate/deactivate logic handled inside)
-    await sync_rr_with_db(valid_rrs)
-    return {
-        "message": "RR Report processed successfully",
-        "valid_requests": len(valid_rrs),
-        "failed": len(errors),
-        "errors_sample": errors[:5]
-    }
+    job = await submit_upload_job("rr_report", file.filename, current_user["employee_id"],
+                                  source=file.file, force=force)
+    return _job_accepted(job, response)
 
 
-# ----------------------------- BACKGROUND RR PROCESSOR -----------------------------
-async def process_updated_rr_report():
-    # List all files present in unprocessed upload folder
-    files = [f for f in os.listdir(UPLOAD_FOLDER)
-             if f.lower().endswith((".xlsx", ".xls", ".csv"))]
-    
-    # If no unprocessed files, nothing to do
-    if not files:
-        return
- 
-    # Pick the "latest" based on lexical sort (typically last modified name pattern)
-    latest = sorted(files)[-1]
-    src = os.path.join(UPLOAD_FOLDER, latest)
-    # Build destination path in processed folder with timestamp prefix
-    dst = os.path.join(PROCESSED_FOLDER, f"{datetime.now():%Y%m%d_%H%M%S}_{latest}")
- 
-    try:
-        # Open the file in binary mode for re-wrapping as UploadFile
-        with open(src, "rb") as f:
-            fake_file = UploadFile(filename=latest, file=BytesIO(f.read()))
-        # Call the same upload_rr_report API internally with a system HM user
-        await upload_rr_report(fake_file,{"role":"HM","employee_id":"system"})
-        # Move the successfully processed file to processed folder
-        os.rename(src, dst)
-        logger.info(f"Auto-processed RR: {latest} → processed/")
-    except Exception as e:
-        # Log any failure while auto-processing
-        logger.error(f"Auto RR failed for {latest}: {e}")
+# ----------------------------- UPLOAD JOB STATUS -----------------------------
+def _job_view(job: dict) -> dict:
+    job = dict(job)
+    job["job_id"] = job.pop("_id")
+    job.pop("staged_path", None)
+    job.pop("move_to", None)
+    job.pop("quarantine_to", None)
+    job.pop("fingerprint", None)
+    job.pop("active_fingerprint", None)
+    return job
+
+
+async def _job_events(job_id: str, request: Request):
+    # Server-sent events: one "progress" event per change, then a final "done"/"failed" event
+    last = None
+    while True:
+        job = _job_view(await get_upload_job(job_id))
+        snapshot = json.dumps(job, default=str)
+        if snapshot != last:
+            last = snapshot
+            event = job["status"] if job["status"] in TERMINAL_STATUSES else "progress"
+            yield f"event: {event}\ndata: {snapshot}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+        if await request.is_disconnected():
+            return
+        await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
+
+
+@file_upload_router.get("/jobs/{job_id}")
+async def get_upload_job_status(job_id: str, request: Request, stream: bool = False,
+                                current_user=Depends(get_current_user)):
+    job = await get_upload_job(job_id)
+    # Uploaders see their own jobs; Admin sees all
+    if current_user["role"] != "Admin" and job["uploaded_by"] != current_user["employee_id"]:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+
+    # ?stream=true or Accept: text/event-stream -> SSE progress stream
+    if stream or "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(_job_events(job_id, request), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    return _job_view(job)
+
+
+# ----------------------------- UPLOAD ROW ERRORS -----------------------------
+UPLOAD_ERRORS_SORT = [("row", 1), ("_id", 1)]
+
+
+# upload_id is returned in the job result (and is the audit log entry's id).
+# Errors come in file row order, paged with ?cursor=<next_cursor from the previous page>;
+# filter by report column (?column=City) and / or Pydantic error type (?error_type=missing).
+@file_upload_router.get("/{upload_id}/errors")
+async def get_upload_errors(upload_id: str, column: Optional[str] = None, error_type: Optional[str] = None,
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                            cursor: Optional[str] = None, current_user=Depends(get_current_user)):
+    audit = await collections["audit_logs"].find_one(
+        {"_id": ObjectId(upload_id)} if ObjectId.is_valid(upload_id) else {"_id": None},
+        {"uploaded_by": 1, "failed_rows": 1, "errors_stored": 1, "error_columns": 1, "error_types": 1})
+    if not audit or "errors_stored" not in audit:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    # Uploaders see their own uploads; Admin sees all
+    if current_user["role"] != "Admin" and audit["uploaded_by"] != current_user["employee_id"]:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+
+    query = {"upload_id": audit["_id"]}
+    if column:
+        query["columns"] = column
+    if error_type:
+        query["error_types"] = error_type
+    errors, next_cursor = await paginate(collections["upload_errors"], query, UPLOAD_ERRORS_SORT, limit, cursor,
+                                         {"upload_id": 0, "audit_type": 0})
+    for error in errors:
+        error["_id"] = str(error["_id"])
+    return page_response(errors, next_cursor, upload_id=upload_id, failed_rows=audit["failed_rows"],
+                         error_columns=audit["error_columns"], error_types=audit["error_types"])
+
+
+# RR files dropped into upload_files/unprocessed are picked up continuously by the
+# folder watcher (utils/folder_watcher.py, started in the app lifespan).
 
 
 # ----------------------------- APSCHEDULER SETUP -----------------------------
 # Create AsyncIO-based scheduler instance
 scheduler = AsyncIOScheduler()
-# Job 1: periodically process unprocessed RR files everyday
-scheduler.add_job(process_updated_rr_report, IntervalTrigger(days=1), id="process_updated_files")
-# Job 2: periodically clean old processed files everyday
+# Job 1: periodically clean old processed files everyday
 scheduler.add_job(delete_old_files_in_processed,  IntervalTrigger(days=1) , id="delete_old_files")
+# Job 2: reclaim GridFS files/chunks no application or employee references
+scheduler.add_job(collect_orphaned_files, IntervalTrigger(hours=GC_INTERVAL_HOURS), id="gridfs_gc")
 # Start the scheduler to enable background jobs
 scheduler.start()
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional, List, Union, Any
 from fastapi import Body
 from models import ResourceRequest
 from utils import jobs_crud
 from utils.security import get_current_user
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.export_utils import parse_fields, stream_export
+from database import db
 
 
 # Create a router with the prefix /jobs
@@ -12,10 +15,25 @@ jobs_router = APIRouter(prefix="/jobs")
 
 # Endpoint to get all jobs with optional location filter
 # Accessible by any authenticated user
-@jobs_router.get("/", response_model=List[dict])
-async def get_all_jobs(location: Optional[str] = None, current_user=Depends(get_current_user)):
+# Paged with ?cursor=<next_cursor from the previous page>
+@jobs_router.get("/")
+async def get_all_jobs(location: Optional[str] = None,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: Optional[str] = None,
+                       current_user=Depends(get_current_user)):
     # Delegates job fetching logic to jobs_crud
-    return await jobs_crud.get_jobs(location, current_user)
+    return await jobs_crud.get_jobs(location, current_user, limit, cursor)
+
+# Streaming NDJSON / CSV export of the jobs this user can see (same rules and location filter as GET /jobs/)
+@jobs_router.get("/export")
+async def export_jobs(location: Optional[str] = None,
+                      format: str = Query("ndjson", description="ndjson or csv"),
+                      fields: Optional[str] = Query(None, description="Comma-separated fields to include"),
+                      current_user=Depends(get_current_user)):
+    query, _ = await jobs_crud.build_jobs_query(location, current_user)
+    if query is None:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+    return stream_export(db.resource_request, query, jobs_crud.JOBS_SORT, format, "jobs", parse_fields(fields))
 
 @jobs_router.get("/managers",response_model=List[dict])
 async def get_jobs_under_manager(current_user=Depends(get_current_user)):
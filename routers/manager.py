@@ -3,9 +3,15 @@ from database import collections
 from utils.security import get_current_user
 from datetime import datetime
 from typing import List, Literal, Optional
+from utils.pagination import MAX_PAGE_SIZE, paginate, page_response
+from utils.document_store import release_attachments
+from utils.gridfs_gc import CLOSED_STATUSES
+from utils.employee_service import ACTIVE_EMPLOYEE
 
 manager_router = APIRouter(prefix="/api/manager", tags=["Manager Workflow"])
 
+MANAGER_APPLICATIONS_SORT = [("updated_at", -1), ("_id", -1)]
+
 async def log_audit(action: str, app_id: str, performed_by: str, details: dict = None):
     try:
         user = await collections["users"].find_one({"employee_id": performed_by}, {"role": 1})
@@ -20,19 +26,8 @@ async def log_audit(action: str, app_id: str, performed_by: str, details: dict =
     except Exception as e:
         print(f"Audit log failed: {e}")
 
-def safe_int_conversion(employee_id_str: str) -> int:
-    try:
-        return int(employee_id_str)
-    except (ValueError, TypeError):
-        raise HTTPException(400, f"Invalid employee_id format: {employee_id_str}")
-
 async def get_employee_safely(employee_id_str: str) -> dict:
-    employee = await collections["employees"].find_one({
-        "$or": [
-            {"employee_id": employee_id_str},
-            {"employee_id": safe_int_conversion(employee_id_str)}
-        ]
-    })
+    employee = await collections["employees"].find_one({"employee_id": str(employee_id_str)})
     if not employee:
         raise HTTPException(404, f"Employee not found: {employee_id_str}")
     return employee
@@ -98,12 +93,7 @@ async def update_job_stats_and_employee_type(app_id: str):
     )
 
     if app["status"] == "Allocated":
-        employee = await collections["employees"].find_one({
-            "$or": [
-                {"employee_id": employee_id_str},
-                {"employee_id": safe_int_conversion(employee_id_str)}
-            ]
-        })
+        employee = await collections["employees"].find_one({"employee_id": str(employee_id_str)})
         
         if employee:
             old_type = employee.get("type", "Unknown")
@@ -124,22 +114,21 @@ async def update_job_stats_and_employee_type(app_id: str):
                 "error": "Employee record not found for type update"
             })
 
-async def get_manager_applications(current_user: dict, page: int = 1, limit: int = 50):
+async def get_manager_applications(current_user: dict, limit: int = 50, cursor: Optional[str] = None):
     role = current_user["role"]
     emp_id = current_user["employee_id"]
-    skip = (page - 1) * limit
 
     if role == "TP Manager":
-        tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "TP"}, {"employee_id": 1})]
+        tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "TP", **ACTIVE_EMPLOYEE}, {"employee_id": 1})]
         query = {"employee_id": {"$in": tp_emp_ids}, "status": "Submitted"}
 
     elif role == "WFM":
         job_rr_ids = [j["resource_request_id"] async for j in collections["resource_request"].find({"wfm_id": emp_id}, {"resource_request_id": 1})]
         if not job_rr_ids:
-            return {"applications": [], "total": 0, "page": page, "limit": limit}
+            return page_response([], None, total=0)
 
-        tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "TP"}, {"employee_id": 1})]
-        non_tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "Non TP"}, {"employee_id": 1})]
+        tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "TP", **ACTIVE_EMPLOYEE}, {"employee_id": 1})]
+        non_tp_emp_ids = [str(e["employee_id"]) async for e in collections["employees"].find({"type": "Non TP", **ACTIVE_EMPLOYEE}, {"employee_id": 1})]
         
         query = {
             "job_rr_id": {"$in": job_rr_ids},
@@ -152,31 +141,25 @@ async def get_manager_applications(current_user: dict, page: int = 1, limit: int
     elif role == "HM":
         job_rr_ids = [j["resource_request_id"] async for j in collections["resource_request"].find({"hm_id": emp_id}, {"resource_request_id": 1})]
         if not job_rr_ids:
-            return {"applications": [], "total": 0, "page": page, "limit": limit}
+            return page_response([], None, total=0)
         query = {"job_rr_id": {"$in": job_rr_ids}, "status": "Selected"}
 
     else:
         raise HTTPException(status_code=403, detail="Unauthorized role")
 
     total = await collections["applications"].count_documents(query)
-    cursor = collections["applications"].find(query).sort("updated_at", -1).skip(skip).limit(limit)
-    applications = await cursor.to_list(limit)
+    # Newest first; seeks on (updated_at, _id) instead of skip() so deep pages stay cheap
+    applications, next_cursor = await paginate(collections["applications"], query, MANAGER_APPLICATIONS_SORT, limit, cursor)
     
-    return {
-        "applications": applications,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": (total + limit - 1) // limit
-    }
+    return page_response(applications, next_cursor, total=total)
 
 @manager_router.get("/applications")
 async def list_applications(
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=200),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: dict = Depends(get_current_user)
 ):
-    return await get_manager_applications(current_user, page, limit)
+    return await get_manager_applications(current_user, limit, cursor)
 
 @manager_router.patch("/applications/{app_id}/shortlist")
 async def shortlist(app_id: str, current_user: dict = Depends(get_current_user)):
@@ -376,17 +359,21 @@ async def reject_candidate(
         raise HTTPException(400, "Cannot reject: candidate is selected. Contact HM to deallocate first.")
    
     result = await collections["applications"].update_one(
-        {"_id": app_id},
+        {"_id": app_id, "status": app["status"]},
         {"$set": {
             "status": "Rejected",
             "rejected_by": current_user["employee_id"],
             "rejected_at": datetime.utcnow(),
             "rejection_reason": reason,
+            "closed_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }}
     )
    
     if result.modified_count:
+        # References are dropped once, when the application closes
+        if app["status"] not in CLOSED_STATUSES:
+            await release_attachments(app)
         await log_audit("reject_candidate", app_id, current_user["employee_id"], {"reason": reason})
         await update_job_stats_and_employee_type(app_id)
         return {"message": "Candidate Rejected"}
@@ -514,10 +501,9 @@ async def get_skill_matches(
  
     pipeline = [
         {"$match": {"job_rr_id": job_rr_id, "status": "Submitted"}},
-        {"$addFields": {"employee_id_int": {"$toInt": "$employee_id"}}},
         {"$lookup": {
             "from": "employees",
-            "localField": "employee_id_int",
+            "localField": "employee_id",
             "foreignField": "employee_id",
             "as": "employee_data"
         }},
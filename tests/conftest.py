@@ -0,0 +1,33 @@
+# --------------------------- IMPORTS ---------------------------
+import os
+
+import pytest
+from mongomock.collection import BulkOperationBuilder
+from mongomock_motor import AsyncMongoMockClient
+
+# Modules read their settings at import time; never reach a real server from the tests
+os.environ.setdefault("MONGODB_CLIENT", "mongodb://localhost:27017/?serverSelectionTimeoutMS=200")
+
+import database  # noqa: E402
+
+
+# --------------------------- MONGOMOCK COMPAT ---------------------------
+# pymongo >= 4.11 passes `sort` to bulk update / replace ops; mongomock does not know it yet
+def _drop_sort(method):
+    def wrapper(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+BulkOperationBuilder.add_update = _drop_sort(BulkOperationBuilder.add_update)
+BulkOperationBuilder.add_replace = _drop_sort(BulkOperationBuilder.add_replace)
+
+
+# --------------------------- FIXTURES ---------------------------
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory database behind database.collections for the duration of one test."""
+    mock_db = AsyncMongoMockClient()["tms_test"]
+    for name in list(database.collections):
+        monkeypatch.setitem(database.collections, name, mock_db[name])
+    return mock_db
@@ -0,0 +1,180 @@
+import pandas as pd
+import pytest
+
+from utils.cvr_delta import DEACTIVATE, REACTIVATE, UPDATE, _merge_changes, apply_cvr_delta, parse_cvr_delta
+from utils.cvr_validation import validate_career_velocity
+from utils.file_upload_utils import sync_employees_with_db
+
+SKILLS = "Detailed Skill Set (List of top skills on profile)"
+
+
+def _cvr_row(employee_id: str, **overrides) -> dict:
+    row = {
+        "Employee ID": employee_id, "Employee Name": "Asha", "Employment Type": "Employee",
+        "Designation": "Developer", "Band": "B2", "City": "Chennai", "Location Description": "Chennai",
+        "Primary Technology": "Python", "Secondary Technology": "SQL", SKILLS: "Python, SQL", "Type": "TP",
+    }
+    return {**row, **overrides}
+
+
+def _frame(rows: list) -> pd.DataFrame:
+    # Index = spreadsheet row number, as the readers produce it
+    return pd.DataFrame(rows, index=range(2, len(rows) + 2))
+
+
+def _change(employee_id: str, action: str = UPDATE, row: int = 2, set_=None, unset=None) -> dict:
+    return {"row": row, "employee_id": employee_id, "action": action, "set": set_ or {}, "unset": unset or []}
+
+
+async def _full_sync(db, *rows):
+    employees, users, errors = validate_career_velocity(_frame(list(rows)), 0)
+    assert not errors
+    return await sync_employees_with_db(employees, users)
+
+
+# --------------------------- PARSING ---------------------------
+def test_parse_only_touches_present_non_blank_columns():
+    changes, errors = parse_cvr_delta(_frame([{"Employee ID": "101.0", "Band": " c1 ", "City": None}]))
+    assert errors == []
+    assert changes == [_change("101", set_={"band": "C1"})]
+
+
+def test_parse_unset_marker():
+    changes, errors = parse_cvr_delta(_frame([
+        {"Employee ID": "101", "Band": "<unset>", SKILLS: "<unset>"},
+        {"Employee ID": "102", "City": "<unset>"},
+    ]))
+    assert changes == [_change("101", unset=["band", "detailed_skills"])]
+    assert len(errors) == 1
+    assert errors[0]["row"] == 3
+    assert errors[0]["columns"] == ["City"]
+    assert errors[0]["error_types"] == ["required_unset"]
+
+
+def test_parse_row_errors():
+    changes, errors = parse_cvr_delta(_frame([
+        {"Employee ID": None, "Band": "B1", "Action": None},
+        {"Employee ID": "abc", "Band": "B1", "Action": None},
+        {"Employee ID": "103", "Band": "Z9", "Action": None},
+        {"Employee ID": "104", "Band": "B1", "Action": "ARCHIVE"},
+    ]))
+    assert changes == []
+    assert [(e["row"], e["columns"], e["error_types"]) for e in errors] == [
+        (2, ["Employee ID"], ["missing"]),
+        (3, ["Employee ID"], ["value_error"]),
+        (4, ["Band"], ["value_error"]),
+        (5, ["Action"], ["unknown_action"]),
+    ]
+
+
+def test_parse_actions_ignore_field_columns():
+    changes, errors = parse_cvr_delta(_frame([
+        {"Employee ID": "101", "Band": "B1", "Action": "remove"},
+        {"Employee ID": "102", "Band": "B1", "Action": "Reactivate"},
+    ]))
+    assert errors == []
+    assert changes == [_change("101", DEACTIVATE), _change("102", REACTIVATE, row=3)]
+
+
+# --------------------------- MERGING ---------------------------
+def test_merge_updates_in_file_order():
+    merged = _merge_changes([
+        _change("101", set_={"band": "B1", "city": "Pune"}),
+        _change("101", row=3, unset=["band"]),
+        _change("101", row=4, set_={"city": "Kochi"}),
+    ])
+    assert merged == {"101": _change("101", row=4, set_={"city": "Kochi"}, unset=["band"])}
+
+
+@pytest.mark.parametrize("action", [DEACTIVATE, REACTIVATE])
+def test_merge_status_change_then_edit_keeps_both(action):
+    merged = _merge_changes([_change("101", action), _change("101", row=3, set_={"city": "Pune"})])
+    assert merged["101"]["action"] == action
+    assert merged["101"]["set"] == {"city": "Pune"}
+
+
+def test_merge_edit_then_status_change_keeps_both():
+    merged = _merge_changes([_change("101", set_={"city": "Pune"}), _change("101", DEACTIVATE, row=3)])
+    assert merged["101"]["action"] == DEACTIVATE
+    assert merged["101"]["set"] == {"city": "Pune"}
+
+
+def test_merge_last_status_change_wins():
+    merged = _merge_changes([_change("101", DEACTIVATE), _change("101", REACTIVATE, row=3)])
+    assert merged["101"]["action"] == REACTIVATE
+
+
+def test_merge_does_not_mutate_input():
+    first = _change("101", set_={"city": "Pune"})
+    _merge_changes([first, _change("101", row=3, set_={"band": "B1"})])
+    assert first["set"] == {"city": "Pune"}
+
+
+# --------------------------- APPLYING ---------------------------
+async def _apply(rows: list):
+    df = _frame(rows)
+    changes, errors = parse_cvr_delta(df)
+    assert errors == []
+    return await apply_cvr_delta(changes, df)
+
+
+@pytest.mark.parametrize("action, active", [("DEACTIVATE", False), ("REACTIVATE", True)])
+async def test_apply_status_change_then_edit(db, action, active):
+    await _full_sync(db, _cvr_row("101"))
+    if active:
+        await _apply([{"Employee ID": "101", "Action": "DEACTIVATE", "City": None}])
+
+    summary, errors = await _apply([
+        {"Employee ID": "101", "Action": action, "City": None},
+        {"Employee ID": "101", "Action": None, "City": "Pune"},
+    ])
+
+    assert errors == []
+    employee = await db.employees.find_one({"employee_id": "101"})
+    user = await db.users.find_one({"employee_id": "101"})
+    assert (employee["status"], employee["city"], user["is_active"]) == (active, "Pune", active)
+    assert summary["employees_updated"] == 1
+    assert summary["employees_deactivated" if not active else "employees_reactivated"] == 1
+
+
+async def test_apply_unset_stores_empty_values(db):
+    await _full_sync(db, _cvr_row("101"))
+    await _apply([{"Employee ID": "101", "Band": "<unset>", SKILLS: "<unset>"}])
+    employee = await db.employees.find_one({"employee_id": "101"})
+    assert employee["band"] is None
+    assert employee["detailed_skills"] == []
+
+
+async def test_apply_type_change_updates_employee_roles_only(db):
+    await _full_sync(db, _cvr_row("101"), _cvr_row("102"))
+    await db.users.update_one({"employee_id": "102"}, {"$set": {"role": "HM"}})
+
+    await _apply([{"Employee ID": "101", "Type": "Non TP"}, {"Employee ID": "102", "Type": "Non TP"}])
+
+    roles = {u["employee_id"]: u["role"] async for u in db.users.find({})}
+    assert roles == {"101": "Non TP", "102": "HM"}
+
+
+async def test_apply_unknown_ids(db):
+    summary, errors = await _apply([
+        _cvr_row("201"),
+        {**{k: None for k in _cvr_row("0")}, "Employee ID": "202", "Action": "DEACTIVATE"},
+    ])
+    assert summary["employees_inserted"] == 1
+    assert [(e["row"], e["error_types"]) for e in errors] == [(3, ["not_found"])]
+    assert await db.users.find_one({"employee_id": "201"})
+
+
+# --------------------------- FULL SYNC AFTER A DELTA ---------------------------
+async def test_full_sync_reactivates_user_and_refreshes_role(db):
+    await _full_sync(db, _cvr_row("101"), _cvr_row("102"))
+    await db.users.update_one({"employee_id": "101"}, {"$set": {"password": "changed"}})
+    await db.users.update_one({"employee_id": "102"}, {"$set": {"role": "Admin"}})
+    await _apply([{"Employee ID": "101", "Action": "DEACTIVATE"}, {"Employee ID": "102", "Action": "DEACTIVATE"}])
+
+    await _full_sync(db, _cvr_row("101", Type="Non TP"), _cvr_row("102", Type="Non TP"))
+
+    users = {u["employee_id"]: u async for u in db.users.find({})}
+    assert (users["101"]["is_active"], users["101"]["role"], users["101"]["password"]) == (True, "Non TP", "changed")
+    assert (users["102"]["is_active"], users["102"]["role"]) == (True, "Admin")
+    assert await db.employees.count_documents({"status": True}) == 2
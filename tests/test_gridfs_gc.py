@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from utils import gridfs_gc
+from utils.gridfs_gc import GC_CLOSED_APPLICATION_RETENTION_DAYS, _delete_file, _referenced_file_ids
+
+NOW = datetime.now(timezone.utc)
+EXPIRED = NOW - timedelta(days=GC_CLOSED_APPLICATION_RETENTION_DAYS + 1)
+RECENT = NOW - timedelta(days=1)
+
+
+class _Bucket:
+    """Stands in for the GridFS bucket: records deleted file ids."""
+
+    def __init__(self):
+        self.deleted = []
+
+    async def delete(self, file_id):
+        self.deleted.append(file_id)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    fake = _Bucket()
+    monkeypatch.setattr(gridfs_gc, "fs_bucket", fake)
+    return fake
+
+
+# --------------------------- MARK ---------------------------
+async def test_mark_keeps_live_references(db):
+    ids = {name: ObjectId() for name in ("draft", "ref_counted", "released", "employee", "legacy_str")}
+    await db.applications.insert_one({"_id": "a1", "status": "Draft", "resume": ids["draft"]})
+    await db.documents.insert_many([
+        {"_id": "sha-live", "file_id": ids["ref_counted"], "ref_count": 1},
+        {"_id": "sha-dead", "file_id": ids["released"], "ref_count": 0},
+    ])
+    await db.employees.insert_many([
+        {"employee_id": "101", "resume": ids["employee"]},
+        {"employee_id": "102", "resume_file_id": str(ids["legacy_str"])},
+    ])
+
+    referenced = await _referenced_file_ids(NOW)
+
+    assert referenced == {ids["draft"], ids["ref_counted"], ids["employee"], ids["legacy_str"]}
+
+
+async def test_mark_closed_application_retention(db):
+    ids = [ObjectId() for _ in range(5)]
+    await db.applications.insert_many([
+        {"_id": "withdrawn-old", "status": "Withdrawn", "closed_at": EXPIRED, "resume": ids[0]},
+        {"_id": "rejected-recent", "status": "Rejected", "closed_at": RECENT, "resume": ids[1]},
+        # Rejected before closed_at existed: rejected_at decides
+        {"_id": "rejected-legacy", "status": "Rejected", "rejected_at": EXPIRED, "resume": ids[2]},
+        # Withdrawn before closed_at existed: no reliable date, stays pinned
+        {"_id": "withdrawn-legacy", "status": "Withdrawn", "resume": ids[3]},
+        # closed_at only counts while the application is closed
+        {"_id": "submitted", "status": "Submitted", "closed_at": EXPIRED, "resume": ids[4]},
+    ])
+
+    referenced = await _referenced_file_ids(NOW)
+
+    assert [oid in referenced for oid in ids] == [False, True, False, True, True]
+
+
+# --------------------------- SWEEP ---------------------------
+async def test_delete_respects_ref_count_and_grace(db, bucket):
+    grace_cutoff = NOW - timedelta(hours=1)
+    files = {name: ObjectId() for name in ("released", "referenced", "touched", "untracked")}
+    await db.documents.insert_many([
+        {"_id": "sha-released", "file_id": files["released"], "ref_count": 0, "updated_at": EXPIRED},
+        {"_id": "sha-referenced", "file_id": files["referenced"], "ref_count": 1, "updated_at": EXPIRED},
+        {"_id": "sha-touched", "file_id": files["touched"], "ref_count": 0, "updated_at": NOW},
+    ])
+
+    results = {name: await _delete_file({"_id": oid, "sha256": f"sha-{name}" if name != "untracked" else None},
+                                        grace_cutoff)
+               for name, oid in files.items()}
+
+    assert results == {"released": True, "referenced": False, "touched": False, "untracked": True}
+    assert bucket.deleted == [files["released"], files["untracked"]]
+    assert await db.documents.count_documents({}) == 2
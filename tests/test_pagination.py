@@ -0,0 +1,94 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import decode_cursor, encode_cursor, keyset_filter, paginate
+
+SORT = [("band", 1), ("_id", 1)]
+
+
+# --------------------------- CURSOR TOKENS ---------------------------
+def test_cursor_round_trip():
+    token = encode_cursor(SORT, {"_id": 7, "band": "B2", "city": "Chennai"})
+    assert "=" not in token
+    assert decode_cursor(token, SORT) == ["B2", 7]
+
+
+def test_cursor_round_trip_null_and_missing_values():
+    assert decode_cursor(encode_cursor(SORT, {"_id": 3, "band": None}), SORT) == [None, 3]
+    assert decode_cursor(encode_cursor(SORT, {"_id": 4}), SORT) == [None, 4]
+
+
+def test_cursor_from_another_sort_is_rejected():
+    token = encode_cursor(SORT, {"_id": 1, "band": "A1"})
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, [("city", 1), ("_id", 1)])
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", "e30"])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, SORT)
+    assert exc.value.status_code == 400
+
+
+# --------------------------- SEEK ---------------------------
+def test_keyset_filter_single_field():
+    assert keyset_filter([("_id", 1)], [5]) == {"_id": {"$gt": 5}}
+    assert keyset_filter([("_id", -1)], [5]) == {"$or": [{"_id": {"$lt": 5}}, {"_id": None}]}
+
+
+def test_keyset_filter_tie_breaker():
+    assert keyset_filter(SORT, ["B2", 7]) == {"$or": [
+        {"band": {"$gt": "B2"}},
+        {"band": "B2", "_id": {"$gt": 7}},
+    ]}
+
+
+def test_keyset_filter_null_ascending_continues_with_non_null():
+    assert keyset_filter(SORT, [None, 7]) == {"$or": [
+        {"band": {"$ne": None}},
+        {"band": None, "_id": {"$gt": 7}},
+    ]}
+
+
+def test_keyset_filter_descending_keeps_trailing_nulls():
+    assert keyset_filter([("band", -1), ("_id", -1)], ["B2", 7]) == {"$or": [
+        {"$or": [{"band": {"$lt": "B2"}}, {"band": None}]},
+        {"band": "B2", "$or": [{"_id": {"$lt": 7}}, {"_id": None}]},
+    ]}
+    assert keyset_filter([("band", -1), ("_id", -1)], [None, 7]) == {"$or": [
+        {"band": {"$in": []}},
+        {"band": None, "$or": [{"_id": {"$lt": 7}}, {"_id": None}]},
+    ]}
+
+
+# --------------------------- PAGINATE ---------------------------
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_paginate_visits_every_row_once_with_nulls(db, direction):
+    bands = ["A1", None, "B2", "A1", None, "C3", "B2", None]
+    await db.employees.insert_many(
+        [{"_id": i, "band": band} for i, band in enumerate(bands)]
+        + [{"_id": 100}]  # band missing altogether
+    )
+    sort = [("band", direction), ("_id", direction)]
+
+    seen, cursor = [], None
+    while True:
+        docs, cursor = await paginate(db.employees, {}, sort, limit=2, cursor=cursor)
+        seen += [doc["_id"] for doc in docs]
+        if cursor is None:
+            break
+
+    expected = [doc["_id"] for doc in await db.employees.find({}).sort(sort).to_list(None)]
+    assert seen == expected
+    assert sorted(seen) == sorted(list(range(len(bands))) + [100])
+
+
+async def test_paginate_applies_query_with_cursor(db):
+    await db.employees.insert_many([{"_id": i, "city": "Chennai" if i % 2 else "Pune"} for i in range(10)])
+    docs, cursor = await paginate(db.employees, {"city": "Chennai"}, [("_id", 1)], limit=3)
+    assert [d["_id"] for d in docs] == [1, 3, 5]
+    docs, cursor = await paginate(db.employees, {"city": "Chennai"}, [("_id", 1)], limit=3, cursor=cursor)
+    assert [d["_id"] for d in docs] == [7, 9]
+    assert cursor is None
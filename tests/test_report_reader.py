@@ -0,0 +1,153 @@
+import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from exceptions.file_upload_exceptions import ValidationException
+from utils.file_upload_utils import read_csv_file
+from utils.report_reader import iter_arrow_batches, iter_excel_batches
+from utils.upload_pipelines import report_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+KEYS = ["Employee ID", "Band"]
+
+
+def _xlsx(path, sheets: dict, active: int = 0):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    workbook.active = active
+    workbook.save(path)
+    return str(path)
+
+
+def _read(path, key_columns=KEYS, **kwargs) -> pd.DataFrame:
+    return pd.concat(list(iter_excel_batches(str(path), "report.xlsx", key_columns, **kwargs)))
+
+
+# --------------------------- XLSX ---------------------------
+def test_xlsx_header_is_found_below_a_preamble(tmp_path):
+    path = _xlsx(tmp_path / "r.xlsx", {"RR": [
+        ["Resource Request Report"],
+        ["Generated", "2026-01-01"],
+        [],
+        ["Employee ID", "Band", None, "City"],
+        [101, "B2", "x", "Chennai"],
+        [None, None, None, None],
+        [102, "C1"],
+    ]})
+    df = _read(path)
+    assert list(df.columns) == ["Employee ID", "Band", "Unnamed: 2", "City"]
+    # Index = spreadsheet row; the blank row 6 is skipped and short rows are padded
+    assert list(df.index) == [5, 7]
+    assert df.loc[7].tolist() == [102, "C1", None, None]
+
+
+def test_xlsx_reads_the_first_sheet_not_the_active_one(tmp_path):
+    path = _xlsx(tmp_path / "r.xlsx", {
+        "Report": [["Employee ID", "Band"], [101, "B2"]],
+        "Notes": [["Employee ID", "Band"], [999, "Z9"]],
+    }, active=1)
+    assert _read(path)["Employee ID"].tolist() == [101]
+
+
+def test_xlsx_missing_columns(tmp_path):
+    path = _xlsx(tmp_path / "r.xlsx", {"RR": [["Employee ID", "City"], [101, "Chennai"]]})
+    with pytest.raises(ValidationException, match="Band"):
+        _read(path)
+
+
+def test_xlsx_as_str_and_batching(tmp_path):
+    path = _xlsx(tmp_path / "r.xlsx", {"RR": [["Employee ID", "Band"]] + [[100 + i, "B2"] for i in range(5)]})
+    batches = list(iter_excel_batches(path, "r.xlsx", KEYS, batch_size=2, as_str=True))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0]["Employee ID"].tolist() == ["100", "101"]
+    assert list(batches[-1].index) == [6]
+
+
+# --------------------------- CSV ---------------------------
+def test_read_csv_file_drops_blank_rows_and_pads_short_ones(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_bytes("Resource Request ID,City,Band\n12345678_1,Chennai,B2\n , , \n12345678_2,Pune\n".encode())
+    df = read_csv_file(str(path))
+    assert list(df.columns) == ["Resource Request ID", "City", "Band"]
+    assert df.values.tolist() == [["12345678_1", "Chennai", "B2"], ["12345678_2", "Pune", ""]]
+    assert read_csv_file(path.read_bytes()).equals(df)
+
+
+def test_read_csv_file_detects_non_utf8(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_bytes("Resource Request ID,City\n12345678_1,Malmö\n".encode("cp1252"))
+    assert read_csv_file(str(path))["City"].tolist() == ["Malmö"]
+
+
+def test_read_csv_file_empty(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_bytes(b"\n\n")
+    assert read_csv_file(str(path)) is None
+
+
+def test_report_batches_csv_columns(tmp_path):
+    path = tmp_path / "cvr.csv"
+    path.write_text("Employee ID,Employee Name\n101,Asha\n")
+    with pytest.raises(ValidationException, match="Band"):
+        next(report_batches("employees", str(path), "cvr.csv"))
+    df = next(report_batches("employees_delta", str(path), "cvr.csv"))
+    # Index = file line number, values as strings
+    assert df.loc[2].tolist() == ["101", "Asha"]
+
+
+# --------------------------- PARQUET / ARROW ---------------------------
+@pytest.fixture(params=["report.parquet", "report.arrow", "stream.ipc"])
+def arrow_file(request, tmp_path):
+    if pa is None:
+        pytest.skip("pyarrow is not installed")
+    table = pa.table({
+        "Resource Request ID": pa.array([12345678, 12345679, 12345680], pa.int64()),
+        "RR FTE": [1.0, 0.5, None],
+        "RR Start Date": [datetime.date(2026, 1, 1), datetime.date(2026, 2, 1), None],
+        "Mandatory Skills": [["Python", "SQL"], ["Java"], []],
+    })
+    path = str(tmp_path / request.param)
+    if request.param.endswith(".parquet"):
+        pq.write_table(table, path)
+    else:
+        # Arrow IPC file format, and the stream format
+        new_writer = pa.ipc.new_file if request.param.endswith(".arrow") else pa.ipc.new_stream
+        with new_writer(path, table.schema) as writer:
+            writer.write_table(table)
+    return path, request.param
+
+
+def test_arrow_keeps_types(arrow_file):
+    path, filename = arrow_file
+    df = pd.concat(list(iter_arrow_batches(path, filename, ["Resource Request ID"], batch_size=2)))
+    # Index = record number (1-based) across batches
+    assert list(df.index) == [1, 2, 3]
+    assert df["Resource Request ID"].tolist() == [12345678, 12345679, 12345680]
+    assert df.loc[1, "RR Start Date"] == datetime.date(2026, 1, 1)
+    assert list(df.loc[1, "Mandatory Skills"]) == ["Python", "SQL"]
+
+
+def test_arrow_as_str_keeps_dates_and_lists(arrow_file):
+    path, filename = arrow_file
+    df = next(iter_arrow_batches(path, filename, ["Resource Request ID"], as_str=True))
+    assert df["Resource Request ID"].tolist() == ["12345678", "12345679", "12345680"]
+    assert df.loc[2, "RR FTE"] == "0.5"
+    assert df.loc[1, "RR Start Date"] == datetime.date(2026, 1, 1)
+    assert list(df.loc[2, "Mandatory Skills"]) == ["Java"]
+
+
+def test_arrow_missing_columns(arrow_file):
+    path, filename = arrow_file
+    with pytest.raises(ValidationException, match="Employee ID"):
+        next(iter_arrow_batches(path, filename, ["Employee ID"]))
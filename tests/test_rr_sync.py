@@ -0,0 +1,113 @@
+from models import ResourceRequest
+from utils.file_upload_utils import (
+    RR_HM_EDITED_FIELDS,
+    RR_SYNC_PRESERVED_FIELDS,
+    convert_dates_for_mongo,
+    rr_content_hash,
+    sync_rr_with_db,
+)
+
+ROW = {
+    "Resource Request ID": "12345678_1", "RR FTE": 1, "RR Status": "Approved", "RR Type": "New Project",
+    "Priority": "P2", "UST - Role": "Developer", "City": "Chennai", "Country": "India", "Campus": "Main",
+    "Job Grade": "B2", "RR Start Date": "2026-01-01", "RR End Date": "2026-12-31", "Account Name": "Acme",
+    "Project ID": "P1", "Project Name": "Apollo", "WFM": "Wen", "WFM ID": "900", "HM": "Hari", "HM ID": "901",
+    "AM": "Anu", "AM ID": "902", "Billable": "Yes", "Exclusive to UST": False, "Contract to Hire": False,
+    "UST Role Description": "Builds things", "Job Description": "Python", "Client Interview Required": "No",
+    "OBU Name": "OBU", "Project Start Date": "2026-01-01", "Project End Date": "2026-12-31",
+    "Raised On": "2025-12-01", "WFM Approved Date": None, "Project Type": "T&M", "Last Updated On": "2025-12-02",
+    "Last Activity Date": "2025-12-02T10:00:00+00:00", "Mandatory Skills": "Python, SQL",
+    "Legal Entity": "UST India", "Company Name": "UST",
+}
+
+
+def _rr(rr_id: str = "12345678_1", **fields) -> ResourceRequest:
+    return ResourceRequest.model_validate({**ROW, "Resource Request ID": rr_id, **fields})
+
+
+def _hash_of(rr: ResourceRequest) -> str:
+    return rr_content_hash(convert_dates_for_mongo(rr.model_dump(exclude=RR_SYNC_PRESERVED_FIELDS)))
+
+
+async def _stored(db, rr_id: str = "12345678_1") -> dict:
+    return await db.resource_request.find_one({"resource_request_id": rr_id})
+
+
+# --------------------------- HASH ---------------------------
+def test_content_hash_ignores_preserved_fields():
+    data = _rr().model_dump()
+    assert rr_content_hash({**data, "flag": False}) == rr_content_hash({**data, "flag": True})
+    assert rr_content_hash({**data, "priority": "P1"}) != rr_content_hash(data)
+
+
+# --------------------------- SYNC ---------------------------
+async def test_insert_then_unchanged(db):
+    result = await sync_rr_with_db([_rr()])
+    assert result["changeset"]["inserted"] == ["12345678_1"]
+    stored = await _stored(db)
+    assert stored["flag"] is True
+    assert stored["content_hash"]
+
+    result = await sync_rr_with_db([_rr()])
+    assert (result["rr_unchanged"], result["rr_updated"]) == (1, 0)
+
+
+async def test_update_keeps_flag(db):
+    await sync_rr_with_db([_rr()])
+    # HM soft-deleted the job in the app
+    await db.resource_request.update_one({"resource_request_id": "12345678_1"}, {"$set": {"flag": False}})
+
+    result = await sync_rr_with_db([_rr(**{"Project Name": "Artemis"})])
+
+    stored = await _stored(db)
+    assert result["changeset"]["updated"] == ["12345678_1"]
+    assert (stored["project_name"], stored["flag"]) == ("Artemis", False)
+
+
+async def test_update_skips_hm_edited_fields(db):
+    await sync_rr_with_db([_rr()])
+    await db.resource_request.update_one({"resource_request_id": "12345678_1"},
+                                         {"$set": {"priority": "P1", RR_HM_EDITED_FIELDS: ["priority"]}})
+
+    await sync_rr_with_db([_rr(**{"Priority": "P3", "Project Name": "Artemis"})])
+
+    stored = await _stored(db)
+    assert (stored["priority"], stored["project_name"]) == ("P1", "Artemis")
+
+
+async def test_missing_rrs_are_deactivated_and_come_back(db):
+    await sync_rr_with_db([_rr("12345678_1"), _rr("12345678_2")])
+
+    result = await sync_rr_with_db([_rr("12345678_1")])
+    assert result["changeset"]["deactivated"] == ["12345678_2"]
+    assert (await _stored(db, "12345678_2"))["rr_status"] is False
+
+    result = await sync_rr_with_db([_rr("12345678_1"), _rr("12345678_2")])
+    assert result["changeset"]["reactivated"] == ["12345678_2"]
+    assert (await _stored(db, "12345678_2"))["rr_status"] == "Approved"
+
+
+async def test_partial_file_does_not_deactivate(db):
+    await sync_rr_with_db([_rr("12345678_1"), _rr("12345678_2")])
+
+    result = await sync_rr_with_db([_rr("12345678_3")], deactivate_missing=False)
+
+    assert result["changeset"]["inserted"] == ["12345678_3"]
+    assert result["rr_deactivated"] == 0
+    assert await db.resource_request.count_documents({"rr_status": "Approved"}) == 3
+
+
+async def test_legacy_rr_only_adopts_hash(db):
+    await db.resource_request.insert_one(
+        {"resource_request_id": "12345678_1", "rr_status": "Approved", "priority": "P1", "flag": False})
+
+    result = await sync_rr_with_db([_rr()])
+
+    stored = await _stored(db)
+    assert result["rr_unchanged"] == 1
+    assert (stored["priority"], stored["flag"]) == ("P1", False)
+    assert stored["content_hash"] == _hash_of(_rr())
+
+    # From now on it is a normal delta-synced RR
+    await sync_rr_with_db([_rr(**{"Priority": "P3"})])
+    assert (await _stored(db))["priority"] == "P3"
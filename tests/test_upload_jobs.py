@@ -0,0 +1,96 @@
+import asyncio
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils import upload_jobs
+from utils.upload_jobs import (DONE, FAILED, PARSING, QUEUED, JOB_STALE_SECONDS, _run_job,
+                               recover_upload_jobs, submit_upload_job)
+
+
+@pytest.fixture
+def jobs(db, monkeypatch, tmp_path):
+    """Upload jobs on the in-memory database, staging in tmp_path, pipelines recorded instead of run."""
+    monkeypatch.setattr(upload_jobs, "upload_jobs", db.upload_jobs)
+    monkeypatch.setattr(upload_jobs, "upload_ingestions", db.upload_ingestions)
+    monkeypatch.setattr(upload_jobs, "STAGING_FOLDER", str(tmp_path))
+    monkeypatch.setattr(upload_jobs, "_queue", asyncio.Queue())
+    monkeypatch.setattr(upload_jobs, "_queued_ids", set())
+
+    calls = []
+
+    async def pipeline(path, filename, uploaded_by, progress):
+        calls.append(filename)
+        await progress("syncing", rows_total=1, rows_valid=1, rows_failed=0)
+        await asyncio.sleep(0)
+        return {"total": 1, "failed": 0}
+
+    for kind in ("employees", "employees_delta", "rr_report"):
+        monkeypatch.setitem(upload_jobs.PIPELINES, kind, pipeline)
+    return calls
+
+
+async def _upload(kind: str, content: bytes, filename: str = "report.csv") -> dict:
+    job = await submit_upload_job(kind, filename, "admin", source=io.BytesIO(content))
+    if not job.get("duplicate"):
+        await _run_job(job["_id"])
+    return job
+
+
+# --------------------------- CLAIMING ---------------------------
+async def test_job_runs_once_when_claimed_concurrently(db, jobs):
+    job = await submit_upload_job("rr_report", "a.csv", "admin", source=io.BytesIO(b"a"))
+
+    await asyncio.gather(_run_job(job["_id"]), _run_job(job["_id"]))
+
+    stored = await db.upload_jobs.find_one({"_id": job["_id"]})
+    assert jobs == ["a.csv"]
+    assert stored["status"] == DONE
+    assert "active_fingerprint" not in stored
+
+
+async def test_only_stale_jobs_are_recovered(db, jobs):
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=JOB_STALE_SECONDS + 1)
+    await db.upload_jobs.insert_many([
+        {"_id": "stale", "status": PARSING, "owner": "gone", "heartbeat": stale, "created_at": stale},
+        {"_id": "fresh", "status": PARSING, "owner": "alive", "heartbeat": now, "created_at": now},
+    ])
+
+    await recover_upload_jobs(startup=True)
+
+    statuses = {j["_id"]: j["status"] async for j in db.upload_jobs.find({})}
+    assert statuses == {"stale": QUEUED, "fresh": PARSING}
+    assert upload_jobs._queued_ids == {"stale"}
+
+
+async def test_missing_staged_file_fails_the_job(db, jobs):
+    job = await submit_upload_job("rr_report", "a.csv", "admin", source=io.BytesIO(b"a"))
+    upload_jobs.os.remove(job["staged_path"])
+
+    await _run_job(job["_id"])
+
+    stored = await db.upload_jobs.find_one({"_id": job["_id"]})
+    assert stored["status"] == FAILED
+    assert "UPLOAD_STAGING_FOLDER" in stored["error"]
+    assert jobs == []
+
+
+# --------------------------- DEDUPE ---------------------------
+async def test_only_a_repeat_of_the_latest_ingestion_is_skipped(db, jobs):
+    skipped = [bool((await _upload("rr_report", content)).get("duplicate")) for content in (b"A", b"B", b"A", b"A")]
+    assert skipped == [False, False, False, True]
+    assert len(jobs) == 3
+
+
+async def test_delta_uploads_are_never_skipped(db, jobs):
+    for _ in range(2):
+        assert not (await _upload("employees_delta", b"A")).get("duplicate")
+    assert len(jobs) == 2
+
+
+async def test_in_flight_upload_is_returned(db, jobs):
+    first = await submit_upload_job("rr_report", "a.csv", "admin", source=io.BytesIO(b"A"))
+    second = await submit_upload_job("rr_report", "a.csv", "admin", source=io.BytesIO(b"A"))
+    assert second["duplicate"] and second["_id"] == first["_id"]
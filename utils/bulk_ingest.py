@@ -0,0 +1,206 @@
+# --------------------------- IMPORTS ---------------------------
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import HTTPException
+
+from database import db
+from utils.cvr_validation import validate_career_velocity
+from utils.file_upload_utils import log_upload_action, logger, sync_employees_with_db, sync_rr_with_db
+from utils.report_reader import REPORT_EXTENSIONS
+from utils.rr_validation import validate_rr_rows
+from utils.upload_jobs import _file_sha256
+from utils.upload_pipelines import _file_type, report_batches
+
+
+# --------------------------- SETTINGS ---------------------------
+# Offline backfill of report files from disk, without the HTTP upload path.
+# Files are read and validated in a process pool (same readers and validators as the
+# upload jobs); the parent syncs them one by one in the given order with the same
+# sync_employees_with_db / sync_rr_with_db and writes the usual audit entry. RR reports
+# are full snapshots (missing RRs are deactivated), so their order matters: directories
+# are expanded sorted by file name.
+# Finished files are checkpointed in db.migrations by path, size and mtime; re-running
+# the same run id skips them, so an interrupted backfill resumes with the next file.
+KINDS = ["employees", "rr_report"]
+INGEST_PROCESSES = int(os.getenv("BULK_INGEST_PROCESSES", str(os.cpu_count() or 2)))
+UPLOADED_BY = "bulk_ingest"
+
+migrations = db.migrations
+
+
+def _checkpoint_id(run_id: str) -> str:
+    return f"bulk_ingest:{run_id}"
+
+
+# --------------------------- CHECKPOINT ---------------------------
+async def _load_checkpoint(run_id: str) -> dict:
+    state = await migrations.find_one({"_id": _checkpoint_id(run_id)})
+    return state or {"_id": _checkpoint_id(run_id), "files": [], "completed": False}
+
+
+async def _save_checkpoint(state: dict):
+    state["updated_at"] = datetime.now(timezone.utc)
+    await migrations.replace_one({"_id": state["_id"]}, state, upsert=True)
+
+
+# --------------------------- FILES ---------------------------
+def collect_files(paths: List[str]) -> List[str]:
+    """Report files under the given paths, in order (directories recursively, by name)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+                     if name.lower().endswith(REPORT_EXTENSIONS)]
+            files += sorted(found)
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return [os.path.abspath(f) for f in files]
+
+
+def _signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# --------------------------- WORKER ---------------------------
+def _validate_file(kind: str, path: str) -> dict:
+    """Read and validate one file (runs in a pool process). Never raises."""
+    started = time.perf_counter()
+    filename = os.path.basename(path)
+    valid, users, errors, rows = [], [], [], 0
+    try:
+        for batch in report_batches(kind, path, filename):
+            rows += len(batch)
+            if kind == "employees":
+                batch_emps, batch_users, batch_errors = validate_career_velocity(batch, 0)
+                valid += batch_emps
+                users += batch_users
+            else:
+                batch_rrs, batch_errors = validate_rr_rows(batch)
+                valid += batch_rrs
+            errors += batch_errors
+        sha256 = _file_sha256(path)
+    except HTTPException as e:
+        return {"error": str(e.detail), "seconds": round(time.perf_counter() - started, 3)}
+    except Exception as e:
+        return {"error": str(e), "seconds": round(time.perf_counter() - started, 3)}
+    return {"sha256": sha256, "rows": rows, "valid": valid, "users": users, "errors": errors,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+# --------------------------- INGEST ---------------------------
+async def _sync(kind: str, path: str, result: dict) -> dict:
+    filename = os.path.basename(path)
+    upload_id = await log_upload_action(kind, filename, _file_type(filename), UPLOADED_BY, result["rows"],
+                                        len(result["valid"]), len(result["errors"]), result["errors"])
+    if not result["valid"]:
+        return {"upload_id": upload_id}
+    if kind == "employees":
+        sync = await sync_employees_with_db(result["valid"], result["users"])
+        return {"upload_id": upload_id, **{k: v for k, v in sync.items() if k != "batches"}}
+    sync = await sync_rr_with_db(result["valid"])
+    return {"upload_id": upload_id, **{k: v for k, v in sync.items() if k != "changeset"}}
+
+
+async def bulk_ingest(kind: str, paths: List[str], run_id: str = None, processes: int = INGEST_PROCESSES,
+                      dry_run: bool = False) -> dict:
+    """Validate and sync report files from disk; returns the run state with a throughput summary.
+
+    Re-running with the same run id (default: the kind) skips files already ingested unchanged.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind}")
+    started = time.perf_counter()
+    state = await _load_checkpoint(run_id or kind)
+    done = {(f["path"], f["size"], f["mtime_ns"]) for f in state["files"] if f["status"] == "done"}
+    files = [sig for sig in map(_signature, collect_files(paths))
+             if (sig["path"], sig["size"], sig["mtime_ns"]) not in done]
+    logger.info(f"Bulk ingest {state['_id']}: {len(files)} files to process, {len(done)} already done")
+
+    run = {"files": 0, "failed_files": 0, "bytes": 0, "rows": 0, "valid": 0, "failed": 0,
+           "validate_seconds": 0.0, "sync_seconds": 0.0}
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max(processes, 1), mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Validation runs ahead of the (ordered) sync, bounded so results do not pile up in memory
+        pending = deque()
+        queue = deque(files)
+        while queue or pending:
+            while queue and len(pending) < max(processes, 1) * 2:
+                sig = queue.popleft()
+                pending.append((sig, loop.run_in_executor(pool, _validate_file, kind, sig["path"])))
+            sig, future = pending.popleft()
+            result = await future
+            entry = {**sig, "seconds": result["seconds"]}
+            run["validate_seconds"] += result["seconds"]
+
+            if "error" in result:
+                entry.update(status="failed", error=result["error"])
+                run["failed_files"] += 1
+                logger.error(f"Bulk ingest: {sig['path']} failed: {result['error']}")
+            else:
+                entry.update(status="done", sha256=result["sha256"], rows=result["rows"],
+                             valid=len(result["valid"]), failed=len(result["errors"]))
+                if not dry_run:
+                    sync_started = time.perf_counter()
+                    entry["sync"] = await _sync(kind, sig["path"], result)
+                    run["sync_seconds"] += time.perf_counter() - sync_started
+                run["files"] += 1
+                run["bytes"] += sig["size"]
+                for key in ("rows", "valid", "failed"):
+                    run[key] += entry[key]
+                logger.info(f"Bulk ingest: {sig['path']} rows={entry['rows']} valid={entry['valid']} "
+                            f"failed={entry['failed']}")
+
+            # A failed file stays retryable: only "done" entries are skipped on resume
+            state["files"] = [f for f in state["files"] if f["path"] != sig["path"]] + [entry]
+            if not dry_run:
+                await _save_checkpoint(state)
+
+    seconds = time.perf_counter() - started
+    state["completed"] = not run["failed_files"]
+    if not dry_run:
+        await _save_checkpoint(state)
+    state["run"] = {
+        **run,
+        "dry_run": dry_run,
+        "skipped_files": len(done),
+        "processes": processes,
+        "validate_seconds": round(run["validate_seconds"], 3),
+        "sync_seconds": round(run["sync_seconds"], 3),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(run["rows"] / seconds, 1) if seconds else 0.0,
+        "mb_per_second": round(run["bytes"] / 1e6 / seconds, 2) if seconds else 0.0,
+    }
+    return state
+
+
+# --------------------------- CLI ---------------------------
+# python -m utils.bulk_ingest {employees,rr_report} PATH [PATH ...] [--processes N] [--run-id ID] [--dry-run] [--restart]
+async def _main(args):
+    run_id = args.run_id or args.kind
+    if args.restart:
+        await migrations.delete_one({"_id": _checkpoint_id(run_id)})
+    state = await bulk_ingest(args.kind, args.paths, run_id, args.processes, args.dry_run)
+    print(json.dumps(state, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest report files from disk without the HTTP API")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("paths", nargs="+", help="report files or directories")
+    parser.add_argument("--processes", type=int, default=INGEST_PROCESSES, help="validation processes")
+    parser.add_argument("--run-id", help="checkpoint name (default: the kind)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only; no writes, no checkpoint")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    asyncio.run(_main(parser.parse_args()))
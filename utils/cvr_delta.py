@@ -0,0 +1,208 @@
+# --------------------------- IMPORTS ---------------------------
+import os
+import time
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from pydantic import ValidationError
+from pymongo import UpdateOne
+
+from database import collections
+from models import Employee
+from utils.cvr_validation import COLUMNS, validate_career_velocity
+from utils.file_upload_utils import SYNC_BATCH_SIZE, _bulk_upsert, logger, sync_employees_with_db, user_role_update
+from utils.row_errors import error_fields
+
+
+# Career Velocity delta uploads (PATCH semantics), keyed by Employee ID.
+# Only the columns present in the file are considered, and per row:
+#   - blank cell          -> field left unchanged
+#   - CVR_DELTA_UNSET     -> $set to the field's empty value (optional fields only), the
+#                            same None / [] a full upload stores, so readers keep finding the key
+#   - any other value     -> validated with the Employee field validator, then $set
+# An optional "Action" column deactivates / reactivates employees (employees.status and
+# users.is_active); a changed Type also updates a TP / Non TP users.role. Unknown Employee
+# IDs are inserted when the row is a complete CVR row.
+ID_COLUMN = COLUMNS["employee_id"]
+ACTION_COLUMN = "Action"
+UNSET_MARKER = os.getenv("CVR_DELTA_UNSET_MARKER", "<unset>")
+
+UPDATE, DEACTIVATE, REACTIVATE = "UPDATE", "DEACTIVATE", "REACTIVATE"
+ACTIONS = {"": UPDATE, "UPDATE": UPDATE, "DEACTIVATE": DEACTIVATE, "REMOVE": DEACTIVATE,
+           "DELETE": DEACTIVATE, "REACTIVATE": REACTIVATE}
+PATCH_COLUMNS: Dict[str, str] = {name: alias for name, alias in COLUMNS.items() if name != "employee_id"}
+UNSET_VALUES = {"band": None, "secondary_technology": None, "detailed_skills": []}
+UNSETTABLE_FIELDS = set(UNSET_VALUES)
+
+
+# --------------------------- PARSING ---------------------------
+def _blank(value) -> bool:
+    return value is None or (not isinstance(value, (list, dict)) and pd.isna(value)) or str(value).strip() == ""
+
+
+def _validate_field(name: str, value):
+    # Runs only this field's validators (same rules as a full upload)
+    model = Employee.model_construct()
+    Employee.__pydantic_validator__.validate_assignment(model, name, value)
+    return getattr(model, name)
+
+
+def _field_error(alias: str, e: ValidationError) -> str:
+    return f"{alias}: {e.errors()[0]['msg']}"
+
+
+def _row_error(idx, message: str, columns: List[str], error_types: List[str], **keys) -> dict:
+    # Same shape as utils/row_errors.py entries
+    return {"row": idx, **keys, "error": message, "columns": columns, "error_types": error_types}
+
+
+def parse_cvr_delta(df: pd.DataFrame) -> Tuple[List[dict], List[dict]]:
+    """Turn delta rows into changes {row, employee_id, action, set, unset}, plus row errors.
+
+    DataFrame index = spreadsheet / file row number. CPU-bound; run it in a thread.
+    """
+    present = {name: alias for name, alias in PATCH_COLUMNS.items() if alias in df.columns}
+    changes, errors = [], []
+    for idx, row in zip(df.index, df.to_dict("records")):
+        raw_id = row.get(ID_COLUMN)
+        if _blank(raw_id):
+            errors.append(_row_error(idx, f"{ID_COLUMN} is required", [ID_COLUMN], ["missing"]))
+            continue
+        try:
+            employee_id = _validate_field("employee_id", str(raw_id).strip())
+        except ValidationError as e:
+            errors.append(_row_error(idx, _field_error(ID_COLUMN, e), [ID_COLUMN], error_fields(e)["error_types"]))
+            continue
+
+        action_value = "" if _blank(row.get(ACTION_COLUMN)) else str(row[ACTION_COLUMN]).strip().upper()
+        if action_value not in ACTIONS:
+            errors.append(_row_error(idx, f"{ACTION_COLUMN}: unknown action '{row[ACTION_COLUMN]}'",
+                                     [ACTION_COLUMN], ["unknown_action"], employee_id=employee_id))
+            continue
+        change = {"row": idx, "employee_id": employee_id, "action": ACTIONS[action_value], "set": {}, "unset": []}
+
+        row_errors, error_columns, error_types = [], [], []
+        for name, alias in present.items():
+            value = row.get(alias)
+            if change["action"] != UPDATE or _blank(value):
+                continue
+            text = str(value).strip()
+            if text == UNSET_MARKER:
+                if name in UNSETTABLE_FIELDS:
+                    change["unset"].append(name)
+                else:
+                    row_errors.append(f"{alias}: required field cannot be unset")
+                    error_columns.append(alias)
+                    error_types.append("required_unset")
+                continue
+            try:
+                change["set"][name] = _validate_field(name, text)
+            except ValidationError as e:
+                row_errors.append(_field_error(alias, e))
+                error_columns.append(alias)
+                error_types += error_fields(e)["error_types"]
+
+        if row_errors:
+            errors.append(_row_error(idx, "; ".join(row_errors), error_columns, list(dict.fromkeys(error_types)),
+                                     employee_id=employee_id))
+        else:
+            changes.append(change)
+    return changes, errors
+
+
+def _merge_changes(changes: List[dict]) -> Dict[str, dict]:
+    # Several rows for one employee are applied in file order: field edits accumulate and
+    # the last DEACTIVATE / REACTIVATE wins, so "deactivate, then edit" keeps both
+    merged: Dict[str, dict] = {}
+    for change in changes:
+        current = merged.get(change["employee_id"])
+        if current is None:
+            merged[change["employee_id"]] = {**change, "set": dict(change["set"]), "unset": list(change["unset"])}
+            continue
+        if change["action"] != UPDATE:
+            current["action"] = change["action"]
+        for name, value in change["set"].items():
+            current["set"][name] = value
+            if name in current["unset"]:
+                current["unset"].remove(name)
+        for name in change["unset"]:
+            current["set"].pop(name, None)
+            if name not in current["unset"]:
+                current["unset"].append(name)
+        current["row"] = change["row"]
+    return merged
+
+
+# --------------------------- APPLY ---------------------------
+async def _bulk(collection, ops: List[UpdateOne]) -> dict:
+    totals = {"upserted": 0, "matched": 0, "modified": 0, "errors": 0}
+    for start in range(0, len(ops), SYNC_BATCH_SIZE):
+        result = await _bulk_upsert(collection, ops[start:start + SYNC_BATCH_SIZE])
+        totals = {key: totals[key] + result[key] for key in totals}
+    return totals
+
+
+async def apply_cvr_delta(changes: List[dict], df: pd.DataFrame) -> Tuple[dict, List[dict]]:
+    """Write one batch of parsed delta changes; returns (summary, row errors).
+
+    Existing employees get field-level $set (unset fields get their empty value);
+    DEACTIVATE / REACTIVATE flip employees.status and users.is_active. Rows for unknown
+    IDs are validated as full CVR rows (df, indexed like the changes) and inserted with
+    their user.
+    """
+    started = time.perf_counter()
+    merged = _merge_changes(changes)
+    existing = {
+        doc["employee_id"] async for doc in collections["employees"].find(
+            {"employee_id": {"$in": list(merged)}}, {"_id": 0, "employee_id": 1})
+    }
+
+    employee_ops, user_ops, new_rows, errors = [], [], [], []
+    applied = {"updated": [], "deactivated": [], "reactivated": [], "inserted": []}
+    for employee_id, change in merged.items():
+        if employee_id not in existing:
+            if change["action"] == UPDATE:
+                new_rows.append(change["row"])
+            else:
+                errors.append(_row_error(change["row"], f"Employee {employee_id} not found",
+                                         [ID_COLUMN], ["not_found"], employee_id=employee_id))
+            continue
+        fields = {**change["set"], **{name: UNSET_VALUES[name] for name in change["unset"]}}
+        if fields:
+            applied["updated"].append({"employee_id": employee_id, "set": change["set"], "unset": change["unset"]})
+        if "type" in change["set"]:
+            user_ops.append(user_role_update(employee_id, change["set"]["type"]))
+        if change["action"] != UPDATE:
+            active = change["action"] == REACTIVATE
+            fields["status"] = active
+            user_ops.append(UpdateOne({"employee_id": employee_id}, {"$set": {"is_active": active}}))
+            applied["reactivated" if active else "deactivated"].append({"employee_id": employee_id})
+        if fields:
+            employee_ops.append(UpdateOne({"employee_id": employee_id}, {"$set": fields}))
+
+    employee_result = await _bulk(collections["employees"], employee_ops)
+    user_result = await _bulk(collections["users"], user_ops)
+
+    inserted = {}
+    if new_rows:
+        # New hires need every required column; the unset marker means "no value" here
+        rows = df.loc[new_rows].replace(UNSET_MARKER, None)
+        employees, users, insert_errors = validate_career_velocity(rows, 0)
+        errors += insert_errors
+        if employees:
+            inserted = await sync_employees_with_db(employees, users)
+            applied["inserted"] = [{"employee_id": emp.employee_id} for emp in employees]
+
+    summary = {
+        "employees_updated": len(applied["updated"]),
+        "employees_modified": employee_result["modified"],
+        "employees_deactivated": len(applied["deactivated"]),
+        "employees_reactivated": len(applied["reactivated"]),
+        "employees_inserted": len(applied["inserted"]),
+        "fields_set": sum(len(c["set"]) for c in applied["updated"]),
+        "fields_unset": sum(len(c["unset"]) for c in applied["updated"]),
+        "write_errors": employee_result["errors"] + user_result["errors"] + inserted.get("write_errors", 0),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info("CVR delta: " + ", ".join(f"{k}={v}" for k, v in summary.items()))
+    return {**summary, "changes": applied}, errors
@@ -0,0 +1,120 @@
+# --------------------------- IMPORTS ---------------------------
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from models import Employee, User
+from utils.row_errors import row_error
+
+
+# Columnar validation for the Career Velocity Report.
+# The Employee validators are re-expressed as pandas string operations over whole
+# columns; rows that pass every check become models without re-validation, and only
+# rows failing a check go through Employee(**row) to get Pydantic's error message.
+
+NA_VALUES = ["NA", "NOT AVAILABLE", "NULL", ""]
+BAND_PATTERN = r"[A-D][0-9]|[TEP][0-9]"
+EMPLOYEE_ID_PATTERN = r"\d+"
+
+# Employee field name -> report column
+COLUMNS: Dict[str, str] = {
+    name: field.alias for name, field in Employee.model_fields.items() if field.alias
+}
+# Passed explicitly so model_construct does not deep-copy the defaults on every row
+USER_DEFAULTS = {name: field.default for name, field in User.model_fields.items()
+                 if name not in ("employee_id", "role")}
+# Plain str fields: only a missing value fails
+REQUIRED_TEXT_FIELDS = ["employee_name", "employment_type", "designation", "city", "location_description"]
+
+
+# --------------------------- COLUMN HELPERS ---------------------------
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column as stripped strings with None for missing cells (same as str(v).strip())."""
+    if column not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    col = df[column]
+    # A duplicated header yields a DataFrame; Pydantic would see the last value
+    if isinstance(col, pd.DataFrame):
+        col = col.iloc[:, -1]
+    return col.astype(str).str.strip().where(col.notna(), None)
+
+
+def _is_na(text: pd.Series) -> pd.Series:
+    return text.isna() | text.str.upper().isin(NA_VALUES)
+
+
+# --------------------------- VECTORIZED CHECKS ---------------------------
+def _normalize(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Return (normalized columns keyed by Employee field, per-row failure mask)."""
+    out = pd.DataFrame(index=df.index)
+    failed = pd.Series(False, index=df.index)
+
+    # employee_id: digit string, "12345.0" (Excel floats) -> "12345"
+    emp_id = _text(df, COLUMNS["employee_id"]).str.replace(r"\.0$", "", regex=True)
+    failed |= ~emp_id.str.fullmatch(EMPLOYEE_ID_PATTERN).fillna(False).astype(bool)
+    out["employee_id"] = emp_id
+
+    for name in REQUIRED_TEXT_FIELDS:
+        values = _text(df, COLUMNS[name])
+        failed |= values.isna()
+        out[name] = values
+
+    # band: empty -> None, otherwise upper-case and A1..D9 / T,E,P + digit
+    band = _text(df, COLUMNS["band"])
+    band_missing = band.isna() | (band == "")
+    band = band.str.upper()
+    failed |= ~band_missing & ~band.str.fullmatch(BAND_PATTERN).fillna(False).astype(bool)
+    out["band"] = band.where(~band_missing, None)
+    if COLUMNS["band"] not in df.columns:
+        # Band has no default, so a missing column is a Pydantic "field required" error
+        failed[:] = True
+
+    # NA-like tech values: primary -> "", secondary -> None
+    primary = _text(df, COLUMNS["primary_technology"])
+    out["primary_technology"] = primary.where(~_is_na(primary), "")
+    if COLUMNS["primary_technology"] not in df.columns:
+        failed[:] = True
+    secondary = _text(df, COLUMNS["secondary_technology"])
+    out["secondary_technology"] = secondary.where(~_is_na(secondary), None)
+
+    # Skills: comma-separated -> list of stripped items, NA-like -> []
+    skills = _text(df, COLUMNS["detailed_skills"])
+    split = skills.str.split(r"\s*,\s*", regex=True)
+    out["detailed_skills"] = split.where(~_is_na(skills), pd.Series([[]] * len(df), index=df.index))
+
+    # type: "TP" (any case) -> "TP", everything else (including empty) -> "Non TP"
+    emp_type = _text(df, COLUMNS["type"])
+    out["type"] = emp_type.str.upper().eq("TP").map({True: "TP", False: "Non TP"})
+    if COLUMNS["type"] not in df.columns:
+        failed[:] = True
+
+    # Series.where(..., None) leaves NaN in object columns; models expect None
+    out = out.astype(object).where(out.notna(), None)
+    return out, failed
+
+
+# --------------------------- ENTRY POINT ---------------------------
+def validate_career_velocity(df: pd.DataFrame, header_offset: int = 2) -> Tuple[List[Employee], List[User], List[dict]]:
+    """Validate a Career Velocity DataFrame into (employees, users, errors), in file order.
+
+    CPU-bound; call it through asyncio.to_thread from request handlers.
+    Error rows are numbered like the spreadsheet (DataFrame index + header_offset).
+    """
+    normalized, failed = _normalize(df)
+
+    valid: Dict[int, Employee] = {}
+    for idx, record in zip(normalized.index[~failed], normalized[~failed].to_dict("records")):
+        valid[idx] = Employee.model_construct(**record, resume=None, resume_text=None)
+
+    # Only rows the vectorized checks rejected pay for full Pydantic validation
+    errors = []
+    for idx, row in df[failed].iterrows():
+        row_dict = {k: None if pd.isna(v) else str(v).strip() for k, v in row.to_dict().items()}
+        try:
+            valid[idx] = Employee(**row_dict)
+        except Exception as e:
+            errors.append(row_error(idx + header_offset, e))
+
+    employees = [valid[idx] for idx in df.index if idx in valid]
+    users = [User.model_construct(employee_id=emp.employee_id, role=emp.type, **USER_DEFAULTS) for emp in employees]
+    return employees, users, errors
@@ -0,0 +1,86 @@
+# --------------------------- IMPORTS ---------------------------
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+
+# Column-wise date parsing for report ingestion.
+# The format of each date column is inferred once from a sample, then the whole column
+# is converted with pd.to_datetime and handed to the models as date / datetime objects,
+# so the field validators take their isinstance fast path instead of trying formats per
+# cell. Cells the inferred format does not parse are left untouched for the validators.
+# Only formats the model validators accept are listed; the ISO ones are guarded by a
+# regex because pandas is more lenient than datetime.fromisoformat (e.g. 1-digit months).
+DATE_SAMPLE_ROWS = 200
+
+_ISO_DATE = r"\d{4}-\d{2}-\d{2}"
+DATE_FORMATS: List[Tuple[str, Optional[str]]] = [
+    ("%d %b %Y", None),
+    ("%Y-%m-%d", _ISO_DATE),
+    ("%Y-%m-%d %H:%M:%S", _ISO_DATE + r"[ T]\d{2}:\d{2}:\d{2}"),
+]
+DATETIME_FORMATS: List[Tuple[str, Optional[str]]] = [
+    ("%d %b %Y, %I:%M %p", None),
+    ("%d %b %Y %I:%M %p", None),
+    ("%d %b %Y %H:%M:%S", None),
+    ("%Y-%m-%d %H:%M:%S", _ISO_DATE + r"[ T]\d{2}:\d{2}:\d{2}"),
+    ("%Y-%m-%d %H:%M:%S%z", _ISO_DATE + r"[ T]\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}"),
+    ("%Y-%m-%d", _ISO_DATE),
+]
+
+
+def _parse(values: pd.Series, fmt: str, guard: Optional[str]) -> pd.Series:
+    if guard:
+        # "T" separator is read as a space
+        values = values.where(values.str.fullmatch(guard, na=False)).str.replace("T", " ", n=1)
+    # Offsets are normalized to UTC (same instant as the validator's fromisoformat)
+    return pd.to_datetime(values, format=fmt, errors="coerce", utc="%z" in fmt)
+
+
+def _infer_format(values: pd.Series, formats) -> Optional[Tuple[str, Optional[str]]]:
+    """Format parsing the most sampled cells (None if it parses none)."""
+    sample = values.dropna().head(DATE_SAMPLE_ROWS)
+    best, best_count = None, 0
+    for fmt in formats:
+        count = int(_parse(sample, *fmt).notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+        if count == len(sample):
+            break
+    return best
+
+
+def _convert(column: pd.Series, formats, cleaner, to_python) -> pd.Series:
+    if not column.map(lambda v: isinstance(v, str)).any():
+        return column
+    text = cleaner(column.astype(object).str.strip())  # NaN for non-strings (already parsed / empty)
+    blank = text.str.lower().isin(["", "none"])
+    out = column.astype(object).copy()
+    out[blank] = None
+    fmt = _infer_format(text[~blank], formats)
+    if fmt is not None:
+        parsed = _parse(text.where(~blank), *fmt)
+        ok = parsed.notna()
+        if ok.any():
+            out[ok] = to_python(parsed[ok])
+    return out
+
+
+def normalize_date_columns(df: pd.DataFrame, date_columns: Iterable[str] = (),
+                           datetime_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """Return df with string date cells converted to `date` / `datetime` objects (naive unless offset given).
+
+    Blank and "none" cells become None; unparsed cells keep their original value.
+    """
+    df = df.copy()
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = _convert(df[col], DATE_FORMATS, lambda s: s,
+                               lambda p: list(p.dt.date))
+    for col in datetime_columns:
+        if col in df.columns:
+            # "12 Mar 2025, 10:30 AM (IST)" -> "12 Mar 2025, 10:30 AM", as in the model validator
+            df[col] = _convert(df[col], DATETIME_FORMATS,
+                               lambda s: s.str.split("(").str[0].str.strip().str.rstrip(","),
+                               lambda p: list(p.dt.to_pydatetime()))
+    return df
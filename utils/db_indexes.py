@@ -0,0 +1,135 @@
+# --------------------------- IMPORTS ---------------------------
+import argparse
+import asyncio
+import json
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from database import db
+from utils.file_upload_utils import logger
+
+
+# --------------------------- DECLARED INDEXES ---------------------------
+# Every index the application relies on, keyed by collection name.
+# Names are explicit so the report can match declared vs existing indexes.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "employees": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+        IndexModel([("type", ASCENDING)], name="type"),
+        # Keyset pagination for /employees/sort (field, _id)
+        IndexModel([("employee_name", ASCENDING), ("_id", ASCENDING)], name="employee_name_id"),
+        IndexModel([("designation", ASCENDING), ("_id", ASCENDING)], name="designation_id"),
+        IndexModel([("band", ASCENDING), ("_id", ASCENDING)], name="band_id"),
+        IndexModel([("city", ASCENDING), ("_id", ASCENDING)], name="city_id"),
+        IndexModel([("type", ASCENDING), ("_id", ASCENDING)], name="type_id"),
+    ],
+    "users": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email", sparse=True),
+    ],
+    "resource_request": [
+        IndexModel([("resource_request_id", ASCENDING)], name="resource_request_id_unique", unique=True),
+        IndexModel([("hm_id", ASCENDING)], name="hm_id"),
+        IndexModel([("wfm_id", ASCENDING)], name="wfm_id"),
+        IndexModel([("flag", ASCENDING), ("city", ASCENDING)], name="flag_city"),
+    ],
+    "applications": [
+        IndexModel([("job_rr_id", ASCENDING), ("status", ASCENDING)], name="job_rr_id_status"),
+        IndexModel([("employee_id", ASCENDING), ("job_rr_id", ASCENDING)], name="employee_id_job_rr_id"),
+        IndexModel([("updated_at", DESCENDING), ("_id", DESCENDING)], name="updated_at_id_desc"),
+    ],
+    "refresh_tokens": [
+        IndexModel([("token", ASCENDING)], name="token"),
+        IndexModel([("employee_id", ASCENDING), ("created_at", DESCENDING)], name="employee_id_created_at"),
+    ],
+    "block_list_tokens": [
+        IndexModel([("token", ASCENDING)], name="token"),
+    ],
+    "reset_tokens": [
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "documents": [
+        IndexModel([("file_id", ASCENDING)], name="file_id"),
+    ],
+    "upload_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        # One active job per content fingerprint (held while queued / running)
+        IndexModel([("active_fingerprint", ASCENDING)], name="active_fingerprint_unique", unique=True,
+                   partialFilterExpression={"active_fingerprint": {"$type": "string"}}),
+    ],
+    "upload_ingestions": [
+        IndexModel([("kind", ASCENDING), ("ingested_at", DESCENDING)], name="kind_ingested_at_desc"),
+    ],
+    # Errors endpoint: pages of one upload by row, optionally filtered by column / error type
+    "upload_errors": [
+        IndexModel([("upload_id", ASCENDING), ("row", ASCENDING), ("_id", ASCENDING)], name="upload_row"),
+        IndexModel([("upload_id", ASCENDING), ("columns", ASCENDING), ("row", ASCENDING), ("_id", ASCENDING)],
+                   name="upload_column_row"),
+        IndexModel([("upload_id", ASCENDING), ("error_types", ASCENDING), ("row", ASCENDING), ("_id", ASCENDING)],
+                   name="upload_error_type_row"),
+    ],
+    "admin_logs": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_id_desc"),
+    ],
+}
+
+
+# --------------------------- APPLY ---------------------------
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create all declared indexes. Safe to run repeatedly; existing indexes are left as-is."""
+    created: Dict[str, List[str]] = {}
+    for name, models in INDEXES.items():
+        created[name] = []
+        for model in models:
+            try:
+                created[name] += await db[name].create_indexes([model])
+            except OperationFailure as e:
+                # e.g. duplicate keys blocking a unique index, or same keys with other options
+                logger.error(f"Index {name}.{model.document['name']} not created: {e}")
+    logger.info(f"Index bootstrap done for {len(INDEXES)} collections")
+    return created
+
+
+# --------------------------- VERIFY ---------------------------
+async def _index_usage(name: str) -> Dict[str, int]:
+    """Return {index_name: ops since server start} via $indexStats ({} if not permitted)."""
+    try:
+        stats = await db[name].aggregate([{"$indexStats": {}}]).to_list(None)
+    except OperationFailure as e:
+        logger.warning(f"$indexStats unavailable for {name}: {e}")
+        return {}
+    return {s["name"]: int(s["accesses"]["ops"]) for s in stats}
+
+
+async def verify_indexes() -> Dict[str, dict]:
+    """Compare declared indexes with the database and flag missing, extra and unused ones."""
+    report: Dict[str, dict] = {}
+    for name, models in INDEXES.items():
+        declared = {m.document["name"] for m in models}
+        existing = {ix["name"] async for ix in db[name].list_indexes()}
+        usage = await _index_usage(name)
+        report[name] = {
+            "missing": sorted(declared - existing),
+            "extra": sorted(existing - declared - {"_id_"}),
+            "unused": sorted(ix for ix, ops in usage.items() if ops == 0 and ix != "_id_"),
+            "usage": usage,
+        }
+    return report
+
+
+# --------------------------- CLI ---------------------------
+# python -m utils.db_indexes apply | report
+async def _main(command: str):
+    if command == "apply":
+        result = await ensure_indexes()
+    else:
+        result = await verify_indexes()
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or verify MongoDB indexes")
+    parser.add_argument("command", choices=["apply", "report"])
+    asyncio.run(_main(parser.parse_args().command))
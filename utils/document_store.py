@@ -0,0 +1,151 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, UploadFile
+from pymongo import ReturnDocument
+
+from database import collections, fs_bucket
+from utils.gridfs_utils import MAX_ATTACHMENT_BYTES, UPLOAD_READ_SIZE, gridfs_upload_stream
+
+
+# Content-addressed layer over the "files" GridFS bucket.
+# documents: {_id: sha256, file_id, length, filename, content_type, ref_count, created_at, updated_at}
+# Identical bytes are stored once; applications and employee profiles hold references
+# by file_id and move ref_count up/down (closed applications release theirs). Blobs left
+# at ref_count 0 are reclaimed by the GC once nothing pins them (utils/gridfs_gc.py).
+documents = collections["documents"]
+
+
+# --------------------------- HASHING ---------------------------
+async def _hash_upload(upload: UploadFile, max_bytes: int) -> tuple:
+    """Hash the (already spooled) upload locally, then rewind it for a possible GridFS write."""
+    digest = hashlib.sha256()
+    length = 0
+    while chunk := await upload.read(UPLOAD_READ_SIZE):
+        length += len(chunk)
+        if length > max_bytes:
+            raise HTTPException(status_code=413,
+                                detail=f"'{upload.filename}' exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        digest.update(chunk)
+    await upload.seek(0)
+    return digest.hexdigest(), length
+
+
+# --------------------------- REFERENCE COUNTING ---------------------------
+async def _add_reference(sha256: str) -> Optional[dict]:
+    return await documents.find_one_and_update(
+        {"_id": sha256},
+        {"$inc": {"ref_count": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _register(sha256: str, file_id: ObjectId, length: int, filename: str, content_type: Optional[str]) -> dict:
+    """Record a freshly written blob; if another request won the race, drop ours and share theirs."""
+    now = datetime.now(timezone.utc)
+    doc = await documents.find_one_and_update(
+        {"_id": sha256},
+        {
+            "$inc": {"ref_count": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"file_id": file_id, "length": length, "filename": filename,
+                             "content_type": content_type, "created_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc["file_id"] != file_id:
+        await fs_bucket.delete(file_id)
+    return doc
+
+
+def _result(doc: dict, deduplicated: bool) -> dict:
+    return {"file_id": doc["file_id"], "sha256": doc["_id"], "length": doc["length"],
+            "deduplicated": deduplicated}
+
+
+async def store_upload(upload: UploadFile, max_bytes: int = MAX_ATTACHMENT_BYTES) -> dict:
+    """Store an UploadFile once per distinct content and take a reference to it."""
+    sha256, length = await _hash_upload(upload, max_bytes)
+    doc = await _add_reference(sha256)
+    if doc:
+        return _result(doc, True)
+
+    meta = await gridfs_upload_stream(upload, max_bytes)
+    doc = await _register(sha256, meta["file_id"], length, upload.filename, upload.content_type)
+    return _result(doc, doc["file_id"] != meta["file_id"])
+
+
+async def store_bytes(filename: str, data: bytes, content_type: Optional[str] = None) -> dict:
+    """Same as store_upload for content that is already in memory (e.g. parsed resumes)."""
+    sha256 = hashlib.sha256(data).hexdigest()
+    doc = await _add_reference(sha256)
+    if doc:
+        return _result(doc, True)
+
+    grid_in = fs_bucket.open_upload_stream(filename, metadata={"content_type": content_type})
+    await grid_in.write(data)
+    await grid_in.set("sha256", sha256)
+    await grid_in.close()
+    file_id = grid_in._id
+    doc = await _register(sha256, file_id, len(data), filename, content_type)
+    return _result(doc, doc["file_id"] != file_id)
+
+
+async def store_uploads(*uploads: Optional[UploadFile]) -> list:
+    """Store several uploads concurrently; None entries stay None.
+
+    If any upload fails, references taken by the others are released and the first error is raised.
+    """
+    async def _store(upload):
+        return await store_upload(upload) if upload else None
+
+    results = await asyncio.gather(*(_store(u) for u in uploads), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        for r in results:
+            if isinstance(r, dict):
+                await release(r["file_id"])
+        raise errors[0]
+    return results
+
+
+async def release(file_id, delete_untracked: bool = True) -> bool:
+    """Drop one reference to a stored file.
+
+    Files stored before the content-addressed layer have no documents entry and are deleted
+    directly, unless `delete_untracked` is False (then they are left to the GC).
+    """
+    try:
+        oid = ObjectId(str(file_id))
+    except (InvalidId, TypeError):
+        return False
+
+    result = await documents.update_one(
+        {"file_id": oid, "ref_count": {"$gt": 0}},
+        {"$inc": {"ref_count": -1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+    )
+    if result.matched_count:
+        return True
+    if delete_untracked and not await documents.find_one({"file_id": oid}, {"_id": 1}):
+        try:
+            await fs_bucket.delete(oid)
+        except Exception:
+            return False
+        return True
+    return False
+
+
+async def release_attachments(doc: dict, fields=("resume", "cover_letter")):
+    """Release the files a closed application references.
+
+    The blobs stay until the GC retention for closed applications has passed.
+    """
+    for field in fields:
+        if doc.get(field):
+            await release(doc[field], delete_untracked=False)
@@ -0,0 +1,117 @@
+# --------------------------- IMPORTS ---------------------------
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import db
+from utils.file_upload_utils import logger
+
+
+# --------------------------- SETTINGS ---------------------------
+# Canonical type: employee_id is a digit string in employees, users and applications
+MIGRATION_ID = "employee_id_to_string"
+TARGET_COLLECTIONS = ["employees", "users", "applications"]
+NUMERIC_TYPES = ["int", "long", "double", "decimal"]
+BATCH_SIZE = 1000
+
+migrations = db.migrations
+
+
+def canonical_employee_id(value) -> str:
+    """12345, 12345.0 and " 12345 " all become "12345"."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+# --------------------------- CHECKPOINT ---------------------------
+async def _load_checkpoint() -> dict:
+    state = await migrations.find_one({"_id": MIGRATION_ID})
+    return state or {"_id": MIGRATION_ID, "collections": {}, "completed": False}
+
+
+async def _save_checkpoint(state: dict):
+    state["updated_at"] = datetime.now(timezone.utc)
+    await migrations.replace_one({"_id": MIGRATION_ID}, state, upsert=True)
+
+
+# --------------------------- MIGRATION ---------------------------
+async def _migrate_collection(name: str, state: dict, batch_size: int, dry_run: bool) -> dict:
+    progress = state["collections"].setdefault(
+        name, {"last_id": None, "converted": 0, "conflicts": 0, "done": False}
+    )
+    if progress["done"]:
+        return progress
+
+    coll = db[name]
+    while True:
+        # Walk by _id so an interrupted run resumes after the last finished batch
+        query = {"employee_id": {"$type": NUMERIC_TYPES}}
+        if progress["last_id"] is not None:
+            query["_id"] = {"$gt": progress["last_id"]}
+        docs = await coll.find(query, {"employee_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        ops = [
+            UpdateOne({"_id": d["_id"], "employee_id": d["employee_id"]},
+                      {"$set": {"employee_id": canonical_employee_id(d["employee_id"])}})
+            for d in docs
+        ]
+        if not dry_run:
+            try:
+                result = await coll.bulk_write(ops, ordered=False)
+                progress["converted"] += result.modified_count
+            except BulkWriteError as e:
+                # A string duplicate already exists (unique index); leave the numeric doc for review
+                details = e.details or {}
+                progress["converted"] += details.get("nModified", 0)
+                progress["conflicts"] += len(details.get("writeErrors", []))
+                logger.warning(f"{MIGRATION_ID}: {name} batch had {len(details.get('writeErrors', []))} conflicts")
+        else:
+            progress["converted"] += len(ops)
+
+        progress["last_id"] = docs[-1]["_id"]
+        if not dry_run:
+            await _save_checkpoint(state)
+
+    progress["done"] = True
+    return progress
+
+
+async def migrate_employee_ids(batch_size: int = BATCH_SIZE, dry_run: bool = False) -> dict:
+    """Convert every numeric employee_id to its canonical string form. Re-running resumes."""
+    state = await _load_checkpoint()
+    if state.get("completed"):
+        logger.info(f"{MIGRATION_ID}: already completed")
+        return state
+
+    for name in TARGET_COLLECTIONS:
+        await _migrate_collection(name, state, batch_size, dry_run)
+        logger.info(f"{MIGRATION_ID}: {name} -> {state['collections'][name]}")
+
+    state["completed"] = True
+    if not dry_run:
+        await _save_checkpoint(state)
+    return state
+
+
+# --------------------------- CLI ---------------------------
+# python -m utils.employee_id_migration [--batch-size N] [--dry-run] [--restart]
+async def _main(args):
+    if args.restart:
+        await migrations.delete_one({"_id": MIGRATION_ID})
+    state = await migrate_employee_ids(args.batch_size, args.dry_run)
+    print(json.dumps(state, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store employee_id as a string in all collections")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    asyncio.run(_main(parser.parse_args()))
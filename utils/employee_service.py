@@ -7,7 +7,8 @@ import tempfile
 from fastapi import HTTPException
 import fitz  # PyMuPDF - Library for handling PDF files
 from docx import Document  # Library for handling Word documents (.docx)
-from database import employees, resource_request, fs, applications
+from database import employees, resource_request, applications
+from utils.document_store import store_bytes
 import struct
 import re
 
@@ -16,6 +17,9 @@ resource_request_col = resource_request  # For handling resource requests
 app_col = applications  # For handling job applications
 emp_col = employees  # For handling employee records
 
+# Employees deactivated by a CVR delta upload have status False; older documents may lack the field
+ACTIVE_EMPLOYEE = {"status": {"$ne": False}}
+
 # Helper function to serialize MongoDB documents for easy conversion to dictionaries
 def _serialize(doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not doc:
@@ -26,13 +30,13 @@ def _serialize(doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     return out
 
 # Fetch all employees from the employees collection
-async def fetch_all_employees() -> List[Dict[str, Any]]:
-    cursor = emp_col.find({})  # Retrieve all employees
+async def fetch_all_employees(include_inactive: bool = False) -> List[Dict[str, Any]]:
+    cursor = emp_col.find({} if include_inactive else ACTIVE_EMPLOYEE)  # Retrieve all (active) employees
     results = await cursor.to_list(length=None)  # Convert cursor to list
     return [_serialize(d) for d in results]  # Serialize and return the results
 
 # Fetch an employee by their employee_id
-async def fetch_employee_by_id(emp_id: int) -> Optional[Dict[str, Any]]:
+async def fetch_employee_by_id(emp_id: str) -> Optional[Dict[str, Any]]:
     doc = await emp_col.find_one({"employee_id": emp_id})  # Find employee by ID
     if not doc:
         return None  # Return None if employee is not found
@@ -46,22 +50,22 @@ async def get_jobs_by_hm(hm_id: str) -> List[Dict[str, Any]]:
 
 # Fetch employees of type "TP" (Temporary Personnel)
 async def get_tp_employees() -> List[Dict[str, Any]]:
-    cursor = emp_col.find({"Type": "TP"})  # Filter employees by "Type" field
+    cursor = emp_col.find({"Type": "TP", **ACTIVE_EMPLOYEE})  # Filter employees by "Type" field
     docs = await cursor.to_list(length=None)  # Convert cursor to list
     return [_serialize(doc) for doc in docs]  # Serialize and return the results
 
 # Update the extracted text of a resume for an employee
-async def update_parsed_resume(emp_id: int, parsed_text: str):
+async def update_parsed_resume(emp_id: str, parsed_text: str):
     result = await emp_col.update_one(
         {"employee_id": emp_id},  # Find employee by ID
         {"$set": {"ExtractedText": parsed_text}}  # Update the ExtractedText field with parsed text
     )
     return result.modified_count > 0  # Return True if the update was successful
 
-# Save file bytes to GridFS and return the file ID
-def save_to_gridfs(filename: str, file_bytes: bytes) -> str:
-    file_id = fs.put(file_bytes, filename=filename)  # Store the file in GridFS
-    return str(file_id)  # Return the file ID as a string
+# Save file bytes to GridFS (content-addressed, one copy per distinct file) and return the file ID
+async def save_to_gridfs(filename: str, file_bytes: bytes, content_type: Optional[str] = None) -> str:
+    stored = await store_bytes(filename, file_bytes, content_type)  # Takes a reference on the stored file
+    return str(stored["file_id"])  # Return the file ID as a string
 
 # Extract text from a PDF file
 def extract_text_from_pdf(file_bytes: bytes) -> str:
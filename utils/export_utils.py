@@ -0,0 +1,102 @@
+# --------------------------- IMPORTS ---------------------------
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+
+# Streaming exports: rows are written as the Motor cursor yields them,
+# so memory stays at one cursor batch no matter how large the collection is.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+LIST_SEPARATOR = "; "
+
+
+# --------------------------- PROJECTION ---------------------------
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """'employee_id, employee_name' -> ['employee_id', 'employee_name']; None exports every field."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if any(name.startswith("$") for name in names):
+        raise HTTPException(status_code=400, detail="Invalid field name in 'fields'")
+    return names or None
+
+
+def _projection(fields: Optional[List[str]]) -> Optional[dict]:
+    if not fields:
+        return None
+    projection = {name: 1 for name in fields}
+    if "_id" not in fields:
+        projection["_id"] = 0
+    return projection
+
+
+# --------------------------- ROW ENCODING ---------------------------
+def _plain(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join("" if v is None else str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+async def _ndjson_rows(cursor):
+    async for doc in cursor:
+        yield json.dumps(_plain(doc), default=str) + "\n"
+
+
+async def _csv_rows(cursor, fields: Optional[List[str]]):
+    buffer = io.StringIO()
+    writer = None
+    async for doc in cursor:
+        doc = _plain(doc)
+        if writer is None:
+            # Without an explicit field list the first document defines the columns
+            columns = fields or list(doc.keys())
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({k: _csv_cell(v) for k, v in doc.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if writer is None and fields:
+        csv.DictWriter(buffer, fieldnames=fields).writeheader()
+        yield buffer.getvalue()
+
+
+# --------------------------- RESPONSE ---------------------------
+def stream_export(collection, query: dict, sort: list, fmt: str, filename: str,
+                  fields: Optional[List[str]] = None) -> StreamingResponse:
+    """Stream every document matching `query` as NDJSON or CSV."""
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use ndjson or csv.")
+
+    cursor = collection.find(query, _projection(fields)).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+    rows = _ndjson_rows(cursor) if fmt == "ndjson" else _csv_rows(cursor, fields)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
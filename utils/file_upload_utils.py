@@ -1,10 +1,19 @@
 # --------------------------- IMPORTS ---------------------------
+from collections import Counter
 from datetime import datetime, timezone,timedelta
 from typing import List
+import asyncio
+import hashlib
+import json
+import time
 import chardet
+import codecs
 from database import collections
 from models import Employee, ResourceRequest , User
-from io import StringIO
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from io import BytesIO, StringIO
 import pandas as pd
 import csv
 import os
@@ -25,11 +34,34 @@ PROCESSED_FOLDER = "upload_files/processed"
 
 
 # --------------------------- AUDIT LOGGING ---------------------------
+# Row errors are stored one document per row in upload_errors, linked by upload_id (the
+# audit entry's _id); the audit entry keeps the counts and the first AUDIT_ERRORS_SAMPLE
+# errors, so a large failing file cannot push it towards the 16 MB document limit.
+AUDIT_ERRORS_SAMPLE = int(os.getenv("AUDIT_ERRORS_SAMPLE", "20"))
+UPLOAD_ERRORS_BATCH = 5000
+
+
+def _error_counts(errors: list, field: str, label: str) -> list:
+    counts = Counter(value for error in errors for value in error.get(field, []))
+    return [{label: value, "count": count} for value, count in counts.most_common()]
+
+
+async def store_upload_errors(upload_id: ObjectId, audit_type: str, errors: list):
+    for start in range(0, len(errors), UPLOAD_ERRORS_BATCH):
+        await collections["upload_errors"].insert_many(
+            [{"upload_id": upload_id, "audit_type": audit_type, **error}
+             for error in errors[start:start + UPLOAD_ERRORS_BATCH]],
+            ordered=False)
+
+
 async def log_upload_action(audit_type: str, filename: str, file_type: str,
                            uploaded_by: str, total_rows: int, valid_rows: int,
-                           failed_rows: int, errors):
-    # Insert audit details into database
+                           failed_rows: int, errors, **extra) -> str:
+    """Insert the audit entry and its row errors; returns the upload id."""
+    # extra: upload-specific details, e.g. the applied delta
+    upload_id = ObjectId()
     await collections["audit_logs"].insert_one({
+        "_id": upload_id,
         "audit_type": audit_type,
         "filename": filename,
         "file_type": file_type,
@@ -38,8 +70,14 @@ async def log_upload_action(audit_type: str, filename: str, file_type: str,
         "total_rows": total_rows,
         "valid_rows": valid_rows,
         "failed_rows": failed_rows,
-        "errors": errors,
+        "errors_stored": len(errors),
+        "errors_sample": errors[:AUDIT_ERRORS_SAMPLE],
+        "error_columns": _error_counts(errors, "columns", "column"),
+        "error_types": _error_counts(errors, "error_types", "error_type"),
+        **extra,
     })
+    await store_upload_errors(upload_id, audit_type, errors)
+    return str(upload_id)
  
  
 # --------------------------- DATE NORMALIZATION ---------------------------
@@ -56,43 +94,109 @@ def convert_dates_for_mongo(data: dict):
  
  
 # --------------------------- RR DATABASE SYNC ---------------------------
-async def sync_rr_with_db(validated_rrs: List[ResourceRequest]):
-    # IDs present in uploaded file
-    uploaded_ids = {rr.resource_request_id for rr in validated_rrs}
- 
-    # Fetch existing RRs from DB
-    existing_rrs = await collections["resource_request"].find(
-        {}, {"resource_request_id": 1, "rr_status": 1}
-    ).to_list(None)
-    rr_map = {r["resource_request_id"]: r for r in existing_rrs}
- 
-    rr_insert, rr_reactivate = [], []
-    
-    # Process uploaded RRs
+# Managed by the app, not the report: `flag` is cleared when an HM deletes a job.
+# They are written on insert only and are not part of content_hash.
+RR_SYNC_PRESERVED_FIELDS = {"flag"}
+# Fields an HM changed through /jobs/modify or /jobs/patch (utils/jobs_crud.py); the
+# report sync no longer overwrites them on that RR
+RR_HM_EDITED_FIELDS = "hm_edited_fields"
+
+
+def rr_content_hash(rr_data: dict) -> str:
+    """Fingerprint of the report fields of a validated RR; equal hashes mean nothing to write."""
+    report_data = {k: v for k, v in rr_data.items() if k not in RR_SYNC_PRESERVED_FIELDS}
+    canonical = json.dumps(report_data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _rr_update(rr_id: str, rr_data: dict, current: dict) -> UpdateOne:
+    report_data = {k: v for k, v in rr_data.items() if k not in current.get(RR_HM_EDITED_FIELDS, [])}
+    return UpdateOne({"resource_request_id": rr_id}, {"$set": report_data})
+
+
+async def sync_rr_with_db(validated_rrs: List[ResourceRequest], deactivate_missing: bool = True):
+    """Delta-sync the RR report: write only new, changed, reactivated and vanished RRs.
+
+    Each stored RR carries content_hash; rows whose hash matches an active RR are skipped.
+    App-managed fields (RR_SYNC_PRESERVED_FIELDS) and fields edited by the HM are never
+    overwritten. All writes go out in a single unordered bulk_write. Returns the changeset.
+    `deactivate_missing=False` is for partial files (e.g. HM-created jobs): insert / update
+    only, RRs not in the file are left alone.
+    """
+    # Latest row wins if the report lists an RR twice
+    incoming = {}
     for rr in validated_rrs:
-        rr_id = rr.resource_request_id
-        rr_data = convert_dates_for_mongo(rr.model_dump(by_alias=False))
- 
-        if rr_id not in rr_map:
-            rr_insert.append(rr_data)
-        elif not rr_map[rr_id].get("rr_status"):
-            rr_reactivate.append({"filter": {"resource_request_id": rr_id},
-                                  "update": {"$set": {"rr_status": True}}})
- 
-    # Deactivate RRs missing in upload
-    deactivate_rr = [{"filter": {"resource_request_id": rid}, "update": {"$set": {"rr_status": False}}}
-                     for rid in rr_map if rid not in uploaded_ids and rr_map[rid].get("rr_status")]
-    
-    # Execute DB operations
-    if rr_insert:
-        await collections["resource_request"].insert_many(rr_insert, ordered=False)
+        rr_data = convert_dates_for_mongo(rr.model_dump(by_alias=False, exclude=RR_SYNC_PRESERVED_FIELDS))
+        rr_data["content_hash"] = rr_content_hash(rr_data)
+        incoming[rr.resource_request_id] = rr_data
 
-    for op in rr_reactivate + deactivate_rr:
-        await collections["resource_request"].update_one(op["filter"], op["update"])
-    
+    # Only the fingerprint, status and HM-edited fields of existing RRs are needed
+    scope = {} if deactivate_missing else {"resource_request_id": {"$in": list(incoming)}}
+    existing = {
+        r["resource_request_id"]: r
+        async for r in collections["resource_request"].find(
+            scope, {"_id": 0, "resource_request_id": 1, "rr_status": 1, "content_hash": 1, RR_HM_EDITED_FIELDS: 1}
+        )
+    }
+
+    ops = []
+    changeset = {"inserted": [], "updated": [], "reactivated": [], "deactivated": []}
+    unchanged = 0
+
+    for rr_id, rr_data in incoming.items():
+        current = existing.get(rr_id)
+        if current is None:
+            ops.append(UpdateOne(
+                {"resource_request_id": rr_id},
+                {"$set": rr_data, "$setOnInsert": {f: ResourceRequest.model_fields[f].default
+                                                   for f in RR_SYNC_PRESERVED_FIELDS}},
+                upsert=True,
+            ))
+            changeset["inserted"].append(rr_id)
+        elif "content_hash" not in current:
+            # Stored before the delta sync: its fields may carry edits we cannot tell apart,
+            # so only the hash is adopted (and the status restored, as the old sync did)
+            update = {"content_hash": rr_data["content_hash"]}
+            if not current.get("rr_status"):
+                update["rr_status"] = rr_data["rr_status"]
+                changeset["reactivated"].append(rr_id)
+            else:
+                unchanged += 1
+            ops.append(UpdateOne({"resource_request_id": rr_id}, {"$set": update}))
+        elif not current.get("rr_status"):
+            # Back in the report: restore the reported status (and any changed fields)
+            ops.append(_rr_update(rr_id, rr_data, current) if current["content_hash"] != rr_data["content_hash"]
+                       else UpdateOne({"resource_request_id": rr_id}, {"$set": {"rr_status": rr_data["rr_status"]}}))
+            changeset["reactivated"].append(rr_id)
+        elif current["content_hash"] != rr_data["content_hash"]:
+            ops.append(_rr_update(rr_id, rr_data, current))
+            changeset["updated"].append(rr_id)
+        else:
+            unchanged += 1
+
+    # Deactivate RRs missing in upload (full reports only)
+    for rr_id, current in existing.items():
+        if deactivate_missing and rr_id not in incoming and current.get("rr_status"):
+            ops.append(UpdateOne({"resource_request_id": rr_id}, {"$set": {"rr_status": False}}))
+            changeset["deactivated"].append(rr_id)
+
+    write_errors = 0
+    if ops:
+        try:
+            await collections["resource_request"].bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            write_errors = len((e.details or {}).get("writeErrors", []))
+            logger.error(f"RR sync: {write_errors} write errors")
+
+    logger.info("RR sync: " + ", ".join(f"{k}={len(v)}" for k, v in changeset.items()) + f", unchanged={unchanged}")
     return {
-        "rr_inserted": len(rr_insert),
-        "rr_reactivated+deactivated": len(rr_reactivate) + len(deactivate_rr),
+        "rr_inserted": len(changeset["inserted"]),
+        "rr_updated": len(changeset["updated"]),
+        "rr_reactivated": len(changeset["reactivated"]),
+        "rr_deactivated": len(changeset["deactivated"]),
+        "rr_unchanged": unchanged,
+        "write_errors": write_errors,
+        "changeset": changeset,
     }
  
  
@@ -116,67 +220,133 @@ async def delete_old_files_in_processed():
  
  
 # --------------------------- EMPLOYEE + USER SYNC ---------------------------
+# Rows per bulk_write and how many batches may be in flight at once
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "1000"))
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+# Written by the employee (resume upload); a report sync must never overwrite them
+EMPLOYEE_SYNC_PRESERVED_FIELDS = {"resume", "resume_text"}
+# User roles that follow the employee Type column; any other role (Admin, HM, WFM, ...)
+# was assigned in the app and is never overwritten by a report
+EMPLOYEE_ROLES = ["TP", "Non TP"]
+
+
+def _employee_upsert(emp: Employee) -> UpdateOne:
+    emp_data = convert_dates_for_mongo(emp.model_dump(by_alias=False, exclude=EMPLOYEE_SYNC_PRESERVED_FIELDS))
+    # Present in the report -> active (covers insert, update and reactivation in one write)
+    emp_data["status"] = True
+    return UpdateOne(
+        {"employee_id": emp.employee_id},
+        {"$set": emp_data, "$setOnInsert": {field: None for field in EMPLOYEE_SYNC_PRESERVED_FIELDS}},
+        upsert=True,
+    )
+
+
+def user_role_update(employee_id: str, role: str) -> UpdateOne:
+    # Keep a TP / Non TP role in line with the employee's Type; app-assigned roles stay
+    return UpdateOne({"employee_id": employee_id, "role": {"$in": EMPLOYEE_ROLES}}, {"$set": {"role": role}})
+
+
+def _user_upserts(user: User) -> List[UpdateOne]:
+    # Missing users are created; existing ones keep their password. Present in the report ->
+    # active again (undoes a delta DEACTIVATE, like employees.status) with the current role
+    user_data = user.model_dump(by_alias=False, exclude={"employee_id", "is_active"})
+    return [
+        UpdateOne({"employee_id": user.employee_id},
+                  {"$set": {"is_active": True}, "$setOnInsert": user_data}, upsert=True),
+        user_role_update(user.employee_id, user.role),
+    ]
+
+
+async def _bulk_upsert(collection, ops: List[UpdateOne]) -> dict:
+    try:
+        result = await collection.bulk_write(ops, ordered=False)
+        return {"upserted": result.upserted_count, "matched": result.matched_count,
+                "modified": result.modified_count, "errors": 0}
+    except BulkWriteError as e:
+        details = e.details or {}
+        logger.error(f"{collection.name} bulk upsert: {len(details.get('writeErrors', []))} write errors")
+        return {"upserted": details.get("nUpserted", 0), "matched": details.get("nMatched", 0),
+                "modified": details.get("nModified", 0), "errors": len(details.get("writeErrors", []))}
+
+
 async def sync_employees_with_db(employees: List[Employee], users: List[User]):
- 
-    # Fetch existing employees
-    existing = await collections["employees"].find({}, {"employee_id": 1, "status": 1}).to_list(None)
-    emp_map = {e["employee_id"]: e for e in existing}
- 
-    # Fetch existing users
-    existing_users = await collections["users"].find({}, {"employee_id": 1}).to_list(None)
-    user_set = {u["employee_id"] for u in existing_users}
- 
-    inserts_emp, inserts_user, updates = [], [], []
- 
-    # Loop through uploaded employees
-    for emp, user in zip(employees, users):
-        eid = emp.employee_id
-        emp_data = convert_dates_for_mongo(emp.model_dump(by_alias=False))
-        user_data = user.model_dump(by_alias=False)
- 
-        # Insert new employee
-        if eid not in emp_map:
-            emp_data["status"] = True
-            inserts_emp.append(emp_data)
-            inserts_user.append(user_data)
-        else:
-            # Reactivate if inactive
-            if not emp_map[eid].get("status"):
-                updates.append({"filter": {"employee_id": eid}, "update": {"$set": {"status": True}}})
-            
-            # Update employee data
-            updates.append({"filter": {"employee_id": eid}, "update": {"$set": emp_data}})
-            
-            # Insert user if missing
-            if str(eid) not in user_set:
-                inserts_user.append(user_data)
- 
-    # Insert all new employees
-    if inserts_emp:
-        await collections["employees"].insert_many(inserts_emp, ordered=False)
+    """Upsert employees and their users in chunked, concurrent bulk_write batches.
 
-    # Insert all new users
-    if inserts_user:
-        await collections["users"].insert_many(inserts_user, ordered=False)
+    No collection is preloaded: each batch is one bulk_write per collection.
+    Returns totals plus per-batch timings.
+    """
+    started = time.perf_counter()
+
+    # One write per employee_id; a later row in the report wins
+    pairs = {emp.employee_id: (emp, user) for emp, user in zip(employees, users)}
+    rows = list(pairs.values())
+    batches = [rows[i:i + SYNC_BATCH_SIZE] for i in range(0, len(rows), SYNC_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+    async def _run_batch(number: int, batch: list) -> dict:
+        async with semaphore:
+            batch_started = time.perf_counter()
+            emp_result, user_result = await asyncio.gather(
+                _bulk_upsert(collections["employees"], [_employee_upsert(emp) for emp, _ in batch]),
+                _bulk_upsert(collections["users"], [op for _, user in batch for op in _user_upserts(user)]),
+            )
+            seconds = round(time.perf_counter() - batch_started, 3)
+            logger.info(f"Employee sync batch {number}/{len(batches)}: {len(batch)} rows in {seconds}s")
+            return {"batch": number, "rows": len(batch), "seconds": seconds,
+                    "employees": emp_result, "users": user_result}
+
+    results = await asyncio.gather(*(_run_batch(i + 1, b) for i, b in enumerate(batches)))
+
+    def _total(collection: str, key: str) -> int:
+        return sum(r[collection][key] for r in results)
 
-    # Update existing employees
-    for op in updates:
-        await collections["employees"].update_one(op["filter"], op["update"])
- 
     return {
-        "employees_inserted": len(inserts_emp),
-        "employees_updated": len(updates),
-        "users_inserted": len(inserts_user),
+        "employees_inserted": _total("employees", "upserted"),
+        "employees_updated": _total("employees", "matched"),
+        "employees_modified": _total("employees", "modified"),
+        "users_inserted": _total("users", "upserted"),
+        "write_errors": _total("employees", "errors") + _total("users", "errors"),
+        "duplicate_rows": len(employees) - len(rows),
+        "batches": results,
+        "seconds": round(time.perf_counter() - started, 3),
     }
     
 
+def merge_sync_results(results: List[dict]) -> dict:
+    """Combine sync results (employee sync / CVR delta) from several upload batches."""
+    merged: dict = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif isinstance(value, dict):
+                merged[key] = merge_sync_results([merged.get(key, {}), value])
+            else:
+                merged[key] = merged.get(key, 0) + value
+    if "seconds" in merged:
+        merged["seconds"] = round(merged["seconds"], 3)
+    return merged
+
+
 # --------------------------- CSV READER ---------------------------
-def read_csv_file(content: bytes):
-    """Read CSV reliably even if corrupted or irregular."""
-    
-    # Auto-detect encoding
-    enc = chardet.detect(content).get("encoding") or "utf-8"
+# Encoding is detected on a bounded sample: valid UTF-8 is accepted as-is, chardet only
+# runs on the sample otherwise. Parsing uses pandas' C engine; files it cannot parse
+# (rows longer than the header) go through the tolerant csv-module reader below.
+ENCODING_SAMPLE_BYTES = 64 * 1024
 
+
+def detect_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: a multi-byte character cut off at the end of the sample is fine
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return chardet.detect(sample).get("encoding") or "utf-8"
+
+
+def _read_csv_tolerant(content: bytes, enc: str):
     # Decode bytes → text
     text = content.decode(enc, errors="ignore")
     stream = StringIO(text)
@@ -201,3 +371,45 @@ def read_csv_file(content: bytes):
     # Build DataFrame
     df = pd.DataFrame(data, columns=header)
     return df
+
+
+def read_csv_file(source):
+    """Read CSV reliably even if corrupted or irregular.
+
+    source is the file content (bytes) or a path. Cells are strings, missing ones "";
+    blank rows are dropped and short rows padded. Returns None for an empty file.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        sample = bytes(source[:ENCODING_SAMPLE_BYTES])
+    else:
+        with open(source, "rb") as f:
+            sample = f.read(ENCODING_SAMPLE_BYTES)
+    enc = detect_encoding(sample)
+
+    try:
+        # header=None: the first line fixes the width, so longer rows raise instead of
+        # being silently re-read as an index column
+        df = pd.read_csv(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source,
+                         header=None, dtype=object, na_filter=False, engine="c",
+                         encoding=enc, encoding_errors="ignore")
+    except pd.errors.EmptyDataError:
+        return None
+    except (pd.errors.ParserError, ValueError):
+        if not isinstance(source, (bytes, bytearray)):
+            with open(source, "rb") as f:
+                source = f.read()
+        return _read_csv_tolerant(source, enc)
+
+    # The C engine only skips empty lines; also drop rows whose cells are all whitespace
+    # (only rows with a blank first cell can qualify)
+    if (candidates := df.iloc[:, 0].str.strip().eq("")).any():
+        blank = df[candidates].apply(lambda col: col.str.strip().eq("")).all(axis=1)
+        df = df.drop(index=blank[blank].index)
+    if df.empty:
+        return None
+
+    # Header = first remaining row
+    header = df.iloc[0].tolist()
+    df = df.iloc[1:].reset_index(drop=True)
+    df.columns = header
+    return df
@@ -0,0 +1,133 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from utils.file_upload_utils import logger, UPLOAD_FOLDER, PROCESSED_FOLDER
+from utils.report_reader import REPORT_EXTENSIONS
+from utils.upload_jobs import submit_upload_job, upload_jobs, STAGING_FOLDER, ACTIVE_STATUSES
+
+try:
+    # inotify / FSEvents / ReadDirectoryChangesW through watchfiles when installed
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+
+# Watcher for RR reports dropped into upload_files/unprocessed (e.g. the CSV that
+# create_resource_request appends new HM jobs to).
+# Every settled file is claimed in arrival order (mtime) by an atomic rename into the
+# staging folder, so writers that append afterwards start a fresh file, and is queued as
+# an rr_report upload job (read from disk by the workers). Successful files are moved to
+# processed/, failed ones to quarantine/. Without watchfiles the folder is polled.
+WATCH_ENABLED = os.getenv("UPLOAD_WATCH_ENABLED", "true").lower() == "true"
+WATCH_POLL_SECONDS = float(os.getenv("UPLOAD_WATCH_POLL_SECONDS", "5"))
+# A file is picked up once it has not been modified for this long
+WATCH_SETTLE_SECONDS = float(os.getenv("UPLOAD_WATCH_SETTLE_SECONDS", "2"))
+# Max watched files queued / processing at once (other uploads keep their place in the queue)
+WATCH_MAX_IN_FLIGHT = int(os.getenv("UPLOAD_WATCH_MAX_IN_FLIGHT", "2"))
+QUARANTINE_FOLDER = os.getenv("UPLOAD_QUARANTINE_FOLDER", "upload_files/quarantine")
+
+_watcher = None
+_in_flight: set = set()
+
+
+# --------------------------- PICKUP ---------------------------
+def _settled_files() -> list:
+    """Report files in UPLOAD_FOLDER that stopped changing, oldest first."""
+    cutoff = time.time() - WATCH_SETTLE_SECONDS
+    files = []
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(REPORT_EXTENSIONS):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if mtime <= cutoff:
+                files.append((mtime, entry.name))
+    return [name for _, name in sorted(files)]
+
+
+def _claim(name: str) -> str:
+    # Atomic on the same filesystem; the new path is unique per pickup
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    staged = os.path.join(STAGING_FOLDER, f"{time.time_ns()}_{name}")
+    os.replace(os.path.join(UPLOAD_FOLDER, name), staged)
+    return staged
+
+
+async def _refresh_in_flight():
+    if _in_flight:
+        active = upload_jobs.find({"_id": {"$in": list(_in_flight)}, "status": {"$in": ACTIVE_STATUSES}}, {"_id": 1})
+        _in_flight.intersection_update({job["_id"] async for job in active})
+
+
+async def process_pending_files():
+    """Queue settled files from UPLOAD_FOLDER, oldest first, up to WATCH_MAX_IN_FLIGHT."""
+    await _refresh_in_flight()
+    for name in await asyncio.to_thread(_settled_files):
+        if len(_in_flight) >= WATCH_MAX_IN_FLIGHT:
+            return
+        stamp = f"{datetime.now():%Y%m%d_%H%M%S}_{name}"
+        try:
+            staged = await asyncio.to_thread(_claim, name)
+        except FileNotFoundError:
+            continue
+        try:
+            job = await submit_upload_job("rr_report", name, "system", staged_path=staged,
+                                          move_to=os.path.join(PROCESSED_FOLDER, stamp),
+                                          quarantine_to=os.path.join(QUARANTINE_FOLDER, stamp))
+        except Exception as e:
+            logger.error(f"Auto RR failed for {name}: {e}")
+            await asyncio.to_thread(os.replace, staged, os.path.join(QUARANTINE_FOLDER, stamp))
+            continue
+        # Same content already ingested (possibly under another name): moved to processed/ without re-syncing
+        if job.get("duplicate"):
+            logger.info(f"Auto RR skipped: {name} matches '{job['filename']}' (job {job['_id']})")
+        else:
+            _in_flight.add(job["_id"])
+            logger.info(f"Auto RR queued: {name} (job {job['_id']})")
+
+
+# --------------------------- WATCH LOOP ---------------------------
+async def _watch():
+    for folder in (UPLOAD_FOLDER, PROCESSED_FOLDER, QUARANTINE_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+    logger.info(f"Watching {UPLOAD_FOLDER} ({'events' if awatch else 'polling'})")
+    await process_pending_files()
+    if awatch is None:
+        while True:
+            await asyncio.sleep(WATCH_POLL_SECONDS)
+            await process_pending_files()
+    # Timeouts still wake the loop so settling files and freed slots are picked up
+    async for _ in awatch(UPLOAD_FOLDER, recursive=False, yield_on_timeout=True,
+                          rust_timeout=int(WATCH_POLL_SECONDS * 1000)):
+        await process_pending_files()
+
+
+async def _run_watcher():
+    while True:
+        try:
+            await _watch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Upload folder watcher error, restarting: {e}")
+            await asyncio.sleep(WATCH_POLL_SECONDS)
+
+
+def start_folder_watcher():
+    global _watcher
+    if WATCH_ENABLED and _watcher is None:
+        _watcher = asyncio.create_task(_run_watcher())
+
+
+async def stop_folder_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        await asyncio.gather(_watcher, return_exceptions=True)
+        _watcher = None
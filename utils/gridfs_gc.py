@@ -0,0 +1,190 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Set
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from database import collections, fs_bucket
+from models import ApplicationStatus
+from utils.file_upload_utils import logger
+
+
+# --------------------------- SETTINGS ---------------------------
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "500"))
+# Pause between batches so a sweep never saturates the cluster
+GC_BATCH_INTERVAL_SECONDS = float(os.getenv("GC_BATCH_INTERVAL_SECONDS", "1.0"))
+# Files (and store entries) touched more recently than this are never collected,
+# which covers uploads whose application / profile write is still in flight
+GC_GRACE_HOURS = int(os.getenv("GC_GRACE_HOURS", "24"))
+# Withdrawn / rejected applications stop pinning their attachments after this many days (0 = keep forever)
+GC_CLOSED_APPLICATION_RETENTION_DAYS = int(os.getenv("GC_CLOSED_APPLICATION_RETENTION_DAYS", "180"))
+GC_INTERVAL_HOURS = int(os.getenv("GC_INTERVAL_HOURS", "24"))
+GC_SAMPLE_SIZE = 100
+
+CLOSED_STATUSES = [ApplicationStatus.WITHDRAWN.value, ApplicationStatus.REJECTED.value]
+
+_gc_lock = asyncio.Lock()
+
+
+def _as_object_id(value):
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return None
+
+
+# --------------------------- MARK ---------------------------
+async def _referenced_file_ids(now: datetime) -> Set[ObjectId]:
+    """Every GridFS file id still referenced by an application or an employee profile."""
+    referenced: Set[ObjectId] = set()
+
+    # Store entries with live references are never collected
+    async for doc in collections["documents"].find({"ref_count": {"$gt": 0}}, {"file_id": 1}):
+        referenced.add(doc["file_id"])
+
+    app_query = {}
+    if GC_CLOSED_APPLICATION_RETENTION_DAYS > 0:
+        cutoff = now - timedelta(days=GC_CLOSED_APPLICATION_RETENTION_DAYS)
+        # Retention runs from closed_at (set on withdraw / reject). Rejections from before
+        # closed_at existed have rejected_at; older withdrawals have no reliable date and stay pinned.
+        app_query = {"$nor": [
+            {"status": {"$in": CLOSED_STATUSES}, "closed_at": {"$lt": cutoff}},
+            {"status": ApplicationStatus.REJECTED.value, "closed_at": {"$exists": False}, "rejected_at": {"$lt": cutoff}},
+        ]}
+    async for app in collections["applications"].find(app_query, {"resume": 1, "cover_letter": 1}):
+        for field in ("resume", "cover_letter"):
+            if oid := _as_object_id(app.get(field)):
+                referenced.add(oid)
+
+    async for emp in collections["employees"].find(
+        {"$or": [{"resume": {"$ne": None}}, {"resume_file_id": {"$ne": None}}]},
+        {"resume": 1, "resume_file_id": 1},
+    ):
+        for field in ("resume", "resume_file_id"):
+            if oid := _as_object_id(emp.get(field)):
+                referenced.add(oid)
+    return referenced
+
+
+# --------------------------- SWEEP ---------------------------
+async def _delete_file(file_doc: dict, grace_cutoff: datetime) -> bool:
+    """Delete one unreferenced file; store entries touched inside the grace window are kept."""
+    sha256 = file_doc.get("sha256")
+    if sha256:
+        entry = await collections["documents"].find_one({"_id": sha256, "file_id": file_doc["_id"]}, {"_id": 1})
+        if entry:
+            # Conditional delete: loses against any reference taken since the mark phase
+            result = await collections["documents"].delete_one(
+                {"_id": sha256, "file_id": file_doc["_id"], "ref_count": {"$lte": 0},
+                 "updated_at": {"$lt": grace_cutoff}}
+            )
+            if not result.deleted_count:
+                return False
+    try:
+        await fs_bucket.delete(file_doc["_id"])
+    except NoFile:
+        return False
+    return True
+
+
+async def _sweep_files(referenced: Set[ObjectId], grace_cutoff: datetime, dry_run: bool, stats: dict):
+    last_id = None
+    while True:
+        query = {"uploadDate": {"$lt": grace_cutoff}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collections["files"].find(
+            query, {"_id": 1, "length": 1, "filename": 1, "sha256": 1}
+        ).sort("_id", 1).limit(GC_BATCH_SIZE).to_list(GC_BATCH_SIZE)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        stats["files_scanned"] += len(batch)
+
+        for file_doc in batch:
+            if file_doc["_id"] in referenced:
+                continue
+            if len(stats["sample"]) < GC_SAMPLE_SIZE:
+                stats["sample"].append({"file_id": str(file_doc["_id"]), "filename": file_doc.get("filename"),
+                                        "length": file_doc.get("length", 0)})
+            if dry_run or await _delete_file(file_doc, grace_cutoff):
+                stats["files_deleted"] += 1
+                stats["bytes_reclaimed"] += file_doc.get("length", 0)
+
+        await asyncio.sleep(GC_BATCH_INTERVAL_SECONDS)
+
+
+async def _sweep_orphan_chunks(grace_cutoff: datetime, dry_run: bool, stats: dict):
+    """Chunks whose files.files document no longer exists (e.g. an interrupted delete).
+
+    The files document is only written when an upload closes, so chunks of recent
+    uploads (by files_id creation time) are left alone.
+    """
+    chunks = collections["file_chunks"]
+    files_ids = [d["_id"] async for d in chunks.aggregate([
+        {"$match": {"files_id": {"$lt": ObjectId.from_datetime(grace_cutoff)}}},
+        {"$group": {"_id": "$files_id"}},
+    ], allowDiskUse=True)]
+
+    for i in range(0, len(files_ids), GC_BATCH_SIZE):
+        batch = files_ids[i:i + GC_BATCH_SIZE]
+        existing = {d["_id"] async for d in collections["files"].find({"_id": {"$in": batch}}, {"_id": 1})}
+        orphans = [fid for fid in batch if fid not in existing]
+        if orphans:
+            sizes = await chunks.aggregate([
+                {"$match": {"files_id": {"$in": orphans}}},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "bytes": {"$sum": {"$binarySize": "$data"}}}},
+            ]).to_list(1)
+            if sizes:
+                stats["orphan_chunks_deleted"] += sizes[0]["count"]
+                stats["bytes_reclaimed"] += sizes[0]["bytes"]
+            if not dry_run:
+                await chunks.delete_many({"files_id": {"$in": orphans}})
+        await asyncio.sleep(GC_BATCH_INTERVAL_SECONDS)
+
+
+# --------------------------- ENTRY POINT ---------------------------
+async def collect_orphaned_files(dry_run: bool = False) -> dict:
+    """Mark-and-sweep GridFS: delete files and chunks no application or employee references.
+
+    With dry_run=True nothing is deleted; the report lists what would be reclaimed.
+    Each run is recorded in the gc_runs collection.
+    """
+    if _gc_lock.locked():
+        return {"skipped": True, "reason": "A GridFS GC run is already in progress"}
+
+    async with _gc_lock:
+        now = datetime.now(timezone.utc)
+        grace_cutoff = now - timedelta(hours=GC_GRACE_HOURS)
+        stats = {
+            "dry_run": dry_run,
+            "started_at": now,
+            "files_scanned": 0,
+            "files_deleted": 0,
+            "orphan_chunks_deleted": 0,
+            "bytes_reclaimed": 0,
+            "sample": [],
+        }
+
+        referenced = await _referenced_file_ids(now)
+        stats["referenced_files"] = len(referenced)
+        await _sweep_files(referenced, grace_cutoff, dry_run, stats)
+        await _sweep_orphan_chunks(grace_cutoff, dry_run, stats)
+
+        stats["finished_at"] = datetime.now(timezone.utc)
+        stats["duration_seconds"] = round((stats["finished_at"] - now).total_seconds(), 3)
+        await collections["gc_runs"].insert_one(dict(stats))
+        logger.info(f"GridFS GC {'(dry run) ' if dry_run else ''}done: {stats['files_deleted']} files, "
+                    f"{stats['orphan_chunks_deleted']} orphan chunks, {stats['bytes_reclaimed']} bytes")
+        return stats
+
+
+async def get_gc_runs(limit: int = 20) -> list:
+    runs = await collections["gc_runs"].find().sort("started_at", -1).to_list(limit)
+    for run in runs:
+        run["_id"] = str(run["_id"])
+    return runs
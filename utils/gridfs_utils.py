@@ -0,0 +1,137 @@
+# --------------------------- IMPORTS ---------------------------
+import hashlib
+import mimetypes
+import os
+import re
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from gridfs.errors import NoFile
+
+from database import fs_bucket
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Upper bound for a single resume / cover letter, enforced while streaming
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_READ_SIZE = 256 * 1024
+
+
+# --------------------------- RANGE PARSING ---------------------------
+def parse_range_header(range_header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Return (start, end) inclusive for a single 'bytes=' range, None to serve the full file.
+
+    Raises 416 when the range cannot be satisfied. Multi-range requests are served in full.
+    """
+    match = RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: last N bytes
+        suffix = int(end)
+        if suffix == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+        return max(length - suffix, 0), length - 1
+    start = int(start)
+    end = min(int(end), length - 1) if end else length - 1
+    if start >= length or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+    return start, end
+
+
+# --------------------------- STREAMING DOWNLOAD ---------------------------
+async def _iter_grid_out(grid_out, start: int, end: int):
+    # Read at most one GridFS chunk at a time so memory stays bounded
+    grid_out.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        data = await grid_out.read(min(grid_out.chunk_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+async def gridfs_download_response(file_id, request: Request, filename: Optional[str] = None,
+                                   default_media_type: str = "application/pdf") -> Response:
+    """Stream a GridFS file with Range / ETag / Last-Modified support."""
+    try:
+        grid_out = await fs_bucket.open_download_stream(ObjectId(str(file_id)))
+    except (NoFile, InvalidId, TypeError):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    length = grid_out.length
+    upload_date = grid_out.upload_date.replace(tzinfo=timezone.utc)
+    etag = f'"{grid_out._id}-{length}-{int(upload_date.timestamp())}"'
+    final_filename = grid_out.filename or filename or str(file_id)
+    media_type = (grid_out.metadata or {}).get("content_type") \
+        or mimetypes.guess_type(final_filename)[0] or default_media_type
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": format_datetime(upload_date, usegmt=True),
+        "Content-Disposition": f'attachment; filename="{final_filename}"',
+    }
+
+    # Conditional GET: let the client reuse its cached copy
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if not if_none_match and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if int(upload_date.timestamp()) <= int(since.timestamp()):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and length and (not if_range or if_range.strip() == etag):
+        byte_range = parse_range_header(range_header, length)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(_iter_grid_out(grid_out, 0, length - 1), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_iter_grid_out(grid_out, start, end), status_code=206,
+                             media_type=media_type, headers=headers)
+
+
+# --------------------------- STREAMING UPLOAD ---------------------------
+async def gridfs_upload_stream(upload: UploadFile, max_bytes: int = MAX_ATTACHMENT_BYTES) -> dict:
+    """Pipe an UploadFile into GridFS chunk by chunk, hashing as it goes.
+
+    Returns {"file_id", "sha256", "length"}. Aborts the GridFS file (413) once max_bytes is exceeded.
+    """
+    digest = hashlib.sha256()
+    length = 0
+    grid_in = fs_bucket.open_upload_stream(upload.filename, metadata={"content_type": upload.content_type})
+    try:
+        while chunk := await upload.read(UPLOAD_READ_SIZE):
+            length += len(chunk)
+            if length > max_bytes:
+                raise HTTPException(status_code=413,
+                                    detail=f"'{upload.filename}' exceeds the {max_bytes // (1024 * 1024)} MB limit")
+            digest.update(chunk)
+            await grid_in.write(chunk)
+        await grid_in.set("sha256", digest.hexdigest())
+        await grid_in.close()
+    except BaseException:
+        await grid_in.abort()
+        raise
+    return {"file_id": grid_in._id, "sha256": digest.hexdigest(), "length": length}
+
@@ -1,22 +1,24 @@
 from typing import Optional,Dict,Any
-from motor.motor_asyncio import AsyncIOMotorClient
 from models import ResourceRequest
+from database import db
 import csv
 import os
 from datetime import datetime,date
-from utils.file_upload_utils import logger
+from utils.file_upload_utils import logger, RR_HM_EDITED_FIELDS
 from collections import defaultdict
+from fastapi import HTTPException
+from utils.pagination import DEFAULT_PAGE_SIZE, paginate, page_response
+from utils.employee_service import ACTIVE_EMPLOYEE
 
 # Define the path for the CSV file
 CSV_PATH = os.path.join(os.path.dirname(__file__), "../upload_files/unprocessed/updated_jobs.csv")
 
-# Create MongoDB async client connection 
-client = AsyncIOMotorClient(os.getenv("MONGODB_CLIENT"))
-db = client.talent_management
-
 # List of job grade bands for comparison
 BANDS = ['A1','A2','A3','B1','B2','B3','C1','C2','C3','D1','D2','D3']
 
+# Stable order for job listings (resource_request_id is unique)
+JOBS_SORT = [("resource_request_id", 1)]
+
 #Map resource_request doc to job-like response
 async def map_job(doc):
         
@@ -43,105 +45,83 @@ async def map_job(doc):
 #     - WFM: jobs where wfm_id != jobs wfm_id
 #     - HM: jobs where hm_id != jobs hm_id
  
-async def get_jobs(location: Optional[str], current_user):
-    try:
+async def build_jobs_query(location: Optional[str], current_user):
+    """Return (query, log message) for the jobs visible to this user; query is None for unknown roles."""
+    role = current_user["role"] # Get the role of the current user (Admin, Employee, WFM, HM)
     
-        role = current_user["role"] # Get the role of the current user (Admin, Employee, WFM, HM)
+    # Admin has access to all jobs
+    if role == "Admin" or role=="TP Manager":
+        query={}
+        if location:
+            query["city"] = location
+        log_message = f"Fetched jobs for Role: {role}"
+
+    # Employee role-based access
+    elif role in ["TP", "Non TP"]:
     
-        # Admin has access to all jobs
-        if role == "Admin" or role=="TP Manager":
-            
-            # Fetch the jobs as a list 
-            query={}
+        emp = await db.employees.find_one({"employee_id": str(current_user['employee_id'])})
+        #Role - TP
+        if emp and role == "TP":
+            curr_band = emp["band"]
+            curr_skills = emp.get("detailed_skills", [])
+
+            # Find the index of the current band
+            indx = BANDS.index(curr_band)
+            above_band = BANDS[indx+1] if indx < len(BANDS)-1 else BANDS[indx]
+            below_band = BANDS[indx-1] if indx > 0 else BANDS[indx]
+    
+            query = {
+                "job_grade": {"$in": [curr_band, above_band, below_band]},  # Filter jobs based on bands ±1
+                "mandatory_skills": {"$in": curr_skills},  # Filter jobs based on required skills
+                "flag":True,
+            }
+            # Optional filter by location (city)
             if location:
                 query["city"] = location
-            cursor = db.resource_request.find(query)
-            docs = await cursor.to_list(length=100)
-            for d in docs:
-                d["_id"] = str(d["_id"])
-            logger.info(f"Fetched jobs for Role: {role}")
-            return [await map_job(d) for d in docs]
-
-        # Employee role-based access
-        elif role in ["TP", "Non TP"]:
+            log_message = f"Fetched jobs for TP Employee: {current_user['employee_id']}"
         
-            emp = await db.employees.find_one({"employee_id": int(current_user['employee_id'])})
-            #Role - TP
-            if emp and role == "TP":
-                curr_band = emp["band"]
-                curr_skills = emp.get("detailed_skills", [])
-
-                # Find the index of the current band
-                indx = BANDS.index(curr_band)
-                above_band = BANDS[indx+1] if indx < len(BANDS)-1 else BANDS[indx]
-                below_band = BANDS[indx-1] if indx > 0 else BANDS[indx]
-    
-                query = {
-                    "job_grade": {"$in": [curr_band, above_band, below_band]},  # Filter jobs based on bands ±1
-                    "mandatory_skills": {"$in": curr_skills},  # Filter jobs based on required skills
-                    "flag":True,
-                }
-                # Optional filter by location (city)
-                if location:
-                    query["city"] = location
-    
-                # Execute the query to find jobs
-                cursor = db.resource_request.find(query)
-                docs = await cursor.to_list(length=100)
-                for d in docs:
-                    d["_id"] = str(d["_id"])
-                logger.info(f"Fetched jobs for TP Employee: {current_user['employee_id']}")
-                return [await map_job(d) for d in docs]
-            
-            else:
-                #Role - Non TP
-                query = {}
-                if location:
-                    query["city"] = location
-                query["flag"]=True
-                cursor = db.resource_request.find(query)
-                docs = await cursor.to_list(length=100)
-                for d in docs:
-                    d["_id"] = str(d["_id"])
-                logger.info(f"Fetched jobs for Non TP Employee : {current_user['employee_id']}")
-                return [await map_job(d) for d in docs]
-
-        # WFM role can access jobs based on WFM ID
-        elif role == "WFM":
-            query = {"wfm_id": {"$ne":current_user['employee_id']}}
-            query["flag"] = True
+        else:
+            #Role - Non TP
+            query = {}
             if location:
                 query["city"] = location
-                
-            cursor = db.resource_request.find(query)
-            
-            docs = await cursor.to_list(length=100)
-            
-            for d in docs:
-                d["_id"] = str(d["_id"])
-                
-            logger.info(f"Fetched jobs for WFM Employee:{current_user['employee_id']}")
-            
-            return [await map_job(d) for d in docs]
+            query["flag"]=True
+            log_message = f"Fetched jobs for Non TP Employee : {current_user['employee_id']}"
 
-        # HM role can access jobs based on HM ID
-        elif role == "HM":
-            query = {"hm_id": {"$ne":current_user["employee_id"]}}
-            query["flag"] = True
-            if location:
-                query["city"] = location
-                
-            cursor = db.resource_request.find(query)
-            
-            docs = await cursor.to_list(length=100)
-            
-            for d in docs:
-                d["_id"] = str(d["_id"])
-                
-            logger.info(f"Fetched jobs for HM Employee :{current_user['employee_id']}")
-            
-            return [await map_job(d) for d in docs]
-        
+    # WFM role can access jobs based on WFM ID
+    elif role == "WFM":
+        query = {"wfm_id": {"$ne":current_user['employee_id']}}
+        query["flag"] = True
+        if location:
+            query["city"] = location
+        log_message = f"Fetched jobs for WFM Employee:{current_user['employee_id']}"
+
+    # HM role can access jobs based on HM ID
+    elif role == "HM":
+        query = {"hm_id": {"$ne":current_user["employee_id"]}}
+        query["flag"] = True
+        if location:
+            query["city"] = location
+        log_message = f"Fetched jobs for HM Employee :{current_user['employee_id']}"
+
+    else:
+        return None, None
+    return query, log_message
+
+
+async def get_jobs(location: Optional[str], current_user, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    try:
+        query, log_message = await build_jobs_query(location, current_user)
+        if query is None:
+            return page_response([], None)
+
+        # Seek through resource_request_id (unique index) page by page
+        docs, next_cursor = await paginate(db.resource_request, query, JOBS_SORT, limit, cursor)
+        logger.info(log_message)
+        return page_response([await map_job(d) for d in docs], next_cursor)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in get_jobs for employee_id={current_user.get('employee_id')}, role={current_user.get('role')}: {str(e)}")
         return {"details":f"Error:{e}"}
@@ -251,7 +231,8 @@ async def update_resource_request(request_id: str, update_data: ResourceRequest,
  
                 update_result = await db.resource_request.update_one(
                     {"resource_request_id": request_id, "hm_id": current_user["employee_id"]},
-                    {"$set": update_resource_request_data},
+                    {"$set": update_resource_request_data,
+                     "$addToSet": {RR_HM_EDITED_FIELDS: {"$each": list(update_resource_request_data)}}},
                     session=session
                 )
                 
@@ -322,7 +303,7 @@ async def get_skills_availability(current_user,resource_request_id: Optional[str
 
         # Fetch employees in one query
         employees = await db.employees.find(
-            {"detailed_skills": {"$in": list(all_skills)}},
+            {"detailed_skills": {"$in": list(all_skills)}, **ACTIVE_EMPLOYEE},
             {"employee_id": 1, "employee_name": 1, "designation": 1,
             "primary_technology": 1, "city": 1, "detailed_skills": 1}
         ).to_list(None)
@@ -418,7 +399,7 @@ async def patch_resource_request_single(request_id: str, key: str,value: Any,cur
             try:
                 result = await db.resource_request.update_one(
                     {"resource_request_id": request_id, "hm_id": current_user["employee_id"]},
-                    {"$set": {key: update_value}},
+                    {"$set": {key: update_value}, "$addToSet": {RR_HM_EDITED_FIELDS: key}},
                     session=session
                 )
  
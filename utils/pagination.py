@@ -0,0 +1,83 @@
+# --------------------------- IMPORTS ---------------------------
+import base64
+import binascii
+import json
+from typing import List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+
+
+# Keyset pagination: pages are fetched with a range seek on the sort keys
+# (index-backed, constant cost at any depth) instead of skip().
+# The cursor is opaque to clients: base64 of the sort fields and the last row's values.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 200
+
+SortSpec = List[Tuple[str, int]]
+
+
+# --------------------------- CURSOR TOKENS ---------------------------
+def encode_cursor(sort: SortSpec, doc: dict) -> str:
+    payload = {"s": [field for field, _ in sort], "v": [doc.get(field) for field, _ in sort]}
+    raw = json_util.dumps(payload, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: SortSpec) -> list:
+    """Return the sort-key values stored in a cursor; 400 if it is malformed or from another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw)
+        values = payload["v"]
+        fields = payload["s"]
+    except (binascii.Error, ValueError, TypeError, KeyError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if fields != [field for field, _ in sort] or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return values
+
+
+# --------------------------- SEEK ---------------------------
+def _after(field: str, direction: int, value) -> dict:
+    if value is None:
+        # Missing/null sorts first: ascending continues with every non-null value,
+        # descending has nothing left below it
+        return {field: {"$ne": None}} if direction == 1 else {field: {"$in": []}}
+    if direction == 1:
+        return {field: {"$gt": value}}
+    # Descending, nulls come last and $lt never matches them
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: SortSpec, values: list) -> dict:
+    """Rows strictly after `values` in `sort` order: (a > x) or (a == x and b > y) or ..."""
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        branch.update(_after(field, direction, values[i]))
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+async def paginate(collection, query: dict, sort: SortSpec, limit: int = DEFAULT_PAGE_SIZE,
+                   cursor: Optional[str] = None, projection: Optional[dict] = None) -> Tuple[list, Optional[str]]:
+    """Fetch one page and the cursor for the next one (None on the last page).
+
+    The last sort field must be unique (use "_id" as the tie-breaker) so the order is total.
+    """
+    if cursor:
+        seek = keyset_filter(sort, decode_cursor(cursor, sort))
+        query = {"$and": [query, seek]} if query else seek
+
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort, docs[-1])
+    return docs, next_cursor
+
+
+def page_response(data: list, next_cursor: Optional[str], **extra) -> dict:
+    """Common envelope for list endpoints."""
+    return {"data": data, "count": len(data), "next_cursor": next_cursor, **extra}
@@ -0,0 +1,190 @@
+# --------------------------- IMPORTS ---------------------------
+import os
+from typing import Iterator, List, Sequence
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from exceptions.file_upload_exceptions import ReportProcessingException, ValidationException
+
+try:
+    # Optional: Parquet / Arrow IPC uploads are accepted only when pyarrow is installed
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# Streaming reader for the RR report and the Career Velocity Report.
+# .xlsx files are read with openpyxl in read_only mode, row by row, and handed out as
+# small DataFrame batches, so memory stays at one batch instead of the workbook DOM
+# plus a full DataFrame. The header row is located by its column names, which replaces
+# the hard-coded skiprows=6 of the RR export.
+# Batches are indexed by spreadsheet row number (1-based), so errors can cite the row directly.
+# Parquet / Arrow IPC files are memory-mapped and read as typed record batches instead.
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "5000"))
+HEADER_SCAN_ROWS = 50
+
+ARROW_EXTENSIONS = (".parquet", ".arrow", ".feather", ".ipc")
+REPORT_EXTENSIONS = (".xlsx", ".xls", ".csv") + (ARROW_EXTENSIONS if pa is not None else ())
+
+
+def is_arrow_file(filename: str) -> bool:
+    return filename.lower().endswith(ARROW_EXTENSIONS)
+
+
+# --------------------------- HEADER DETECTION ---------------------------
+def _header_name(value, position: int) -> str:
+    if value is None or str(value).strip() == "":
+        return f"Unnamed: {position}"
+    return str(value).strip()
+
+
+def _is_blank(row: Sequence) -> bool:
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in row)
+
+
+def _find_header(rows: Iterator[tuple], key_columns: Sequence[str]):
+    """Consume rows until one contains every key column; return (row_number, header)."""
+    best_missing = list(key_columns)
+    for row_number, row in enumerate(rows, start=1):
+        if row_number > HEADER_SCAN_ROWS:
+            break
+        names = {str(v).strip() for v in row if v is not None}
+        missing = [c for c in key_columns if c not in names]
+        if not missing:
+            return row_number, [_header_name(v, i) for i, v in enumerate(row)]
+        if len(missing) < len(best_missing):
+            best_missing = missing
+    raise ValidationException(f"Missing columns: {best_missing}")
+
+
+# --------------------------- BATCHING ---------------------------
+def _to_frame(records: List[tuple], row_numbers: List[int], header: List[str], as_str: bool) -> pd.DataFrame:
+    width = len(header)
+    data = [list(r[:width]) + [None] * (width - len(r)) for r in records]
+    if as_str:
+        # Same values pd.read_excel(dtype=str) would give
+        data = [[None if v is None else str(v) for v in r] for r in data]
+    return pd.DataFrame(data, columns=header, index=row_numbers, dtype=object)
+
+
+def _batches(rows: Iterator[tuple], header_row: int, header: List[str],
+             batch_size: int, as_str: bool) -> Iterator[pd.DataFrame]:
+    records, row_numbers = [], []
+    for row_number, row in enumerate(rows, start=header_row + 1):
+        if _is_blank(row):
+            continue
+        records.append(row)
+        row_numbers.append(row_number)
+        if len(records) >= batch_size:
+            yield _to_frame(records, row_numbers, header, as_str)
+            records, row_numbers = [], []
+    if records:
+        yield _to_frame(records, row_numbers, header, as_str)
+
+
+# --------------------------- ENTRY POINT ---------------------------
+def iter_excel_batches(source, filename: str, key_columns: Sequence[str],
+                       batch_size: int = REPORT_BATCH_SIZE, as_str: bool = False) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame batches (indexed by spreadsheet row) from the first sheet of an Excel report.
+
+    source is a path or binary file object. Blank rows are skipped. The header is the first
+    row (within HEADER_SCAN_ROWS) containing all key_columns. Legacy .xls files cannot be
+    streamed by openpyxl and are loaded whole through pandas.
+    """
+    if filename.lower().endswith(".xls"):
+        yield from _iter_xls_batches(source, key_columns, batch_size, as_str)
+        return
+
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except Exception as e:
+        raise ReportProcessingException(f"Failed to read Excel file: {e}")
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header_row, header = _find_header(rows, key_columns)
+        yield from _batches(rows, header_row, header, batch_size, as_str)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_batches(source, key_columns: Sequence[str], batch_size: int, as_str: bool) -> Iterator[pd.DataFrame]:
+    try:
+        raw = pd.read_excel(source, header=None, dtype=object)
+    except Exception as e:
+        raise ReportProcessingException(f"Failed to read Excel file: {e}")
+    rows = (tuple(None if pd.isna(v) else v for v in r) for r in raw.itertuples(index=False, name=None))
+    header_row, header = _find_header(rows, key_columns)
+    yield from _batches(rows, header_row, header, batch_size, as_str)
+
+
+# --------------------------- PARQUET / ARROW IPC ---------------------------
+def _arrow_batches(path: str, filename: str, batch_size: int):
+    if filename.lower().endswith(".parquet"):
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size)
+        return
+    # Arrow IPC: file format (.arrow / .feather v2) or stream format; zero-copy off the map
+    with pa.memory_map(path, "r") as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        yield from table.to_batches(max_chunksize=batch_size)
+
+
+def _arrow_schema(path: str, filename: str):
+    if filename.lower().endswith(".parquet"):
+        return pq.read_schema(path, memory_map=True)
+    with pa.memory_map(path, "r") as source:
+        try:
+            return pa.ipc.open_file(source).schema
+        except pa.ArrowInvalid:
+            source.seek(0)
+            return pa.ipc.open_stream(source).schema
+
+
+def _stringify(batch):
+    # Scalars other than dates / timestamps become strings (as_str, like the Excel path);
+    # list columns (skills) keep their type
+    columns = []
+    for column, field in zip(batch.columns, batch.schema):
+        kind = field.type
+        if not (pa.types.is_temporal(kind) or pa.types.is_string(kind) or pa.types.is_large_string(kind)
+                or pa.types.is_nested(kind)):
+            column = column.cast(pa.string())
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def iter_arrow_batches(path: str, filename: str, key_columns: Sequence[str],
+                       batch_size: int = REPORT_BATCH_SIZE, as_str: bool = False) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame batches from a Parquet or Arrow IPC file, keeping the column types.
+
+    Dates arrive as date / datetime values, so no string parsing is needed downstream.
+    With as_str, every other scalar column is read as strings (e.g. integer IDs into str
+    fields). Batches are indexed by record number (1-based), the equivalent of the spreadsheet row.
+    """
+    if pa is None:
+        raise ReportProcessingException("Parquet / Arrow uploads require pyarrow")
+    try:
+        names = _arrow_schema(path, filename).names
+    except Exception as e:
+        raise ReportProcessingException(f"Failed to read {filename}: {e}")
+    if missing := [c for c in key_columns if c not in names]:
+        raise ValidationException(f"Missing columns: {missing}")
+
+    offset = 1
+    for batch in _arrow_batches(path, filename, batch_size):
+        if not batch.num_rows:
+            continue
+        if as_str:
+            batch = _stringify(batch)
+        # date32 -> datetime.date objects (pyarrow default), timestamps -> datetime64
+        df = batch.to_pandas()
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        yield df
+
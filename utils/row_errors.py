@@ -0,0 +1,26 @@
+# --------------------------- IMPORTS ---------------------------
+from typing import List
+
+from pydantic import ValidationError
+
+
+# Per-row upload errors: {"row", <key column>, "error", "columns", "error_types"}.
+# `columns` are the report columns (model aliases) that failed and `error_types` the
+# Pydantic error types ("missing", "value_error", "literal_error", ...); the upload
+# errors endpoint filters on both. No DB access: used inside the validation workers.
+def _unique(values) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def error_fields(e: Exception) -> dict:
+    if isinstance(e, ValidationError):
+        details = e.errors()
+        # Model-level validators have an empty loc: no single column to blame
+        return {"columns": _unique(str(d["loc"][0]) for d in details if d["loc"]),
+                "error_types": _unique(d["type"] for d in details)}
+    return {"columns": [], "error_types": [type(e).__name__]}
+
+
+def row_error(row, e: Exception, **keys) -> dict:
+    """Error entry for a row that failed model validation."""
+    return {"row": row, **keys, "error": str(e), **error_fields(e)}
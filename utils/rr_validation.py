@@ -0,0 +1,85 @@
+# --------------------------- IMPORTS ---------------------------
+from datetime import date
+from typing import List, Optional
+
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
+
+from models import ResourceRequest
+from utils.date_columns import normalize_date_columns
+from utils.row_errors import row_error
+
+
+# Row validation for the RR report. Kept free of database imports so it can run
+# in validation worker processes (utils/sharded_validation.py).
+RR_KEY_COLUMN = "Resource Request ID"
+RR_DATE_COLUMNS = [f.alias for f in ResourceRequest.model_fields.values() if f.annotation in (date, Optional[date])]
+RR_DATETIME_COLUMNS = [ResourceRequest.model_fields["last_activity_date"].alias]
+# Built once per process: the core schema for ~90 aliased fields is not cheap to compile
+RR_BATCH_ADAPTER = TypeAdapter(List[ResourceRequest])
+# Rows per adapter call; a failing call only re-validates its own chunk
+RR_VALIDATION_CHUNK = 1000
+
+
+def _records(df: pd.DataFrame) -> list:
+    # Row dicts with NaN cleaned to None, built column-wise (to_dict boxes every cell);
+    # newly uploaded entries considered active
+    columns = list(df.columns) + ["rr_status"]
+    values = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns]
+    values.append([True] * len(df))
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _row_error(row, record: dict) -> Optional[dict]:
+    # Per-row validation only to report the failing row with the usual message
+    try:
+        ResourceRequest(**record)
+    except Exception as e:
+        return row_error(row, e, rr_id=str(record[RR_KEY_COLUMN]))
+
+
+def validate_rr_rows(df: pd.DataFrame, trusted: bool = False):
+    """Validate one batch of RR rows (DataFrame index = spreadsheet row number).
+
+    The batch is validated in one RR_BATCH_ADAPTER call; only when that fails are the
+    failing rows (from the error locations) re-validated one by one for their messages.
+    `trusted` sources (our own updated_jobs.csv, every row written from a validated
+    ResourceRequest) skip the RR ID filter and error mapping: one batch call, and the
+    regular path only if that unexpectedly fails.
+    """
+    if RR_KEY_COLUMN not in df.columns:
+        return [], []
+    # Date columns are parsed column-wise up front; the validators then see date objects
+    df = normalize_date_columns(df, RR_DATE_COLUMNS, RR_DATETIME_COLUMNS)
+
+    if trusted:
+        try:
+            return RR_BATCH_ADAPTER.validate_python(_records(df)), []
+        except Exception:
+            pass
+
+    # Skip rows without RR ID
+    df = df[df[RR_KEY_COLUMN].map(lambda v: not pd.isna(v) and bool(v))]
+    rows, records = df.index.tolist(), _records(df)
+    valid_rrs, errors = [], []
+    for start in range(0, len(records), RR_VALIDATION_CHUNK):
+        chunk_rrs, chunk_errors = _validate_chunk(rows[start:start + RR_VALIDATION_CHUNK],
+                                                  records[start:start + RR_VALIDATION_CHUNK])
+        valid_rrs += chunk_rrs
+        errors += chunk_errors
+    return valid_rrs, errors
+
+
+def _validate_chunk(rows: list, records: list):
+    try:
+        return RR_BATCH_ADAPTER.validate_python(records), []
+    except ValidationError as e:
+        # loc[0] is the position in the chunk
+        suspects = {error["loc"][0] for error in e.errors()}
+    except Exception:
+        # A validator raised something pydantic does not wrap: check every row
+        suspects = range(len(records))
+
+    errors = {i: error for i in sorted(suspects) if (error := _row_error(rows[i], records[i]))}
+    valid = [record for i, record in enumerate(records) if i not in errors]
+    return (RR_BATCH_ADAPTER.validate_python(valid) if valid else []), list(errors.values())
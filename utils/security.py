@@ -31,6 +31,11 @@ def create_refresh_token(data: dict) -> str:
     expire =datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+# Users deactivated by a CVR delta upload (users.is_active False) can neither log in nor use issued tokens
+def ensure_active(user: dict):
+    if not user.get("is_active", True):
+        raise HTTPException(status_code=403, detail="Account is deactivated")
+
 # === AUTH DEPENDENCY ===
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
     token = credentials.credentials
@@ -49,5 +54,6 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(b
     user = await collections["users"].find_one({"employee_id": emp_id})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    ensure_active(user)
 
     return {"employee_id": emp_id, "role": user["role"], "user": user}
\ No newline at end of file
@@ -0,0 +1,78 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from utils.file_upload_utils import logger
+
+
+# Process-pool validation for large uploads.
+# A batch is cut into contiguous row shards that are validated in parallel worker
+# processes; results are concatenated in shard order, so models and errors keep file
+# order and the DataFrame index (spreadsheet row number) stays correct in error reports.
+# The validate function must be a top-level function returning a tuple of lists,
+# e.g. utils.cvr_validation.validate_career_velocity or utils.rr_validation.validate_rr_rows.
+# Each batch is spread over every process (len(df) / VALIDATION_PROCESSES rows per shard);
+# SHARD_MIN_ROWS only keeps shards from getting so small that pickling them costs more than
+# validating them, so a REPORT_BATCH_SIZE batch still fills the pool.
+VALIDATION_PROCESSES = int(os.getenv("UPLOAD_VALIDATION_PROCESSES", "0"))  # 0 = validate in a thread
+SHARD_MIN_ROWS = int(os.getenv("UPLOAD_SHARD_MIN_ROWS", "250"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: workers must not inherit the event loop or the MongoDB client threads
+        _pool = ProcessPoolExecutor(max_workers=VALIDATION_PROCESSES,
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_validation_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shard_count(rows: int) -> int:
+    """Shards for a batch: one per process, fewer when that would go below SHARD_MIN_ROWS rows."""
+    if VALIDATION_PROCESSES < 2:
+        return 1
+    size = max(-(-rows // VALIDATION_PROCESSES), SHARD_MIN_ROWS)
+    return -(-rows // size)
+
+
+def split_shards(df: pd.DataFrame, shards: int) -> List[pd.DataFrame]:
+    size = -(-len(df) // shards)
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def _merge(results: list) -> tuple:
+    return tuple([item for result in results for item in result[part]] for part in range(len(results[0])))
+
+
+async def validate_in_shards(validate: Callable, df: pd.DataFrame, *args) -> tuple:
+    """Run validate(df, *args) across process shards, or in a thread for small batches / when disabled."""
+    shards = shard_count(len(df))
+    if shards < 2:
+        return await asyncio.to_thread(validate, df, *args)
+
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        results = await asyncio.gather(*(loop.run_in_executor(pool, validate, shard, *args)
+                                         for shard in split_shards(df, shards)))
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM-killed): drop the pool and validate this batch in a thread
+        logger.error(f"Validation process pool broken, falling back to a thread: {e}")
+        shutdown_validation_pool()
+        return await asyncio.to_thread(validate, df, *args)
+    return _merge(results)
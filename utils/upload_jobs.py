@@ -0,0 +1,339 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import hashlib
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import collections
+from utils.file_upload_utils import logger
+from utils.upload_pipelines import PIPELINES
+from utils.sharded_validation import shutdown_validation_pool
+
+
+# Background upload jobs.
+# Upload endpoints only stage the file and enqueue a job; workers started in the app
+# lifespan run the pipeline and persist progress in the upload_jobs collection:
+# {_id, kind, filename, fingerprint, staged_path, move_to, quarantine_to, uploaded_by,
+#  status, owner, heartbeat, rows, timings, result, error, created_at, started_at,
+#  finished_at, updated_at}
+# Several app processes may share the collection: a worker runs a job only after
+# atomically claiming it (queued -> parsing, with its owner id) and keeps its heartbeat
+# fresh while running. Jobs whose heartbeat went stale (owner died) are re-queued.
+# Jobs point at their file in STAGING_FOLDER (staged_path), so any process may run any
+# job: with more than one host, STAGING_FOLDER must be a volume they all mount at the
+# same path. A job whose file is not there fails instead of being retried.
+# Uploads are fingerprinted as "<kind>:<sha256 of the content>". A successful run is
+# recorded in upload_ingestions ({_id: fingerprint, kind, filename, job_id, uploaded_by,
+# result, ingested_at}). Reports are full snapshots, so a re-upload is only skipped (and
+# the stored outcome returned) when it matches the latest ingestion of its kind; A, B, A
+# re-syncs A. Delta uploads are never skipped: re-applying one is deliberate.
+# While a job is active it holds active_fingerprint (unique index), so two identical
+# uploads racing each other queue one job.
+# Kinds whose content is applied on top of the current state rather than replacing it
+DELTA_KINDS = {"employees_delta"}
+STAGING_FOLDER = os.getenv("UPLOAD_STAGING_FOLDER", "upload_files/staging")
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "1"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("UPLOAD_JOB_HEARTBEAT_SECONDS", "15"))
+# A running job without a heartbeat for this long is considered abandoned
+JOB_STALE_SECONDS = float(os.getenv("UPLOAD_JOB_STALE_SECONDS", "120"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+QUEUED, PARSING, VALIDATING, SYNCING, DONE, FAILED = "queued", "parsing", "validating", "syncing", "done", "failed"
+ACTIVE_STATUSES = [QUEUED, PARSING, VALIDATING, SYNCING]
+TERMINAL_STATUSES = [DONE, FAILED]
+
+upload_jobs = collections["upload_jobs"]
+upload_ingestions = collections["upload_ingestions"]
+_queue: asyncio.Queue = asyncio.Queue()
+_queued_ids: set = set()
+_workers: list = []
+_recovery = None
+
+
+# --------------------------- SUBMIT ---------------------------
+CHUNK_SIZE = 1024 * 1024
+
+
+def _stage(source, job_id: str, filename: str):
+    """Copy the upload into STAGING_FOLDER, hashing it on the way; returns (path, sha256)."""
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    path = os.path.join(STAGING_FOLDER, f"{job_id}_{os.path.basename(filename)}")
+    digest = hashlib.sha256()
+    source.seek(0)
+    with open(path, "wb") as out:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _enqueue(job_id: str):
+    if job_id not in _queued_ids:
+        _queued_ids.add(job_id)
+        await _queue.put(job_id)
+
+
+async def _active_job(fingerprint: str) -> Optional[dict]:
+    job = await upload_jobs.find_one({"active_fingerprint": fingerprint})
+    if job:
+        job["duplicate"] = True
+    return job
+
+
+async def _existing_job(kind: str, fingerprint: str) -> Optional[dict]:
+    # Same content as the latest ingestion of this kind, or still in flight (e.g. a client retry)
+    latest = await upload_ingestions.find_one({"kind": kind}, sort=[("ingested_at", DESCENDING)])
+    if latest and latest["_id"] == fingerprint:
+        return {"_id": latest["job_id"], "status": DONE, "filename": latest["filename"],
+                "result": latest["result"], "ingested_at": latest["ingested_at"], "duplicate": True}
+    return await _active_job(fingerprint)
+
+
+async def _skip_duplicate(existing: dict, kind: str, filename: str, job_id: str, staged_path: str,
+                          move_to: Optional[str], quarantine_to: Optional[str]) -> dict:
+    await asyncio.to_thread(_finish_file, {"_id": job_id, "staged_path": staged_path,
+                                           "move_to": move_to, "quarantine_to": quarantine_to}, True)
+    logger.info(f"Upload '{filename}' ({kind}) matches job {existing['_id']}; not re-processed")
+    return existing
+
+
+async def submit_upload_job(kind: str, filename: str, uploaded_by: str, source=None,
+                            staged_path: Optional[str] = None, move_to: Optional[str] = None,
+                            quarantine_to: Optional[str] = None, force: bool = False) -> dict:
+    """Stage an upload and queue it for processing; returns the job document.
+
+    Pass either `source` (a binary file object, copied into STAGING_FOLDER) or `staged_path`
+    (a file already on disk, processed in place). With `move_to` / `quarantine_to`, the file
+    is moved there after a successful / failed run instead of being deleted.
+
+    If the content matches the latest ingestion of this kind (or is being ingested), nothing
+    is queued: the earlier job is returned with `duplicate: True`. `force` re-runs it anyway;
+    delta kinds are always run.
+    """
+    if kind not in PIPELINES:
+        raise ValueError(f"Unknown upload job kind: {kind}")
+    job_id = uuid.uuid4().hex
+    if staged_path is None:
+        staged_path, sha256 = await asyncio.to_thread(_stage, source, job_id, filename)
+    else:
+        sha256 = await asyncio.to_thread(_file_sha256, staged_path)
+    fingerprint = f"{kind}:{sha256}"
+    dedupe = not force and kind not in DELTA_KINDS
+
+    if dedupe and (existing := await _existing_job(kind, fingerprint)):
+        return await _skip_duplicate(existing, kind, filename, job_id, staged_path, move_to, quarantine_to)
+
+    now = datetime.now(timezone.utc)
+    job = {
+        "_id": job_id,
+        "kind": kind,
+        "filename": filename,
+        "fingerprint": fingerprint,
+        "staged_path": staged_path,
+        "move_to": move_to,
+        "quarantine_to": quarantine_to,
+        "uploaded_by": uploaded_by or "System",
+        "status": QUEUED,
+        "rows": {"total": 0, "valid": 0, "failed": 0},
+        "timings": {},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if dedupe:
+        job["active_fingerprint"] = fingerprint
+    try:
+        await upload_jobs.insert_one(job)
+    except DuplicateKeyError:
+        # An identical upload was queued between the check and the insert
+        existing = await _active_job(fingerprint)
+        if existing:
+            return await _skip_duplicate(existing, kind, filename, job_id, staged_path, move_to, quarantine_to)
+        job.pop("active_fingerprint")
+        await upload_jobs.insert_one(job)
+    await _enqueue(job_id)
+    logger.info(f"Upload job {job_id} queued: {kind} '{filename}' by {job['uploaded_by']}")
+    return job
+
+
+async def get_upload_job(job_id: str) -> dict:
+    job = await upload_jobs.find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
+
+# --------------------------- WORKER ---------------------------
+def _finish_file(job: dict, succeeded: bool):
+    path = job["staged_path"]
+    target = job.get("move_to") if succeeded else job.get("quarantine_to")
+    try:
+        if target:
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            os.replace(path, target)
+        elif not job.get("move_to"):
+            os.remove(path)
+    except OSError as e:
+        logger.warning(f"Upload job {job['_id']}: could not clean up {path}: {e}")
+
+
+async def _claim_job(job_id: str) -> Optional[dict]:
+    # Atomic: of all processes holding this id in their queue, exactly one gets the job
+    now = datetime.now(timezone.utc)
+    return await upload_jobs.find_one_and_update(
+        {"_id": job_id, "status": QUEUED},
+        {"$set": {"status": PARSING, "owner": WORKER_ID, "heartbeat": now, "started_at": now, "updated_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await upload_jobs.update_one({"_id": job_id, "owner": WORKER_ID},
+                                     {"$set": {"heartbeat": datetime.now(timezone.utc)}})
+
+
+async def _run_job(job_id: str):
+    job = await _claim_job(job_id)
+    if not job:
+        # Already claimed by another worker, or finished
+        return
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        await _execute_job(job)
+    finally:
+        heartbeat.cancel()
+
+
+async def _execute_job(job: dict):
+    job_id = job["_id"]
+    started = time.perf_counter()
+    state = {"status": None, "since": started}
+    timings: dict = {}
+    rows = dict(job["rows"])
+
+    def close_stage(next_status: Optional[str]):
+        # Time spent in the current stage is added to its running total
+        now = time.perf_counter()
+        if state["status"]:
+            timings[state["status"]] = round(timings.get(state["status"], 0) + now - state["since"], 3)
+        state["status"], state["since"] = next_status, now
+
+    async def progress(status: str, rows_total: int = None, rows_valid: int = None, rows_failed: int = None):
+        close_stage(status)
+        for key, value in (("total", rows_total), ("valid", rows_valid), ("failed", rows_failed)):
+            if value is not None:
+                rows[key] = value
+        now = datetime.now(timezone.utc)
+        await upload_jobs.update_one({"_id": job_id, "owner": WORKER_ID}, {"$set": {
+            "status": status, "rows": rows, "timings": timings, "heartbeat": now, "updated_at": now,
+        }})
+
+    try:
+        if not os.path.exists(job["staged_path"]):
+            raise FileNotFoundError(f"Staged file {job['staged_path']} not found on {socket.gethostname()}; "
+                                    f"UPLOAD_STAGING_FOLDER must be shared by every app host")
+        result = await PIPELINES[job["kind"]](job["staged_path"], job["filename"], job["uploaded_by"], progress)
+        update = {"status": DONE, "result": result}
+        if "failed" in result:
+            rows["failed"] = result["failed"]
+        succeeded = True
+    except HTTPException as e:
+        update = {"status": FAILED, "error": e.detail}
+        succeeded = False
+    except Exception as e:
+        logger.error(f"Upload job {job_id} failed: {e}")
+        update = {"status": FAILED, "error": str(e)}
+        succeeded = False
+
+    close_stage(None)
+    timings["total"] = round(time.perf_counter() - started, 3)
+    now = datetime.now(timezone.utc)
+    await upload_jobs.update_one({"_id": job_id, "owner": WORKER_ID}, {"$set": {
+        **update, "rows": rows, "timings": timings, "finished_at": now, "updated_at": now,
+    }, "$unset": {"active_fingerprint": ""}})
+    # Failed runs are not recorded, so the same file can simply be uploaded again
+    if succeeded and job.get("fingerprint"):
+        await upload_ingestions.replace_one({"_id": job["fingerprint"]}, {
+            "kind": job["kind"], "filename": job["filename"], "job_id": job_id,
+            "uploaded_by": job["uploaded_by"], "result": update["result"], "ingested_at": now,
+        }, upsert=True)
+    await asyncio.to_thread(_finish_file, job, succeeded)
+    logger.info(f"Upload job {job_id} {update['status']} in {timings['total']}s")
+
+
+async def _worker(number: int):
+    while True:
+        job_id = await _queue.get()
+        _queued_ids.discard(job_id)
+        try:
+            await _run_job(job_id)
+        except Exception as e:
+            logger.error(f"Upload worker {number}: job {job_id} crashed: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def recover_upload_jobs(startup: bool = False):
+    """Re-queue running jobs with a stale heartbeat and queue orphaned queued jobs."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+    running = [status for status in ACTIVE_STATUSES if status != QUEUED]
+    stale = {"status": {"$in": running}, "$or": [{"heartbeat": {"$lt": cutoff}}, {"heartbeat": None}]}
+    async for job in upload_jobs.find(stale, {"_id": 1}):
+        # Same filter in the update: a job whose owner is still beating is left alone
+        result = await upload_jobs.update_one({"_id": job["_id"], **stale},
+                                              {"$set": {"status": QUEUED, "owner": None, "updated_at": cutoff}})
+        if result.modified_count:
+            logger.warning(f"Upload job {job['_id']}: owner stopped responding, re-queued")
+    # Queued jobs may belong to a process that died before running them; the claim makes
+    # queueing a job that another live process also holds harmless. Later sweeps only
+    # take jobs that have been waiting for a while.
+    waiting = {"status": QUEUED} if startup else {"status": QUEUED, "updated_at": {"$lt": cutoff}}
+    async for job in upload_jobs.find(waiting, {"_id": 1}).sort("created_at", 1):
+        await _enqueue(job["_id"])
+
+
+async def _recover_periodically():
+    while True:
+        await asyncio.sleep(JOB_STALE_SECONDS)
+        try:
+            await recover_upload_jobs()
+        except Exception as e:
+            logger.error(f"Upload job recovery failed: {e}")
+
+
+async def start_upload_workers():
+    """Start the queue workers; jobs abandoned by a stopped process are picked up again."""
+    global _recovery
+    await recover_upload_jobs(startup=True)
+    for number in range(UPLOAD_WORKERS):
+        _workers.append(asyncio.create_task(_worker(number + 1)))
+    _recovery = asyncio.create_task(_recover_periodically())
+
+
+async def stop_upload_workers():
+    global _recovery
+    for task in _workers + ([_recovery] if _recovery else []):
+        task.cancel()
+    await asyncio.gather(*_workers, *([_recovery] if _recovery else []), return_exceptions=True)
+    _workers.clear()
+    _recovery = None
+    shutdown_validation_pool()
@@ -0,0 +1,200 @@
+# --------------------------- IMPORTS ---------------------------
+import asyncio
+import os
+from typing import Awaitable, Callable, Iterator
+
+import pandas as pd
+
+from exceptions.file_upload_exceptions import ReportProcessingException, ValidationException
+from utils.cvr_delta import ID_COLUMN as DELTA_ID_COLUMN, apply_cvr_delta, parse_cvr_delta
+from utils.cvr_validation import validate_career_velocity
+from utils.rr_validation import RR_KEY_COLUMN, validate_rr_rows
+from utils.sharded_validation import validate_in_shards
+from utils.file_upload_utils import (ENCODING_SAMPLE_BYTES, detect_encoding, log_upload_action,
+                                     merge_sync_results, read_csv_file, sync_employees_with_db,
+                                     sync_rr_with_db)
+from utils.jobs_crud import CSV_PATH
+from utils.report_reader import is_arrow_file, iter_arrow_batches, iter_excel_batches
+
+
+# Processing stages behind the upload jobs (utils/upload_jobs.py).
+# Each pipeline reads a staged file, reports its stage and row counts through
+# `progress(status, **counters)`, and returns the upload summary.
+Progress = Callable[..., Awaitable[None]]
+
+CVR_REQUIRED_COLUMNS = ["Employee ID", "Employee Name", "Designation", "Band", "Primary Technology", "City", "Type"]
+# RR files written by create_resource_request and picked up by the folder watcher;
+# their rows are already normalized (see validate_rr_rows `trusted`). They only hold
+# newly created jobs, not the full report, so they never deactivate other RRs.
+TRUSTED_RR_FILES = {os.path.basename(CSV_PATH)}
+
+
+def _file_type(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "CSV"
+    if name.endswith(".parquet"):
+        return "Parquet"
+    return "Arrow" if is_arrow_file(name) else "Excel"
+
+
+async def _next_batch(batches, progress: Progress):
+    await progress("parsing")
+    return await asyncio.to_thread(next, batches, None)
+
+
+# --------------------------- CAREER VELOCITY ---------------------------
+def _read_cvr_csv(path: str, required_columns=CVR_REQUIRED_COLUMNS) -> pd.DataFrame:
+    try:
+        with open(path, "rb") as f:
+            encoding = detect_encoding(f.read(ENCODING_SAMPLE_BYTES))
+        df = pd.read_csv(path, encoding=encoding, dtype=str, engine="c", on_bad_lines="skip")
+    except Exception as e:
+        raise ReportProcessingException(f"Failed to read file: {e}")
+    # Drop rows that are completely empty
+    df = df.dropna(how="all")
+    if missing := [c for c in required_columns if c not in df.columns]:
+        raise ValidationException(f"Missing columns: {missing}")
+    # Index = file line number (header is line 1)
+    df.index = df.index + 2
+    return df
+
+
+async def run_career_velocity(path: str, filename: str, uploaded_by: str, progress: Progress) -> dict:
+    batches = report_batches("employees", path, filename)
+
+    # Each batch: columnar validation (thread, or process-pool shards for large batches;
+    # only failing rows go through Pydantic), then straight into the bulk upsert
+    valid_count, errors, total_rows, sync_results = 0, [], 0, []
+    while (batch := await _next_batch(batches, progress)) is not None:
+        total_rows += len(batch)
+        await progress("validating", rows_total=total_rows)
+        batch_emps, batch_users, batch_errors = await validate_in_shards(validate_career_velocity, batch, 0)
+        errors += batch_errors
+        valid_count += len(batch_emps)
+        await progress("syncing", rows_valid=valid_count, rows_failed=len(errors))
+        if batch_emps:
+            sync_results.append(await sync_employees_with_db(batch_emps, batch_users))
+
+    upload_id = await log_upload_action("employees", filename, _file_type(filename),
+                                        uploaded_by, total_rows, valid_count, len(errors), errors)
+
+    if not valid_count:
+        return {"message": "No valid employees found", "upload_id": upload_id, "errors_sample": errors[:5]}
+    return {
+        "message": "Career Velocity processed successfully",
+        "processed": valid_count,
+        "upload_id": upload_id,
+        "failed": len(errors),
+        "errors_sample": errors[:5],
+        "sync": merge_sync_results(sync_results),
+    }
+
+
+async def run_career_velocity_delta(path: str, filename: str, uploaded_by: str, progress: Progress) -> dict:
+    # Only Employee ID is required; every other column is optional (PATCH semantics, utils/cvr_delta.py)
+    batches = report_batches("employees_delta", path, filename)
+
+    changes_count, errors, total_rows, sync_results = 0, [], 0, []
+    while (batch := await _next_batch(batches, progress)) is not None:
+        total_rows += len(batch)
+        await progress("validating", rows_total=total_rows)
+        changes, batch_errors = await asyncio.to_thread(parse_cvr_delta, batch)
+        errors += batch_errors
+        await progress("syncing", rows_valid=changes_count, rows_failed=len(errors))
+        if changes:
+            result, apply_errors = await apply_cvr_delta(changes, batch)
+            errors += apply_errors
+            changes_count += sum(len(applied) for applied in result["changes"].values())
+            sync_results.append(result)
+
+    # The audit keeps the applied delta (field-level changes per employee)
+    delta = merge_sync_results(sync_results)
+    upload_id = await log_upload_action("employees_delta", filename, _file_type(filename), uploaded_by,
+                                        total_rows, changes_count, len(errors), errors, delta=delta)
+
+    if not changes_count:
+        return {"message": "No valid changes found", "upload_id": upload_id, "errors_sample": errors[:5]}
+    return {
+        "message": "Career Velocity delta applied successfully",
+        "processed": changes_count,
+        "upload_id": upload_id,
+        "failed": len(errors),
+        "errors_sample": errors[:5],
+        "sync": {k: v for k, v in delta.items() if k != "changes"},
+    }
+
+
+# --------------------------- RR REPORT ---------------------------
+def _read_rr_csv(path: str) -> pd.DataFrame:
+    try:
+        df = read_csv_file(path)
+    except Exception as e:
+        raise ReportProcessingException(f"Failed to read RR report: {e}")
+    # Ensure CSV actually has data
+    if df is None or df.empty:
+        raise ReportProcessingException("CSV file contains no valid rows")
+    # Ensure key column for RR exists
+    if RR_KEY_COLUMN not in df.columns:
+        raise ValidationException(f"Column '{RR_KEY_COLUMN}' is required")
+    # Index = file line number (header is line 1)
+    df.index = df.index + 2
+    return df
+
+
+async def run_rr_report(path: str, filename: str, uploaded_by: str, progress: Progress) -> dict:
+    batches = report_batches("rr_report", path, filename)
+    trusted = uploaded_by == "system" and filename in TRUSTED_RR_FILES
+
+    # Validated batch by batch; the delta sync needs the whole set, so it runs once at the end
+    valid_rrs, errors, total_rows = [], [], 0
+    while (batch := await _next_batch(batches, progress)) is not None:
+        total_rows += len(batch)
+        await progress("validating", rows_total=total_rows)
+        batch_rrs, batch_errors = await validate_in_shards(validate_rr_rows, batch, trusted)
+        valid_rrs += batch_rrs
+        errors += batch_errors
+        await progress("validating", rows_valid=len(valid_rrs), rows_failed=len(errors))
+
+    upload_id = await log_upload_action("rr_report", filename, _file_type(filename),
+                                        uploaded_by, total_rows, len(valid_rrs), len(errors), errors)
+
+    if not valid_rrs:
+        return {"message": "No valid RRs found", "upload_id": upload_id, "errors_sample": errors[:5]}
+
+    # Only inserted/updated/reactivated/deactivated RRs are written
+    await progress("syncing")
+    result = await sync_rr_with_db(valid_rrs, deactivate_missing=not trusted)
+    return {
+        "message": "RR Report processed successfully",
+        "valid_requests": len(valid_rrs),
+        "upload_id": upload_id,
+        "failed": len(errors),
+        "errors_sample": errors[:5],
+        "sync": result,
+    }
+
+
+# --------------------------- READERS ---------------------------
+def report_batches(kind: str, path: str, filename: str) -> Iterator[pd.DataFrame]:
+    """DataFrame batches of a report file for an upload kind, indexed by file row number.
+
+    CSV is read whole; Excel is streamed (header row found by the required columns, RR
+    values as strings); Parquet / Arrow batches keep their date / timestamp types, so
+    dates need no parsing downstream (RR scalars are read as strings). Reading is lazy: nothing happens before the first next().
+    """
+    required = {"employees": CVR_REQUIRED_COLUMNS, "employees_delta": [DELTA_ID_COLUMN],
+                "rr_report": [RR_KEY_COLUMN]}[kind]
+    if filename.lower().endswith(".csv"):
+        yield _read_rr_csv(path) if kind == "rr_report" else _read_cvr_csv(path, required)
+    elif is_arrow_file(filename):
+        yield from iter_arrow_batches(path, filename, required, as_str=kind == "rr_report")
+    else:
+        yield from iter_excel_batches(path, filename, required, as_str=kind == "rr_report")
+
+
+PIPELINES = {
+    "employees": run_career_velocity,
+    "employees_delta": run_career_velocity_delta,
+    "rr_report": run_rr_report,
+}